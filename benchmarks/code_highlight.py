@@ -0,0 +1,198 @@
+"""
+代码高亮基准：代码密集页面（40 个 12～600 行的代码块，约 350KB 源码）在不同高亮方式下的读取耗时、
+响应大小（compact 响应，与前端相同），以及读取期间事件循环的响应延迟
+
+每种方式启动一个新的应用进程（后端是本地 Notion 替身），清除首屏缓存后读取整页（首屏 + 连续 /more），
+同时另一个线程每隔 --probe-interval 秒请求一次 /health，它的延迟反映事件循环被阻塞的程度：
+- off     CODE_HIGHLIGHT=false，只返回源码（浏览器中用 highlight.js 高亮）
+- thread  CODE_HIGHLIGHT_WORKERS=0，长代码在线程池中高亮
+- pool    CODE_HIGHLIGHT_WORKERS=2，长代码在进程池中高亮（默认配置按 CPU 核数在两者之间选择）
+第一轮读取时高亮缓存为空，之后各轮只清除首屏缓存，高亮结果来自缓存。
+
+    python benchmarks/code_highlight.py --runs 3
+    python benchmarks/code_highlight.py --mode off --mode pool --micro
+"""
+import argparse
+import json
+import statistics
+import sys
+import threading
+import time
+from typing import Dict, List
+
+import httpx
+
+from run_benchmarks import ROOT, Bench, git_revision, percentile
+
+MODES = {
+    "off": {"CODE_HIGHLIGHT": "false"},
+    "thread": {"CODE_HIGHLIGHT_WORKERS": "0"},
+    "pool": {"CODE_HIGHLIGHT_WORKERS": "2"},
+}
+
+
+class LoopProbe:
+    """Polls /health from a background thread; its latency is a proxy for event loop stalls."""
+
+    def __init__(self, url: str, interval: float):
+        self.url = url
+        self.interval = interval
+        self.samples: List[float] = []
+        self.running = False
+        self.thread = None
+
+    def __enter__(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.running = False
+        self.thread.join()
+
+    def _run(self):
+        with httpx.Client(base_url=self.url, timeout=30.0) as client:
+            while self.running:
+                started = time.perf_counter()
+                client.get("/health")
+                self.samples.append((time.perf_counter() - started) * 1000)
+                time.sleep(self.interval)
+
+
+def read_page(bench: Bench, page_id: str) -> Dict[str, float]:
+    """
+    First screen plus every /more slice with the compact profile the frontend uses; returns elapsed time,
+    decoded and on-the-wire (compressed) bytes and the number of highlighted code blocks.
+    """
+    started = time.perf_counter()
+    response = bench.client.get(f"/api/page/{page_id}", params={"limit": 15, "profile": "compact"})
+    requests, size, wire, blocks = 1, len(response.content), response.num_bytes_downloaded, response.json()["blocks"]
+    cursor = response.json().get("next_cursor")
+    while cursor:
+        response = bench.client.get(f"/api/page/{page_id}/more",
+                                    params={"cursor": cursor, "limit": 50, "profile": "compact"})
+        requests += 1
+        size += len(response.content)
+        wire += response.num_bytes_downloaded
+        blocks += response.json()["blocks"]
+        cursor = response.json().get("next_cursor")
+    code = [b for b in blocks if b.get("type") == "code"]
+    return {
+        "ms": (time.perf_counter() - started) * 1000,
+        "requests": requests,
+        "kb": size / 1024,
+        "wire_kb": wire / 1024,
+        "code_blocks": len(code),
+        "highlighted": sum(1 for b in code if b.get("highlighted")),
+    }
+
+
+def measure_mode(bench: Bench, mode: str, runs: int, probe_interval: float) -> dict:
+    bench.app_env = {"CACHE_BACKEND": "memory", **MODES[mode]}
+    bench.start_app()
+    page_id = bench.meta["code_page_id"]
+    reads, probes = [], []
+    try:
+        for _ in range(runs):
+            bench.invalidate(page_id)
+            bench.wait_for_quiet()
+            with LoopProbe(bench.app_url, probe_interval) as probe:
+                reads.append(read_page(bench, page_id))
+            probes.append(probe.samples)
+        highlight = bench.client.get("/health").json().get("code_highlight")
+    finally:
+        bench.app.terminate()
+        bench.app.wait(timeout=10)
+        bench.processes.remove(bench.app)
+
+    def summarize(selected: List[dict], samples: List[float]) -> dict:
+        return {
+            "read_ms": round(statistics.median(r["ms"] for r in selected), 1),
+            "requests": selected[0]["requests"],
+            "response_kb": round(selected[0]["kb"], 1),
+            "wire_kb": round(selected[0]["wire_kb"], 1),
+            "highlighted": f"{selected[0]['highlighted']}/{selected[0]['code_blocks']}",
+            "probe_p50_ms": round(percentile(samples, 50), 1),
+            "probe_p99_ms": round(percentile(samples, 99), 1),
+            "probe_max_ms": round(max(samples), 1),
+        }
+
+    result = {"mode": mode, "first": summarize(reads[:1], probes[0]), "highlight": highlight}
+    if runs > 1:
+        result["cached"] = summarize(reads[1:], [s for samples in probes[1:] for s in samples])
+    return result
+
+
+def micro_benchmark(bench: Bench) -> List[dict]:
+    """Render cost per snippet size, measured in this process on the fixture's code blocks."""
+    sys.path.insert(0, ROOT)
+    import highlighting
+
+    page_id = bench.meta["code_page_id"]
+    blocks = httpx.get(f"{bench.stub_url}/v1/blocks/{page_id}/children", params={"page_size": 100}).json()["results"]
+    results, seen = [], set()
+    for block in blocks:
+        if block.get("type") != "code":
+            continue
+        language = block["code"]["language"]
+        source = "".join(item["plain_text"] for item in block["code"]["rich_text"])
+        if (language, len(source) // 5000) in seen:
+            continue
+        seen.add((language, len(source) // 5000))
+        lexer = highlighting.resolve_language(language)
+        highlighting.render_html(lexer, source)  # 加载词法分析器
+        started = time.perf_counter()
+        rendered = highlighting.render_html(lexer, source)
+        results.append({"language": language, "chars": len(source),
+                        "render_ms": round((time.perf_counter() - started) * 1000, 2),
+                        "html_ratio": round(len(rendered) / len(source), 2)})
+    return sorted(results, key=lambda r: r["chars"])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Server-side code highlighting benchmark on a code-heavy page")
+    parser.add_argument("--runs", type=int, default=3, help="page reads per mode (the first one fills the cache)")
+    parser.add_argument("--mode", action="append", choices=list(MODES), help="highlighting modes (default: all)")
+    parser.add_argument("--probe-interval", type=float, default=0.01, help="seconds between /health probes")
+    parser.add_argument("--micro", action="store_true", help="also time render_html per snippet size in-process")
+    parser.add_argument("--fixtures", help="fixture JSON for the stub (default: synthetic fixtures)")
+    parser.add_argument("--latency", type=float, default=0.03, help="stub latency per Notion call (seconds)")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--stub-port", type=int, default=8765)
+    parser.add_argument("--app-port", type=int, default=8768)
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--verbose", action="store_true", help="show application logs")
+    args = parser.parse_args()
+    args.rate_limit, args.heic_bytes = 0.0, 1024
+
+    bench = Bench(args)
+    report = {**git_revision(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+              "config": {"runs": args.runs, "latency": args.latency}, "modes": []}
+    try:
+        bench.start_stub()
+        for mode in args.mode or list(MODES):
+            result = measure_mode(bench, mode, args.runs, args.probe_interval)
+            report["modes"].append(result)
+            for phase in ("first", "cached"):
+                if phase in result:
+                    r = result[phase]
+                    print(f"{mode:7s} {phase:7s} read {r['read_ms']:8.1f} ms  {r['requests']:2d} requests  "
+                          f"{r['response_kb']:7.1f} KB ({r['wire_kb']:6.1f} KB sent)  highlighted {r['highlighted']:6s}  /health p50 "
+                          f"{r['probe_p50_ms']:6.1f} ms  p99 {r['probe_p99_ms']:7.1f} ms  max {r['probe_max_ms']:7.1f} ms")
+        if args.micro:
+            report["micro"] = micro_benchmark(bench)
+            for r in report["micro"]:
+                print(f"render {r['language']:10s} {r['chars']:6d} chars  {r['render_ms']:7.2f} ms  html x{r['html_ratio']}")
+    finally:
+        bench.stop()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
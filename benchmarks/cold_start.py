@@ -0,0 +1,158 @@
+"""
+冷启动基准：从启动进程到收到第一个响应字节的时间，以及 main 的导入耗时分布
+
+每轮启动一个新的 uvicorn 进程（后端是本地 Notion 替身），不断尝试连接，连上后立即发送请求，
+记录从 Popen 到响应第一个字节的时间。对比 STARTUP_INDEX=background（默认）与 blocking：
+    python benchmarks/cold_start.py --runs 5
+    python benchmarks/cold_start.py --path /health --path "/api/page/{page_id}" --mode background
+
+导入耗时（python -X importtime）：
+    python benchmarks/cold_start.py --importtime --top 15
+"""
+import argparse
+import json
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict
+
+from run_benchmarks import ROOT, Bench, git_revision
+
+DEFAULT_PATHS = ["/health", "/{suffix}", "/api/page/{page_id}"]
+IMPORTTIME_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def first_byte(port: int, path: str, started: float, timeout: float = 60.0) -> Dict[str, object]:
+    """Connect as soon as the port accepts, send one GET and time the first response byte."""
+    deadline = started + timeout
+    while time.perf_counter() < deadline:
+        try:
+            conn = socket.create_connection(("127.0.0.1", port), timeout=timeout)
+        except OSError:
+            time.sleep(0.002)
+            continue
+        with conn:
+            conn.sendall(f"GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n".encode())
+            first = conn.recv(1)
+            elapsed = (time.perf_counter() - started) * 1000
+            if not first:
+                # 进程接受连接但尚未就绪就关闭了连接，重试
+                continue
+            head = first + conn.recv(64)
+        status = int(head.split(b" ", 2)[1]) if head.startswith(b"HTTP/") else 0
+        return {"ms": elapsed, "status": status}
+    raise RuntimeError(f"No response from port {port} within {timeout:.0f}s")
+
+
+def measure_cold_start(bench: Bench, mode: str, path: str, runs: int, port: int) -> dict:
+    env = {**bench.app_environment(), "STARTUP_INDEX": mode}
+    target = path.format(page_id=bench.meta["page_ids"][0], suffix=bench.meta["suffixes"][0])
+    samples, statuses = [], set()
+    for _ in range(runs):
+        started = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            result = first_byte(port, target, started)
+        finally:
+            process.terminate()
+            process.wait(timeout=10)
+        samples.append(result["ms"])
+        statuses.add(result["status"])
+    return {
+        "mode": mode,
+        "path": path,
+        "runs": runs,
+        "statuses": sorted(statuses),
+        "p50_ms": round(statistics.median(samples), 1),
+        "min_ms": round(min(samples), 1),
+        "max_ms": round(max(samples), 1),
+    }
+
+
+def import_profile(env: Dict[str, str], top: int) -> dict:
+    """Parse ``python -X importtime -c 'import main'`` into totals and the slowest modules."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                            cwd=ROOT, env=env, capture_output=True, text=True, timeout=120)
+    modules, children, direct, main_entry = [], [], [], None
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        entry = {"module": name, "self_ms": int(self_us) / 1000,
+                 "cumulative_ms": int(cumulative_us) / 1000, "depth": len(indent) // 2}
+        modules.append(entry)
+        # 输出按导入完成的顺序排列：顶层模块之前紧挨着的 depth 1 条目是它直接导入的模块
+        if entry["depth"] == 1:
+            children.append(entry)
+        elif entry["depth"] == 0:
+            if name == "main":
+                main_entry, direct = entry, children
+            children = []
+    direct = sorted(direct, key=lambda m: -m["cumulative_ms"])
+    return {
+        "main_cumulative_ms": main_entry["cumulative_ms"] if main_entry else None,
+        "main_self_ms": main_entry["self_ms"] if main_entry else None,
+        "direct_imports": direct[:top],
+        "slowest_self": sorted(modules, key=lambda m: -m["self_ms"])[:top],
+    }
+
+
+def print_import_profile(profile: dict):
+    print(f"import main: {profile['main_cumulative_ms']:.1f} ms total, {profile['main_self_ms']:.1f} ms in main itself")
+    print("  direct imports (cumulative):")
+    for m in profile["direct_imports"]:
+        print(f"    {m['cumulative_ms']:8.1f} ms  {m['module']}")
+    print("  slowest modules (self):")
+    for m in profile["slowest_self"]:
+        print(f"    {m['self_ms']:8.1f} ms  {m['module']}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Process-start-to-first-byte and import-time benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--path", action="append", help=f"request path (default: {', '.join(DEFAULT_PATHS)})")
+    parser.add_argument("--mode", action="append", choices=["background", "blocking"], help="STARTUP_INDEX modes")
+    parser.add_argument("--importtime", action="store_true", help="also profile module import times")
+    parser.add_argument("--top", type=int, default=12)
+    parser.add_argument("--fixtures", help="fixture JSON for the stub (default: synthetic fixtures)")
+    parser.add_argument("--latency", type=float, default=0.1, help="stub latency per Notion call (seconds)")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--stub-port", type=int, default=8765)
+    parser.add_argument("--app-port", type=int, default=8767)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+    args.rate_limit, args.heic_bytes, args.verbose = 0.0, 1024, False
+
+    bench = Bench(args, app_env={"CACHE_BACKEND": "memory"})
+    report = {**git_revision(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+              "config": {"runs": args.runs, "latency": args.latency}, "cold_start": []}
+    try:
+        bench.start_stub()
+        if args.importtime:
+            report["imports"] = import_profile(bench.app_environment(), args.top)
+            print_import_profile(report["imports"])
+        for mode in args.mode or ["background", "blocking"]:
+            for path in args.path or DEFAULT_PATHS:
+                result = measure_cold_start(bench, mode, path, args.runs, args.app_port)
+                report["cold_start"].append(result)
+                print(f"{mode:10s} {path:24s} first byte p50 {result['p50_ms']:7.1f} ms  "
+                      f"(min {result['min_ms']:.1f}, max {result['max_ms']:.1f})  status {result['statuses']}")
+    finally:
+        bench.stop()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,281 @@
+"""
+负载测试：用接近生产的流量组合并发访问应用（后端是本地 Notion 替身）
+
+虚拟用户（--users）各自循环：按权重抽取一个场景执行，然后按指数分布的思考时间暂停。
+页面按 Zipf 分布抽取，少数热门页面占大部分访问。内置场景：
+- suffix       GET /{suffix}（重定向或列表页）
+- page_session GET /api/page/{id} 首屏，随后沿 next_cursor 连续请求若干次 /more
+- image        GET /image/{id}（签名 URL 重定向，不跟随）
+- heic         GET /api/proxy/heic
+
+报告每个场景的吞吐量、p50/p95/p99 延迟和错误率。上游放大倍数（每个请求引发的 Notion 调用数）
+无法在混合流量中归属到场景，因此 --mode isolated/both 会先逐个场景单独压测，再运行混合流量。
+
+    python benchmarks/load_test.py --users 32 --duration 30 --mix suffix=30,page_session=45,image=20,heic=5
+    python benchmarks/load_test.py --workers 4 --cache-backend sqlite --output load.json
+
+也可以在脚本中使用：LoadTest(bench, mix).run(users, duration)，并用 @scenario 注册新的场景。
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from run_benchmarks import Bench, git_revision, percentile
+
+DEFAULT_MIX = "suffix=30,page_session=45,image=20,heic=5"
+SCENARIOS: Dict[str, Callable[["VirtualUser"], Awaitable[None]]] = {}
+
+
+def scenario(func):
+    """Register an async ``func(user)`` as a load-test scenario under its function name."""
+    SCENARIOS[func.__name__] = func
+    return func
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario '{name}', choose from {', '.join(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+class Recorder:
+    """Per-scenario latency samples, errors and completed scenario runs."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.runs: Dict[str, int] = defaultdict(int)
+        self.recording = False
+
+    def record(self, name: str, elapsed_ms: float, ok: bool):
+        if not self.recording:
+            return
+        self.samples[name].append(elapsed_ms)
+        if not ok:
+            self.errors[name] += 1
+
+    def summary(self, elapsed: float) -> Dict[str, dict]:
+        result = {}
+        for name, samples in sorted(self.samples.items()):
+            result[name] = {
+                "requests": len(samples),
+                "scenario_runs": self.runs[name],
+                "throughput_rps": round(len(samples) / elapsed, 1),
+                "error_rate": round(self.errors[name] / len(samples), 4),
+                "p50_ms": round(percentile(samples, 50), 1),
+                "p95_ms": round(percentile(samples, 95), 1),
+                "p99_ms": round(percentile(samples, 99), 1),
+                "max_ms": round(max(samples), 1),
+            }
+        return result
+
+
+class VirtualUser:
+    """One simulated visitor with its own random stream; scenarios issue requests through ``get``."""
+
+    def __init__(self, test: "LoadTest", client: httpx.AsyncClient, seed: int):
+        self.test = test
+        self.client = client
+        self.random = random.Random(seed)
+        self.current = ""
+
+    async def get(self, path: str, **params) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await self.client.get(path, params=params or None)
+        except httpx.HTTPError:
+            self.test.recorder.record(self.current, (time.perf_counter() - started) * 1000, ok=False)
+            return None
+        self.test.recorder.record(self.current, (time.perf_counter() - started) * 1000, ok=response.status_code < 400)
+        return response
+
+    def zipf_choice(self, items: List[str], s: float = 1.1) -> str:
+        """Popular items first: item i is picked with weight 1 / (i + 1) ** s."""
+        weights = self.test.zipf_weights.setdefault((len(items), s), [1 / (i + 1) ** s for i in range(len(items))])
+        return self.random.choices(items, weights=weights)[0]
+
+    async def think(self):
+        if self.test.think_time > 0:
+            await asyncio.sleep(self.random.expovariate(1 / self.test.think_time))
+
+
+@scenario
+async def suffix(user: VirtualUser):
+    await user.get(f"/{user.zipf_choice(user.test.meta['suffixes'])}")
+
+
+@scenario
+async def page_session(user: VirtualUser):
+    """First screen, then zero to four /more calls as the reader scrolls; the long page gets longer reads."""
+    meta = user.test.meta
+    long_read = user.random.random() < 0.1
+    page_id = meta["long_page_id"] if long_read else user.zipf_choice(meta["page_ids"])
+    response = await user.get(f"/api/page/{page_id}", limit=15)
+    if response is None or response.status_code != 200:
+        return
+    cursor = response.json().get("next_cursor")
+    for _ in range(user.random.randint(2, 8) if long_read else user.random.randint(0, 4)):
+        if not cursor:
+            break
+        await user.think()
+        response = await user.get(f"/api/page/{page_id}/more", cursor=cursor, limit=50)
+        if response is None or response.status_code != 200:
+            break
+        cursor = response.json().get("next_cursor")
+
+
+@scenario
+async def image(user: VirtualUser):
+    await user.get(f"/image/{user.zipf_choice(user.test.meta['image_ids'])}")
+
+
+@scenario
+async def heic(user: VirtualUser):
+    await user.get("/api/proxy/heic", url=user.test.heic_url)
+
+
+class LoadTest:
+    """Closed-loop load generator: ``users`` concurrent visitors running a weighted scenario mix."""
+
+    def __init__(self, bench: Bench, mix: Dict[str, float], think_time: float = 0.2, seed: int = 44):
+        self.bench = bench
+        self.mix = mix
+        self.think_time = think_time
+        self.seed = seed
+        self.meta = bench.meta
+        self.heic_url = bench.stub_url + self.meta.get("heic_path", "/files/sample.heic")
+        self.zipf_weights: dict = {}
+        self.recorder = Recorder()
+
+    async def user_loop(self, client: httpx.AsyncClient, seed: int, stop_at: float):
+        user = VirtualUser(self, client, seed)
+        names, weights = list(self.mix), list(self.mix.values())
+        while time.monotonic() < stop_at:
+            user.current = user.random.choices(names, weights=weights)[0]
+            await SCENARIOS[user.current](user)
+            if self.recorder.recording:
+                self.recorder.runs[user.current] += 1
+            await user.think()
+
+    async def drive(self, users: int, duration: float, warmup: float):
+        limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+        async with httpx.AsyncClient(base_url=self.bench.app_url, timeout=30.0, limits=limits) as client:
+            stop_at = time.monotonic() + warmup + duration
+            tasks = [asyncio.ensure_future(self.user_loop(client, self.seed + i, stop_at)) for i in range(users)]
+            await asyncio.sleep(warmup)
+            before = self.bench.upstream_calls()
+            self.recorder.recording = True
+            started = time.monotonic()
+            await asyncio.sleep(duration)
+            self.recorder.recording = False
+            elapsed = time.monotonic() - started
+            after = self.bench.upstream_calls()
+            await asyncio.gather(*tasks)
+        return elapsed, after - before
+
+    def run(self, users: int, duration: float, warmup: float = 2.0) -> dict:
+        elapsed, calls = asyncio.run(self.drive(users, duration, warmup))
+        scenarios = self.recorder.summary(elapsed)
+        requests = sum(s["requests"] for s in scenarios.values())
+        errors = sum(self.recorder.errors.values())
+        upstream = calls.get("total", 0)
+        latencies = [sample for samples in self.recorder.samples.values() for sample in samples]
+        return {
+            "mix": self.mix,
+            "users": users,
+            "duration_s": round(elapsed, 1),
+            "requests": requests,
+            "throughput_rps": round(requests / elapsed, 1),
+            "error_rate": round(errors / requests, 4) if requests else 0.0,
+            "p50_ms": round(percentile(latencies, 50), 1) if latencies else None,
+            "p95_ms": round(percentile(latencies, 95), 1) if latencies else None,
+            "p99_ms": round(percentile(latencies, 99), 1) if latencies else None,
+            "upstream_calls": upstream,
+            "upstream_per_request": round(upstream / requests, 2) if requests else None,
+            "rate_limited": calls.get("rate_limited", 0),
+            "scenarios": scenarios,
+        }
+
+
+def print_report(label: str, report: dict):
+    print(f"\n== {label}: {report['users']} users, {report['duration_s']}s, {report['throughput_rps']} req/s, "
+          f"errors {report['error_rate']:.2%}, upstream/req {report['upstream_per_request']}, "
+          f"429s {report['rate_limited']}")
+    print(f"   {'scenario':14s} {'req':>6s} {'rps':>7s} {'err%':>6s} {'p50':>8s} {'p95':>8s} {'p99':>8s} {'max':>8s}")
+    for name, s in report["scenarios"].items():
+        print(f"   {name:14s} {s['requests']:6d} {s['throughput_rps']:7.1f} {s['error_rate'] * 100:6.2f} "
+              f"{s['p50_ms']:8.1f} {s['p95_ms']:8.1f} {s['p99_ms']:8.1f} {s['max_ms']:8.1f}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Concurrent load test with a production-like traffic mix")
+    parser.add_argument("--users", type=int, default=16, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=20.0, help="measured seconds per phase")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unmeasured seconds before each phase")
+    parser.add_argument("--think-time", type=float, default=0.2, help="mean pause between a user's requests")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="scenario weights, e.g. suffix=30,page_session=45")
+    parser.add_argument("--mode", choices=["mix", "isolated", "both"], default="both",
+                        help="isolated phases give per-scenario upstream amplification")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--cache-backend", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument("--fixtures", help="fixture JSON for the stub (default: synthetic fixtures)")
+    parser.add_argument("--latency", type=float, default=0.03)
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--rate-limit", type=float, default=0.0)
+    parser.add_argument("--heic-bytes", type=int, default=512 * 1024)
+    parser.add_argument("--stub-port", type=int, default=8765)
+    parser.add_argument("--app-port", type=int, default=8766)
+    parser.add_argument("--seed", type=int, default=44)
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--verbose", action="store_true", help="show application logs")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    app_env = {"CACHE_BACKEND": args.cache_backend}
+    if args.cache_backend == "sqlite":
+        app_env["CACHE_SQLITE_PATH"] = f"/tmp/notionimg-load-{args.app_port}.sqlite3"
+    bench = Bench(args, app_env=app_env)
+    phases = {}
+    try:
+        bench.start()
+        if args.mode in ("isolated", "both"):
+            for name in mix:
+                bench.wait_for_quiet()
+                phases[name] = LoadTest(bench, {name: 1.0}, args.think_time, args.seed).run(
+                    args.users, args.duration, args.warmup)
+                print_report(name, phases[name])
+        if args.mode in ("mix", "both"):
+            bench.wait_for_quiet()
+            phases["mix"] = LoadTest(bench, mix, args.think_time, args.seed).run(args.users, args.duration, args.warmup)
+            print_report("mix", phases["mix"])
+    finally:
+        bench.stop()
+
+    if args.output:
+        report = {
+            **git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "config": {key: getattr(args, key) for key in ("users", "duration", "think_time", "mix", "workers",
+                                                           "cache_backend", "latency", "jitter", "rate_limit")},
+            "phases": phases,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,614 @@
+"""
+本地 Notion API 替身：回放录制（或合成）的 fixtures，用于离线基准测试
+
+支持 main.py 用到的接口：databases.query（分页 + 简单 select 过滤）、blocks.retrieve、
+blocks.children.list（分页）、pages.retrieve，并提供一个 HEIC 样例文件供 /api/proxy/heic 使用。
+每个请求可以注入固定延迟、随机抖动和 429 限流，便于复现慢速或受限的 Notion。
+
+用法：
+    # 生成确定性的合成 fixtures（嵌套块、表格、分栏、1000 块长页面、代码密集页面等）
+    python benchmarks/notion_stub.py generate --output benchmarks/fixtures.json
+
+    # 用真实 token 录制数据库中的页面（NOTION_TOKEN / NOTION_DATABASE_ID）
+    python benchmarks/notion_stub.py record --output benchmarks/fixtures.json
+
+    # 启动替身，应用通过 NOTION_BASE_URL=http://127.0.0.1:8765 访问
+    python benchmarks/notion_stub.py serve --port 8765 --latency 0.05 --jitter 0.02 --rate-limit 0.01
+
+控制接口：GET /__stats（各接口调用次数）、POST /__reset（清零计数）、POST /__config（修改延迟/限流）
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import uuid
+from collections import Counter
+from typing import Dict, List, Optional
+
+from starlette.applications import Starlette
+from starlette.requests import ClientDisconnect, Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+DEFAULT_SEED = 43
+LONG_PAGE_BLOCKS = 1000
+CODE_PAGE_BLOCKS = 60
+TIMESTAMP = "2024-06-01T08:00:00.000Z"
+
+# 代码密集页面的代码块：各语言一段可重复的代码，按需要的行数循环展开（{i} 为行组序号）
+CODE_SAMPLES = {
+    "python": [
+        "@cached(ttl={i})",
+        "def load_slice_{i}(page_id: str, cursor=None, limit: int = 50) -> dict:",
+        "    \"\"\"Fetch one slice of blocks and record its cost.\"\"\"",
+        "    started = time.monotonic()  # wall clock",
+        "    blocks = [b for b in fetch(page_id, cursor) if b.get('type') != 'unsupported'][:limit]",
+        "    return {{'blocks': blocks, 'elapsed': time.monotonic() - started, 'id': f'{{page_id}}-{i}'}}",
+        "",
+    ],
+    "javascript": [
+        "export async function renderSlice{i}(container, blocks, options = {{}}) {{",
+        "    const html = await Promise.all(blocks.map(b => renderBlock(b, options)));  // keep order",
+        "    container.insertAdjacentHTML('beforeend', html.join(''));",
+        "    if (/^code-{i}/.test(container.id) && options.retries > {i}) return null;",
+        "    return {{ count: blocks.length, id: `slice-${{container.id}}-{i}` }};",
+        "}}",
+        "",
+    ],
+    "go": [
+        "// Slice{i} loads one page of blocks.",
+        "func (c *Client) Slice{i}(ctx context.Context, pageID string, limit int) ([]Block, error) {{",
+        "\tblocks := make([]Block, 0, limit)",
+        "\tif err := c.get(ctx, fmt.Sprintf(\"/blocks/%s/children?n=%d\", pageID, {i}), &blocks); err != nil {{",
+        "\t\treturn nil, err",
+        "\t}}",
+        "\treturn blocks, nil",
+        "}}",
+        "",
+    ],
+    "rust": [
+        "/// Loads slice {i} of a page.",
+        "pub fn load_slice_{i}(page: &Page, limit: usize) -> Result<Vec<Block>, Error> {{",
+        "    let blocks: Vec<Block> = page.blocks.iter().filter(|b| b.kind != Kind::Unsupported).take(limit).cloned().collect();",
+        "    println!(\"slice {{}} -> {{}} blocks\", {i}, blocks.len());",
+        "    Ok(blocks)",
+        "}}",
+        "",
+    ],
+    "sql": [
+        "-- slice {i}",
+        "SELECT b.id, b.type, b.payload FROM blocks b",
+        "JOIN pages p ON p.id = b.page_id AND p.archived = FALSE",
+        "WHERE b.sequence BETWEEN {i} * 50 AND ({i} + 1) * 50 AND b.type <> 'unsupported'",
+        "ORDER BY b.sequence LIMIT 50;",
+        "",
+    ],
+    "bash": [
+        "# warm slice {i}",
+        "for page in $(curl -s \"$BASE/api/pages\" | jq -r '.pages[].id'); do",
+        "    curl -s -o /dev/null -w \"%{{http_code}} $page\\n\" \"$BASE/api/page/$page?limit={i}\" || exit 1",
+        "done",
+        "",
+    ],
+}
+CODE_BLOCK_LINES = [12, 40, 150, 600]  # 代码块行数轮换：短代码在事件循环中高亮，长代码进入进程池
+
+# 最小的 HEIC 文件头（ftypheic），后面用确定性的填充字节补足大小
+HEIC_HEADER = b"\x00\x00\x00\x18ftypheic\x00\x00\x00\x00mif1heic"
+
+
+# ---------------------------------------------------------------------------
+# Fixtures
+# ---------------------------------------------------------------------------
+
+def rich_text(content: str, bold: bool = False, link: Optional[str] = None) -> List[dict]:
+    return [{
+        "type": "text",
+        "text": {"content": content, "link": {"url": link} if link else None},
+        "annotations": {"bold": bold, "italic": False, "strikethrough": False,
+                        "underline": False, "code": False, "color": "default"},
+        "plain_text": content,
+        "href": link
+    }]
+
+
+class FixtureBuilder:
+    """Deterministic synthetic workspace shaped like the real database."""
+
+    def __init__(self, seed: int = DEFAULT_SEED, file_base: str = "http://127.0.0.1:8765"):
+        self.random = random.Random(seed)
+        self.file_base = file_base
+        self.fixtures = {"meta": {"seed": seed}, "databases": {}, "pages": {}, "blocks": {}, "children": {}}
+
+    def new_id(self) -> str:
+        return str(uuid.UUID(int=self.random.getrandbits(128), version=4))
+
+    def sentence(self, index: int) -> str:
+        words = ["notion", "image", "server", "cache", "page", "block", "latency", "slice",
+                 "index", "render", "content", "network", "search", "table", "toggle"]
+        picked = [self.random.choice(words) for _ in range(self.random.randint(8, 24))]
+        return f"{index}. " + " ".join(picked).capitalize() + "."
+
+    def block(self, parent_id: str, block_type: str, content: dict, has_children: bool = False) -> dict:
+        block_id = self.new_id()
+        block = {
+            "object": "block",
+            "id": block_id,
+            "parent": {"type": "page_id", "page_id": parent_id},
+            "created_time": TIMESTAMP,
+            "last_edited_time": TIMESTAMP,
+            "has_children": has_children,
+            "archived": False,
+            "type": block_type,
+            block_type: content
+        }
+        self.fixtures["blocks"][block_id] = block
+        self.fixtures["children"].setdefault(parent_id, []).append(block_id)
+        return block
+
+    def text_block(self, parent_id: str, block_type: str, index: int, has_children: bool = False) -> dict:
+        content = {"rich_text": rich_text(self.sentence(index), bold=index % 5 == 0), "color": "default"}
+        if block_type == "callout":
+            content["icon"] = {"type": "emoji", "emoji": "💡"}
+        if block_type == "to_do":
+            content["checked"] = index % 2 == 0
+        return self.block(parent_id, block_type, content, has_children)
+
+    def nested(self, parent_id: str, block_type: str, index: int, depth: int = 2):
+        """A list item / toggle with ``depth`` levels of children."""
+        parent = self.text_block(parent_id, block_type, index, has_children=depth > 0)
+        if depth > 0:
+            for child in range(3):
+                self.nested(parent["id"], block_type if block_type != "toggle" else "paragraph",
+                            index * 10 + child, depth - 1 if block_type != "toggle" else 0)
+
+    def table(self, parent_id: str, rows: int = 8, width: int = 4):
+        table = self.block(parent_id, "table", {"table_width": width, "has_column_header": True,
+                                                "has_row_header": False}, has_children=True)
+        for row in range(rows):
+            cells = [rich_text(f"r{row}c{col} {self.random.randint(0, 9999)}") for col in range(width)]
+            self.block(table["id"], "table_row", {"cells": cells})
+
+    def columns(self, parent_id: str, count: int = 2):
+        column_list = self.block(parent_id, "column_list", {}, has_children=True)
+        for col in range(count):
+            column = self.block(column_list["id"], "column", {}, has_children=True)
+            for i in range(3):
+                self.text_block(column["id"], "paragraph", col * 10 + i)
+
+    def image(self, parent_id: str, index: int):
+        self.block(parent_id, "image", {
+            "type": "file",
+            "file": {"url": f"{self.file_base}/files/image-{index}.png", "expiry_time": "2099-01-01T00:00:00.000Z"},
+            "caption": rich_text(f"Figure {index}")
+        })
+
+    def code(self, parent_id: str, index: int):
+        source = "\n".join(f"def step_{index}_{i}(x):\n    return x * {i}" for i in range(6))
+        self.block(parent_id, "code", {"rich_text": rich_text(source), "language": "python", "caption": []})
+
+    def code_listing(self, parent_id: str, language: str, lines: int):
+        """A code block of about ``lines`` lines, split into 2000-character rich_text items like Notion does."""
+        template = CODE_SAMPLES[language]
+        source = "\n".join(template[i % len(template)].format(i=i // len(template)) for i in range(lines))
+        segments = [item for start in range(0, len(source), 2000) for item in rich_text(source[start:start + 2000])]
+        self.block(parent_id, "code", {"rich_text": segments, "language": language, "caption": []})
+
+    def code_page_content(self, page_id: str, blocks: int):
+        """Code-heavy page: two of every three blocks are code listings of rotating size and language."""
+        languages = list(CODE_SAMPLES)
+        for i in range(blocks):
+            if i % 3 == 0:
+                self.text_block(page_id, "heading_2" if i % 12 == 0 else "paragraph", i)
+            else:
+                n = i - i // 3 - 1
+                self.code_listing(page_id, languages[n % len(languages)], CODE_BLOCK_LINES[n % len(CODE_BLOCK_LINES)])
+
+    def page_content(self, page_id: str, blocks: int):
+        """Mixed content: headings, paragraphs, nested lists, toggles, tables, columns, images and code."""
+        for i in range(blocks):
+            kind = i % 20
+            if kind == 0:
+                self.text_block(page_id, "heading_2", i)
+            elif kind == 4:
+                self.nested(page_id, "bulleted_list_item", i)
+            elif kind == 7:
+                self.nested(page_id, "toggle", i)
+            elif kind == 9:
+                self.table(page_id)
+            elif kind == 12:
+                self.columns(page_id)
+            elif kind == 14:
+                self.image(page_id, i)
+            elif kind == 16:
+                self.code(page_id, i)
+            elif kind == 18:
+                self.text_block(page_id, "callout", i)
+            else:
+                self.text_block(page_id, "paragraph", i)
+
+    def child_page(self, parent_id: str, title: str, blocks: int = 10) -> dict:
+        """A sub-page: a child_page block in the parent plus a page object with its own content."""
+        block = self.block(parent_id, "child_page", {"title": title}, has_children=True)
+        page = {
+            "object": "page",
+            "id": block["id"],
+            "created_time": TIMESTAMP,
+            "last_edited_time": TIMESTAMP,
+            "archived": False,
+            "cover": None,
+            "icon": None,
+            "parent": {"type": "page_id", "page_id": parent_id},
+            "properties": {"title": {"id": "title", "type": "title", "title": rich_text(title)}},
+            "url": f"https://www.notion.so/{block['id'].replace('-', '')}"
+        }
+        self.fixtures["pages"][block["id"]] = page
+        self.page_content(block["id"], blocks)
+        return page
+
+    def database_page(self, database_id: str, title: str, page_type: str, suffix: str = "",
+                      hidden: bool = False, content_url: Optional[str] = None) -> dict:
+        page_id = self.new_id()
+        edited = f"2024-06-{self.random.randint(1, 28):02d}T{self.random.randint(0, 23):02d}:00:00.000Z"
+        properties = {
+            "Name": {"id": "title", "type": "title", "title": rich_text(title)},
+            "type": {"id": "type", "type": "select", "select": {"name": page_type}},
+            "Hidden": {"id": "hidden", "type": "select", "select": {"name": "True" if hidden else "False"}},
+            "suffix": {"id": "suffix", "type": "rich_text", "rich_text": rich_text(suffix) if suffix else []}
+        }
+        if content_url:
+            properties["Content"] = {"id": "content", "type": "files", "files": [
+                {"name": title, "type": "file", "file": {"url": content_url, "expiry_time": "2099-01-01T00:00:00.000Z"}}
+            ]}
+        page = {
+            "object": "page",
+            "id": page_id,
+            "created_time": TIMESTAMP,
+            "last_edited_time": edited,
+            "archived": False,
+            "cover": None,
+            "icon": None,
+            "parent": {"type": "database_id", "database_id": database_id},
+            "properties": properties,
+            "url": f"https://www.notion.so/{page_id.replace('-', '')}"
+        }
+        self.fixtures["pages"][page_id] = page
+        self.fixtures["databases"][database_id].append(page_id)
+        # 页面本身也可以作为块读取（blocks.retrieve）
+        self.fixtures["blocks"][page_id] = {
+            "object": "block", "id": page_id, "type": "child_page", "has_children": True,
+            "created_time": TIMESTAMP, "last_edited_time": edited,
+            "parent": {"type": "database_id", "database_id": database_id},
+            "child_page": {"title": title}
+        }
+        return page
+
+    def build(self, pages: int = 60, blocks_per_page: int = 60) -> dict:
+        database_id = self.new_id()
+        self.fixtures["databases"][database_id] = []
+        suffixes = ["blog", "notes", "docs", ""]
+        visible, child_pages = [], []
+        for i in range(pages):
+            hidden = i % 15 == 14
+            page = self.database_page(database_id, f"Page {i}", "page", suffix=suffixes[i % len(suffixes)],
+                                      hidden=hidden)
+            self.page_content(page["id"], blocks_per_page)
+            if not hidden:
+                visible.append(page["id"])
+            if i % 5 == 0:
+                # 子页面（第一个还有一层孙页面），用于层级索引
+                child = self.child_page(page["id"], f"Page {i} / Child A")
+                child_pages.append(child["id"])
+                child_pages.append(self.child_page(child["id"], f"Page {i} / Child A / Nested")["id"])
+                child_pages.append(self.child_page(page["id"], f"Page {i} / Child B")["id"])
+        long_page = self.database_page(database_id, "Long page", "page", suffix="long")
+        self.page_content(long_page["id"], LONG_PAGE_BLOCKS)
+        code_page = self.database_page(database_id, "Code page", "page", suffix="code")
+        self.code_page_content(code_page["id"], CODE_PAGE_BLOCKS)
+        for i in range(20):
+            self.database_page(database_id, f"Image {i}", "image", content_url=f"{self.file_base}/files/image-{i}.png")
+        for i in range(10):
+            self.database_page(database_id, f"File {i}", "file", content_url=f"{self.file_base}/files/file-{i}.pdf")
+
+        self.fixtures["meta"].update({
+            "database_id": database_id,
+            "page_ids": visible,
+            "long_page_id": long_page["id"],
+            "code_page_id": code_page["id"],
+            "child_page_ids": child_pages,
+            "heic_path": "/files/sample.heic"
+        })
+        return self.fixtures
+
+
+def record_fixtures(token: str, database_id: str, max_pages: Optional[int] = None) -> dict:
+    """Crawl a real database (pages, metadata and every child block) into the fixture format."""
+    from notion_client import Client
+
+    client = Client(auth=token, timeout_ms=60000)
+    fixtures = {"meta": {"recorded": True, "database_id": database_id}, "databases": {database_id: []},
+                "pages": {}, "blocks": {}, "children": {}}
+
+    def crawl_children(parent_id: str):
+        cursor = None
+        while True:
+            params = {"block_id": parent_id, "page_size": 100}
+            if cursor:
+                params["start_cursor"] = cursor
+            response = client.blocks.children.list(**params)
+            for block in response["results"]:
+                fixtures["blocks"][block["id"]] = block
+                fixtures["children"].setdefault(parent_id, []).append(block["id"])
+                if block.get("has_children") and block["type"] != "child_page":
+                    crawl_children(block["id"])
+            if not response.get("has_more"):
+                break
+            cursor = response["next_cursor"]
+
+    cursor = None
+    while True:
+        params = {"database_id": database_id, "page_size": 100}
+        if cursor:
+            params["start_cursor"] = cursor
+        response = client.databases.query(**params)
+        for page in response["results"]:
+            fixtures["pages"][page["id"]] = page
+            fixtures["databases"][database_id].append(page["id"])
+        if not response.get("has_more") or (max_pages and len(fixtures["pages"]) >= max_pages):
+            break
+        cursor = response["next_cursor"]
+
+    page_ids = list(fixtures["pages"])[:max_pages] if max_pages else list(fixtures["pages"])
+    for page_id in page_ids:
+        fixtures["blocks"][page_id] = client.blocks.retrieve(block_id=page_id)
+        crawl_children(page_id)
+
+    visible = [pid for pid in page_ids
+               if fixtures["pages"][pid]["properties"].get("type", {}).get("select", {}).get("name") == "page"]
+    fixtures["meta"]["page_ids"] = visible
+    fixtures["meta"]["long_page_id"] = max(visible, key=lambda pid: len(fixtures["children"].get(pid, [])), default=None)
+    fixtures["meta"]["heic_path"] = "/files/sample.heic"
+    return fixtures
+
+
+# ---------------------------------------------------------------------------
+# Server
+# ---------------------------------------------------------------------------
+
+def matches_filter(page: dict, condition: Optional[dict]) -> bool:
+    """Evaluate the subset of database filters main.py uses: and/or of select/rich_text equals."""
+    if not condition:
+        return True
+    if "and" in condition:
+        return all(matches_filter(page, c) for c in condition["and"])
+    if "or" in condition:
+        return any(matches_filter(page, c) for c in condition["or"])
+    prop = page["properties"].get(condition.get("property"), {})
+    if "select" in condition:
+        value = (prop.get("select") or {}).get("name")
+        return value == condition["select"].get("equals")
+    if "rich_text" in condition:
+        value = "".join(t.get("plain_text", "") for t in prop.get("rich_text", []))
+        return value == condition["rich_text"].get("equals")
+    return True
+
+
+def paginate(ids: List[str], start_cursor: Optional[str], page_size: int):
+    start = 0
+    if start_cursor:
+        try:
+            start = ids.index(start_cursor)
+        except ValueError:
+            return None
+    chunk = ids[start:start + page_size]
+    end = start + len(chunk)
+    next_cursor = ids[end] if end < len(ids) else None
+    return chunk, next_cursor
+
+
+def describe_fixtures(fixtures: dict) -> dict:
+    """Fixture metadata plus the image/file page IDs and suffixes load generators pick from."""
+    meta = dict(fixtures.get("meta", {}))
+    by_type: Dict[str, List[str]] = {}
+    suffixes = set()
+    for page_id, page in fixtures["pages"].items():
+        properties = page.get("properties", {})
+        page_type = (properties.get("type", {}).get("select") or {}).get("name")
+        by_type.setdefault(page_type, []).append(page_id)
+        suffix = "".join(t.get("plain_text", "") for t in properties.get("suffix", {}).get("rich_text", []))
+        if page_type == "page" and suffix.strip():
+            suffixes.add(suffix.strip())
+    meta.setdefault("image_ids", by_type.get("image", []))
+    meta.setdefault("file_ids", by_type.get("file", []))
+    meta.setdefault("suffixes", sorted(suffixes))
+    return meta
+
+
+def notion_error(status: int, code: str, message: str, headers: Optional[Dict[str, str]] = None) -> JSONResponse:
+    return JSONResponse({"object": "error", "status": status, "code": code, "message": message},
+                        status_code=status, headers=headers)
+
+
+class NotionStub:
+    """Replays fixtures over HTTP with injectable latency and rate limiting."""
+
+    def __init__(self, fixtures: dict, latency: float = 0.0, jitter: float = 0.0, rate_limit: float = 0.0,
+                 retry_after: float = 0.0, heic_bytes: int = 512 * 1024, seed: int = DEFAULT_SEED):
+        self.fixtures = fixtures
+        self.meta = describe_fixtures(fixtures)
+        self.config = {"latency": latency, "jitter": jitter, "rate_limit": rate_limit, "retry_after": retry_after}
+        self.random = random.Random(seed)
+        self.stats = Counter()
+        filler = bytes(range(256)) * (heic_bytes // 256 + 1)
+        self.heic = (HEIC_HEADER + filler)[:max(heic_bytes, len(HEIC_HEADER))]
+
+    async def upstream(self, operation: str) -> Optional[Response]:
+        """Count the call, wait the configured latency and maybe answer 429 instead."""
+        self.stats[operation] += 1
+        self.stats["total"] += 1
+        delay = self.config["latency"] + self.random.uniform(0, self.config["jitter"])
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self.config["rate_limit"] and self.random.random() < self.config["rate_limit"]:
+            self.stats["rate_limited"] += 1
+            return notion_error(429, "rate_limited", "You have been rate limited.",
+                                headers={"Retry-After": str(self.config["retry_after"])})
+        return None
+
+    async def query_database(self, request: Request) -> Response:
+        limited = await self.upstream("databases.query")
+        if limited:
+            return limited
+        database_id = request.path_params["database_id"]
+        page_ids = self.fixtures["databases"].get(database_id)
+        if page_ids is None:
+            return notion_error(404, "object_not_found", f"Could not find database with ID: {database_id}.")
+        try:
+            raw = await request.body()
+        except ClientDisconnect:  # 基准测试在请求过程中结束了应用进程
+            return Response(status_code=499)
+        body = json.loads(raw) if raw else {}
+        selected = [pid for pid in page_ids if matches_filter(self.fixtures["pages"][pid], body.get("filter"))]
+        window = paginate(selected, body.get("start_cursor"), min(int(body.get("page_size", 100)), 100))
+        if window is None:
+            return notion_error(400, "validation_error", "start_cursor is invalid.")
+        chunk, next_cursor = window
+        return JSONResponse({
+            "object": "list",
+            "results": [self.fixtures["pages"][pid] for pid in chunk],
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None,
+            "type": "page_or_database"
+        })
+
+    async def retrieve_block(self, request: Request) -> Response:
+        limited = await self.upstream("blocks.retrieve")
+        if limited:
+            return limited
+        block = self.fixtures["blocks"].get(request.path_params["block_id"])
+        if block is None:
+            return notion_error(404, "object_not_found", f"Could not find block with ID: {request.path_params['block_id']}.")
+        return JSONResponse(block)
+
+    async def list_children(self, request: Request) -> Response:
+        limited = await self.upstream("blocks.children.list")
+        if limited:
+            return limited
+        block_id = request.path_params["block_id"]
+        if block_id not in self.fixtures["blocks"] and block_id not in self.fixtures["children"]:
+            return notion_error(404, "object_not_found", f"Could not find block with ID: {block_id}.")
+        ids = self.fixtures["children"].get(block_id, [])
+        window = paginate(ids, request.query_params.get("start_cursor"),
+                          min(int(request.query_params.get("page_size", 100)), 100))
+        if window is None:
+            return notion_error(400, "validation_error", "start_cursor is invalid.")
+        chunk, next_cursor = window
+        return JSONResponse({
+            "object": "list",
+            "results": [self.fixtures["blocks"][cid] for cid in chunk],
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None,
+            "type": "block"
+        })
+
+    async def retrieve_page(self, request: Request) -> Response:
+        limited = await self.upstream("pages.retrieve")
+        if limited:
+            return limited
+        page = self.fixtures["pages"].get(request.path_params["page_id"])
+        if page is None:
+            return notion_error(404, "object_not_found", f"Could not find page with ID: {request.path_params['page_id']}.")
+        return JSONResponse(page)
+
+    async def serve_file(self, request: Request) -> Response:
+        self.stats["files"] += 1
+        if request.path_params["name"].endswith(".heic"):
+            return Response(self.heic, media_type="image/heic")
+        return Response(HEIC_HEADER, media_type="application/octet-stream")
+
+    async def get_stats(self, request: Request) -> Response:
+        return JSONResponse({"calls": dict(self.stats), "config": self.config, "meta": self.meta})
+
+    async def reset(self, request: Request) -> Response:
+        self.stats.clear()
+        return JSONResponse({"reset": True})
+
+    async def configure(self, request: Request) -> Response:
+        updates = await request.json()
+        for key in self.config:
+            if key in updates:
+                self.config[key] = float(updates[key])
+        return JSONResponse(self.config)
+
+    def app(self) -> Starlette:
+        return Starlette(routes=[
+            Route("/v1/databases/{database_id}/query", self.query_database, methods=["POST"]),
+            Route("/v1/blocks/{block_id}/children", self.list_children, methods=["GET"]),
+            Route("/v1/blocks/{block_id}", self.retrieve_block, methods=["GET"]),
+            Route("/v1/pages/{page_id}", self.retrieve_page, methods=["GET"]),
+            Route("/files/{name}", self.serve_file, methods=["GET"]),
+            Route("/__stats", self.get_stats, methods=["GET"]),
+            Route("/__reset", self.reset, methods=["POST"]),
+            Route("/__config", self.configure, methods=["POST"]),
+        ])
+
+
+def load_fixtures(path: Optional[str], file_base: str) -> dict:
+    if path:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    return FixtureBuilder(file_base=file_base).build()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Local Notion API stand-in for offline benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve = sub.add_parser("serve", help="serve fixtures over HTTP")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--fixtures", help="fixture JSON (default: synthetic fixtures generated in memory)")
+    serve.add_argument("--latency", type=float, default=0.0, help="seconds added to every upstream call")
+    serve.add_argument("--jitter", type=float, default=0.0, help="extra uniform random delay (seconds)")
+    serve.add_argument("--rate-limit", type=float, default=0.0, help="fraction of calls answered with 429")
+    serve.add_argument("--retry-after", type=float, default=0.0, help="Retry-After value sent with 429s")
+    serve.add_argument("--heic-bytes", type=int, default=512 * 1024)
+
+    generate = sub.add_parser("generate", help="write synthetic fixtures")
+    generate.add_argument("--output", required=True)
+    generate.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    generate.add_argument("--file-base", default="http://127.0.0.1:8765")
+
+    record = sub.add_parser("record", help="record fixtures from the real Notion API")
+    record.add_argument("--output", required=True)
+    record.add_argument("--max-pages", type=int)
+
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        fixtures = FixtureBuilder(seed=args.seed, file_base=args.file_base).build()
+    elif args.command == "record":
+        token, database_id = os.environ.get("NOTION_TOKEN"), os.environ.get("NOTION_DATABASE_ID")
+        if not token or not database_id:
+            print("NOTION_TOKEN and NOTION_DATABASE_ID are required for recording", file=sys.stderr)
+            return 1
+        fixtures = record_fixtures(token, database_id, args.max_pages)
+    else:
+        import uvicorn
+
+        fixtures = load_fixtures(args.fixtures, f"http://{args.host}:{args.port}")
+        stub = NotionStub(fixtures, latency=args.latency, jitter=args.jitter, rate_limit=args.rate_limit,
+                          retry_after=args.retry_after, heic_bytes=args.heic_bytes)
+        uvicorn.run(stub.app(), host=args.host, port=args.port, log_level="warning")
+        return 0
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(fixtures, f, ensure_ascii=False)
+    print(f"Wrote {len(fixtures['pages'])} pages and {len(fixtures['blocks'])} blocks to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+页面索引内存基准：10k/100k 页数据库下 PageRecord 索引与原来的 dict 记录占用的内存（tracemalloc）
+
+纯进程内测量，不需要替身和应用进程。每个页面先生成与 Notion 查询结果解析后相同的独立字符串
+（ID、标题、时间戳、数据库 ID、suffix），建好索引条目后丢弃原始数据，只统计索引保留的内存：
+- dicts    原实现：pages_data 中每页一个 Page(...).dict()（edit_date 重复 last_edited_time），
+           带 suffix 的页面在 suffix_pages 中再存一份 dict
+- records  PageRecord（__slots__，重复字符串驻留）只存一份，SuffixRouter 按 ID 引用
+
+    python benchmarks/page_index_memory.py --pages 10000 --pages 100000
+"""
+import argparse
+import gc
+import json
+import random
+import sys
+import time
+import tracemalloc
+import uuid
+from typing import Callable, Dict, Iterator
+
+from run_benchmarks import git_revision, import_app
+
+
+def notion_pages(count: int, seed: int = 3) -> Iterator[dict]:
+    """Parsed database query results, reduced to the fields the index reads; every string is a fresh object."""
+    rng = random.Random(seed)
+    database_id = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+    for index in range(count):
+        # 批量导入和批量编辑使大量页面共享同一时间戳
+        edited = f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:00:00.000Z"
+        created = f"2023-{rng.randint(1, 12):02d}-01T00:00:00.000Z"
+        yield {
+            "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "title": f"Page {index} " + "notion " * rng.randint(1, 6),
+            "last_edited_time": edited,
+            "created_time": created,
+            "parent_id": "".join(database_id),
+            "suffix": f"page-{index // 2}" if index % 3 else "",
+        }
+
+
+def dict_index(main, pages: Iterator[dict]) -> tuple:
+    """pages_data and suffix_pages as built before PageRecord."""
+    pages_data: Dict[str, dict] = {}
+    suffix_pages: Dict[str, list] = {}
+    for page in pages:
+        record = {**page, "edit_date": page["last_edited_time"], "show_back": True}
+        pages_data[page["id"]] = record
+        if page["suffix"]:
+            group = suffix_pages.setdefault(page["suffix"], [])
+            if not any(p["id"] == page["id"] for p in group):
+                group.append(dict(record))
+    return pages_data, suffix_pages
+
+
+def record_index(main, pages: Iterator[dict]) -> tuple:
+    """pages_data of PageRecord plus the SuffixRouter that references them by ID, as install_index builds them."""
+    pages_data = {}
+    routes = main.SuffixRouter()
+    for page in pages:
+        record = main.PageRecord(**page)
+        pages_data[record.id] = record
+        if record.suffix:
+            routes.add(record.suffix, record.id)
+    return pages_data, routes
+
+
+def traced(build: Callable, main, count: int) -> dict:
+    gc.collect()
+    tracemalloc.start()
+    index = build(main, notion_pages(count))
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del index
+    return {"mb": round(current / 1024 / 1024, 1), "peak_mb": round(peak / 1024 / 1024, 1),
+            "bytes_per_page": round(current / count)}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Memory held by the page index at large database sizes")
+    parser.add_argument("--pages", type=int, action="append", help="database sizes (default: 10000, 100000)")
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    main_module = import_app()
+    report = {**git_revision(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": []}
+    for count in args.pages or [10000, 100000]:
+        for name, build in (("dicts", dict_index), ("records", record_index)):
+            result = {"pages": count, "index": name, **traced(build, main_module, count)}
+            report["results"].append(result)
+            print(f"{count:7d} pages  {name:8s} {result['mb']:7.1f} MB  ({result['bytes_per_page']:5d} B/page, "
+                  f"peak {result['peak_mb']:7.1f} MB)")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""
+响应负载基准：代表性页面在 full 和 compact 两种响应配置下的大小（解码后和实际传输的压缩字节数）
+
+启动本地 Notion 替身和应用，按前端的读取方式（首屏 limit=15，之后连续 /more）读取整页，
+分别统计 profile=full（默认，含原始 rich_text、debug_info 和 _sequence/_batch 等字段）和 profile=compact 的字节数。
+页面：普通页面（嵌套列表、表格、分栏）、1000 块长页面和代码密集页面。
+
+    python benchmarks/payload_size.py
+    python benchmarks/payload_size.py --encoding gzip --output payload.json
+"""
+import argparse
+import json
+import sys
+import time
+from typing import Dict, List
+
+from run_benchmarks import Bench, git_revision
+
+PROFILES = ["full", "compact"]
+
+
+def read_page(bench: Bench, page_id: str, profile: str, encoding: str) -> Dict[str, float]:
+    """Whole page in the given profile; returns request count, blocks and decoded/on-the-wire bytes."""
+    headers = {"Accept-Encoding": encoding}
+    response = bench.client.get(f"/api/page/{page_id}", params={"limit": 15, "profile": profile}, headers=headers)
+    requests, size, wire = 1, len(response.content), response.num_bytes_downloaded
+    blocks = len(response.json()["blocks"])
+    cursor = response.json().get("next_cursor")
+    while cursor:
+        response = bench.client.get(f"/api/page/{page_id}/more",
+                                    params={"cursor": cursor, "limit": 50, "profile": profile}, headers=headers)
+        requests += 1
+        size += len(response.content)
+        wire += response.num_bytes_downloaded
+        blocks += len(response.json()["blocks"])
+        cursor = response.json().get("next_cursor")
+    return {"requests": requests, "blocks": blocks, "kb": size / 1024, "wire_kb": wire / 1024}
+
+
+def measure_page(bench: Bench, name: str, page_id: str, encoding: str) -> dict:
+    result = {"page": name, "page_id": page_id}
+    for profile in PROFILES:
+        # 清除首屏缓存，两种配置都从同一状态开始读取
+        bench.invalidate(page_id)
+        bench.wait_for_quiet()
+        r = read_page(bench, page_id, profile, encoding)
+        result[profile] = {"requests": r["requests"], "blocks": r["blocks"],
+                           "kb": round(r["kb"], 1), "wire_kb": round(r["wire_kb"], 1)}
+    result["saved_pct"] = round(100 * (1 - result["compact"]["kb"] / result["full"]["kb"]), 1)
+    result["wire_saved_pct"] = round(100 * (1 - result["compact"]["wire_kb"] / result["full"]["wire_kb"]), 1)
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Response payload size per profile on representative pages")
+    parser.add_argument("--encoding", default="br, gzip", help="Accept-Encoding sent with every request")
+    parser.add_argument("--fixtures", help="fixture JSON for the stub (default: synthetic fixtures)")
+    parser.add_argument("--latency", type=float, default=0.0, help="stub latency per Notion call (seconds)")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--stub-port", type=int, default=8765)
+    parser.add_argument("--app-port", type=int, default=8769)
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--verbose", action="store_true", help="show application logs")
+    args = parser.parse_args()
+    args.rate_limit, args.heic_bytes = 0.0, 1024
+
+    bench = Bench(args, app_env={"CACHE_BACKEND": "memory"})
+    report = {**git_revision(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+              "config": {"encoding": args.encoding}, "pages": []}
+    try:
+        bench.start()
+        pages: List[tuple] = [("page", bench.meta["page_ids"][0]), ("long", bench.meta["long_page_id"]),
+                              ("code", bench.meta["code_page_id"])]
+        for name, page_id in pages:
+            result = measure_page(bench, name, page_id, args.encoding)
+            report["pages"].append(result)
+            full, compact = result["full"], result["compact"]
+            print(f"{name:5s} {full['blocks']:5d} blocks  {full['requests']:3d} requests  "
+                  f"full {full['kb']:8.1f} KB ({full['wire_kb']:7.1f} KB sent)  "
+                  f"compact {compact['kb']:8.1f} KB ({compact['wire_kb']:7.1f} KB sent)  "
+                  f"-{result['saved_pct']:4.1f}% (-{result['wire_saved_pct']:4.1f}% sent)")
+    finally:
+        bench.stop()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
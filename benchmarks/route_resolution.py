@@ -0,0 +1,128 @@
+"""
+suffix 路由基准：SuffixRouter 与原来的 suffix_pages（suffix -> 页面 dict 列表）在不同索引规模下的构建和解析耗时
+
+纯进程内测量，不需要替身和应用进程。合成的页面索引中约一半页面带 suffix，每 10 个 suffix 中有一个由 3 个页面共享。
+- legacy  原实现：插入时用 any() 线性去重，每次解析都格式化全部 suffix 的日志参数再查表、拼接重定向地址
+          （原实现解析前还会调用 init_pages()，这里不计入）
+- router  SuffixRouter：有序集合去重，重定向地址在插入时预先计算，解析只做规范化和两次字典查找
+
+    python benchmarks/route_resolution.py --pages 1000 --pages 10000 --pages 100000
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+import uuid
+from typing import Dict, List, Tuple
+
+from run_benchmarks import git_revision, import_app
+
+
+class LegacySuffixPages:
+    """The suffix index as it was before SuffixRouter, reproduced for comparison."""
+
+    def __init__(self):
+        self.suffix_pages: Dict[str, List[dict]] = {}
+
+    def add(self, suffix: str, page: dict):
+        if suffix not in self.suffix_pages:
+            self.suffix_pages[suffix] = []
+        if not any(p["id"] == page["id"] for p in self.suffix_pages[suffix]):
+            self.suffix_pages[suffix].append(page)
+
+    def resolve(self, suffix: str):
+        # 原实现的日志参数在日志级别过滤之前就已求值
+        _ = f"Available suffixes: {list(self.suffix_pages.keys())}"
+        pages = self.suffix_pages.get(suffix, [])
+        if not pages:
+            return False, None
+        if len(pages) == 1:
+            return True, f"/static/page.html?id={pages[0]['id']}"
+        return True, None
+
+
+def synthetic_pages(count: int, seed: int = 7) -> List[Tuple[str, str]]:
+    """(page_id, suffix) pairs; an empty suffix means the page is not routable."""
+    rng = random.Random(seed)
+    pages = []
+    for index in range(count):
+        page_id = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+        if index % 2:
+            pages.append((page_id, ""))
+            continue
+        group = index // 2
+        # 每 10 个 suffix 中有一个由 3 个页面共享
+        suffix = f"group-{group // 3}" if group % 10 < 3 else f"page-{group}"
+        pages.append((page_id, suffix))
+    return pages
+
+
+def timed(function, *args) -> float:
+    started = time.perf_counter()
+    function(*args)
+    return (time.perf_counter() - started) * 1000
+
+
+def measure(main, pages: List[Tuple[str, str]], lookups: int) -> dict:
+    suffixes = sorted({suffix for _, suffix in pages if suffix})
+    rng = random.Random(11)
+    # 九成命中，一成不存在的 suffix
+    queries = [rng.choice(suffixes) if rng.random() < 0.9 else f"missing-{i}" for i in range(lookups)]
+    result = {"pages": len(pages), "suffixes": len(suffixes), "lookups": lookups}
+
+    def build_router():
+        router = main.SuffixRouter()
+        for page_id, suffix in pages:
+            if suffix:
+                router.add(suffix, page_id)
+        return router
+
+    def build_legacy():
+        legacy = LegacySuffixPages()
+        for page_id, suffix in pages:
+            if suffix:
+                legacy.add(suffix, {"id": page_id, "title": suffix, "suffix": suffix})
+        return legacy
+
+    router = build_router()
+    result["router_build_ms"] = round(statistics.median(timed(build_router) for _ in range(3)), 2)
+    result["router_resolve_us"] = round(timed(lambda: [router.resolve(q) for q in queries]) * 1000 / lookups, 3)
+
+    legacy = build_legacy()
+    result["legacy_build_ms"] = round(statistics.median(timed(build_legacy) for _ in range(3)), 2)
+    # 原实现每次解析都是 O(suffix 数)，大索引上减少次数
+    legacy_lookups = queries[:max(10, lookups * 1000 // max(len(suffixes), 1))]
+    result["legacy_resolve_us"] = round(timed(lambda: [legacy.resolve(q) for q in legacy_lookups]) * 1000
+                                        / len(legacy_lookups), 3)
+
+    assert all(router.resolve(q) == legacy.resolve(q) for q in queries[:200]), "router and legacy disagree"
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Suffix route index build and lookup micro-benchmark")
+    parser.add_argument("--pages", type=int, action="append", help="index sizes (default: 1000, 10000, 100000)")
+    parser.add_argument("--lookups", type=int, default=100000, help="resolutions per index size")
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    main_module = import_app()
+    report = {**git_revision(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": []}
+    for count in args.pages or [1000, 10000, 100000]:
+        r = measure(main_module, synthetic_pages(count), args.lookups)
+        report["results"].append(r)
+        print(f"{r['pages']:7d} pages {r['suffixes']:6d} suffixes  build router {r['router_build_ms']:8.1f} ms "
+              f"legacy {r['legacy_build_ms']:8.1f} ms  resolve router {r['router_resolve_us']:7.3f} us "
+              f"legacy {r['legacy_resolve_us']:10.3f} us")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,310 @@
+"""
+端到端基准测试：启动本地 Notion 替身和应用，逐个场景测量延迟、上游调用次数和内存
+
+完全离线运行，结果写入 JSON（包含 git commit），可以与之前的结果对比：
+    python benchmarks/run_benchmarks.py --output before.json
+    python benchmarks/run_benchmarks.py --output after.json --compare before.json
+
+场景：
+- init_pages       GET /api/pages（INDEX_CACHE_TTL=0，每次都完整分页查询数据库）
+- get_page_cold    清除首屏缓存后 GET /api/page/{id}
+- get_page_warm    命中首屏缓存的 GET /api/page/{id}
+- get_more_blocks  逐段读取 1000 块长页面的 /more
+- proxy_heic_image GET /api/proxy/heic（从替身下载 HEIC 样例）
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STUB = os.path.join(ROOT, "benchmarks", "notion_stub.py")
+BENCH_TOKEN = "bench-invalidation-token"
+SCENARIOS = ["init_pages", "get_page_cold", "get_page_warm", "get_more_blocks", "proxy_heic_image"]
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def rss_mb(pid: int) -> Dict[str, float]:
+    """Current and peak resident set size of ``pid`` (Linux /proc)."""
+    usage = {}
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith(("VmRSS:", "VmHWM:")):
+                    key, value = line.split(":", 1)
+                    usage[key] = int(value.split()[0]) / 1024
+    except OSError:
+        return {}
+    return {"rss_mb": round(usage.get("VmRSS", 0.0), 1), "peak_rss_mb": round(usage.get("VmHWM", 0.0), 1)}
+
+
+def git_revision() -> Dict[str, object]:
+    def git(*args) -> str:
+        try:
+            return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, timeout=30).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ""
+    return {"commit": git("rev-parse", "--short", "HEAD"), "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def import_app():
+    """Import main in this process for in-process micro-benchmarks (no stub, no startup tasks)."""
+    os.environ.setdefault("NOTION_TOKEN", "bench")
+    os.environ.setdefault("NOTION_DATABASE_ID", "bench")
+    os.environ.setdefault("CACHE_BACKEND", "memory")
+    os.chdir(ROOT)  # main 按相对路径挂载 static/
+    sys.path.insert(0, ROOT)
+    import main
+    return main
+
+
+def wait_until_ready(url: str, timeout: float = 60.0):
+    started = time.monotonic()
+    while time.monotonic() - started < timeout:
+        try:
+            if httpx.get(url, timeout=2.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"{url} did not become ready within {timeout:.0f}s")
+
+
+class Bench:
+    """Owns the stub and app processes and runs the scenarios against them."""
+
+    def __init__(self, args, app_env: Optional[Dict[str, str]] = None):
+        self.args = args
+        self.app_env = app_env if app_env is not None else {"INDEX_CACHE_TTL": "0", "CACHE_BACKEND": "memory"}
+        self.stub_url = f"http://127.0.0.1:{args.stub_port}"
+        self.app_url = f"http://127.0.0.1:{args.app_port}"
+        self.processes: List[subprocess.Popen] = []
+        self.client = httpx.Client(base_url=self.app_url, timeout=60.0)
+        self.meta: dict = {}
+
+    def start(self):
+        self.start_stub()
+        self.start_app()
+
+    def app_environment(self) -> Dict[str, str]:
+        env = {
+            **os.environ,
+            "NOTION_BASE_URL": self.stub_url,
+            "NOTION_TOKEN": "bench",
+            "NOTION_DATABASE_ID": self.meta["database_id"],
+            "CACHE_INVALIDATION_TOKEN": BENCH_TOKEN,
+            **self.app_env,
+        }
+        env.pop("STALE_SNAPSHOT_DIR", None)
+        return env
+
+    def start_stub(self):
+        stub_cmd = [sys.executable, STUB, "serve", "--port", str(self.args.stub_port),
+                    "--latency", str(self.args.latency), "--jitter", str(self.args.jitter),
+                    "--rate-limit", str(self.args.rate_limit), "--heic-bytes", str(self.args.heic_bytes)]
+        if self.args.fixtures:
+            stub_cmd += ["--fixtures", self.args.fixtures]
+        self.processes.append(subprocess.Popen(stub_cmd, cwd=ROOT))
+        wait_until_ready(f"{self.stub_url}/__stats")
+        self.meta = httpx.get(f"{self.stub_url}/__stats").json()["meta"]
+
+    def start_app(self):
+        self.app = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(self.args.app_port), "--log-level", "warning",
+             "--workers", str(getattr(self.args, "workers", 1))],
+            cwd=ROOT, env=self.app_environment(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL if not self.args.verbose else None
+        )
+        self.processes.append(self.app)
+        wait_until_ready(f"{self.app_url}/health")
+        self.wait_for_quiet()
+
+    def stop(self):
+        self.client.close()
+        for process in reversed(self.processes):
+            process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    def upstream_calls(self) -> Counter:
+        return Counter(httpx.get(f"{self.stub_url}/__stats").json()["calls"])
+
+    def wait_for_quiet(self, settle: float = 0.5, timeout: float = 60.0):
+        """Wait until background work (cache warming, prefetch) stops calling the stub."""
+        started = time.monotonic()
+        previous = self.upstream_calls()
+        while time.monotonic() - started < timeout:
+            time.sleep(settle)
+            current = self.upstream_calls()
+            if current == previous:
+                return
+            previous = current
+
+    def invalidate(self, page_id: Optional[str] = None):
+        body = {"page_id": page_id} if page_id else {"all": True}
+        self.client.post("/api/cache/invalidate", json=body, headers={"Authorization": f"Bearer {BENCH_TOKEN}"})
+
+    def timed(self, path: str, **params):
+        """GET ``path`` and return ``(response, elapsed_ms)``."""
+        started = time.perf_counter()
+        response = self.client.get(path, params=params)
+        return response, (time.perf_counter() - started) * 1000
+
+    def measure(self, name: str, scenario: Callable[[], List[Callable[[], tuple]]]) -> dict:
+        """
+        Run the scenario's request thunks one at a time. Each thunk returns ``(response, elapsed_ms)``
+        so setup requests it makes (cache invalidation, first screen) stay out of the timing.
+        """
+        thunks = scenario()
+        self.wait_for_quiet()
+        before_calls = self.upstream_calls()
+        before_memory = rss_mb(self.app.pid)
+        samples, errors = [], 0
+        for thunk in thunks:
+            response, elapsed = thunk()
+            samples.append(elapsed)
+            if response.status_code >= 400:
+                errors += 1
+        # 后台预取、预热等上游调用也计入该场景
+        self.wait_for_quiet()
+        calls = self.upstream_calls() - before_calls
+        calls.pop("files", None)
+        rate_limited = calls.pop("rate_limited", 0)
+        total = calls.pop("total", 0)
+        after_memory = rss_mb(self.app.pid)
+        result = {
+            "requests": len(samples),
+            "errors": errors,
+            "p50_ms": round(percentile(samples, 50), 2),
+            "p95_ms": round(percentile(samples, 95), 2),
+            "p99_ms": round(percentile(samples, 99), 2),
+            "mean_ms": round(statistics.fmean(samples), 2),
+            "upstream_calls": total,
+            "upstream_per_request": round(total / len(samples), 2),
+            "upstream_breakdown": dict(calls),
+            "rate_limited": rate_limited,
+            **after_memory,
+            "rss_delta_mb": round(after_memory.get("rss_mb", 0.0) - before_memory.get("rss_mb", 0.0), 1),
+        }
+        print(f"{name:18s} p50 {result['p50_ms']:8.1f}ms  p95 {result['p95_ms']:8.1f}ms  "
+              f"p99 {result['p99_ms']:8.1f}ms  upstream/req {result['upstream_per_request']:6.2f}  "
+              f"rss {result.get('rss_mb', 0):6.1f}MB")
+        return result
+
+    # 场景：返回请求函数列表，初始化请求（如预热缓存）在返回前完成 ----------------
+
+    def init_pages(self):
+        return [lambda: self.timed("/api/pages") for _ in range(self.args.iterations)]
+
+    def get_page_cold(self):
+        page_ids = self.meta["page_ids"]
+
+        def request(page_id):
+            self.invalidate(page_id)
+            return self.timed(f"/api/page/{page_id}", limit=15)
+        return [lambda page_id=page_ids[i % len(page_ids)]: request(page_id) for i in range(self.args.iterations)]
+
+    def get_page_warm(self):
+        page_id = self.meta["page_ids"][0]
+        self.client.get(f"/api/page/{page_id}", params={"limit": 15})
+        return [lambda: self.timed(f"/api/page/{page_id}", limit=15) for _ in range(self.args.iterations)]
+
+    def get_more_blocks(self):
+        """Walk the long page slice by slice; start over from the first screen once it is exhausted."""
+        page_id = self.meta["long_page_id"]
+        state = {"cursor": None}
+
+        def next_slice():
+            if state["cursor"] is None:
+                self.invalidate(page_id)
+                state["cursor"] = self.client.get(f"/api/page/{page_id}", params={"limit": 15}).json()["next_cursor"]
+            response, elapsed = self.timed(f"/api/page/{page_id}/more", cursor=state["cursor"], limit=self.args.more_limit)
+            state["cursor"] = response.json().get("next_cursor") if response.status_code == 200 else None
+            return response, elapsed
+        return [next_slice for _ in range(self.args.iterations)]
+
+    def proxy_heic_image(self):
+        url = self.stub_url + self.meta.get("heic_path", "/files/sample.heic")
+        return [lambda: self.timed("/api/proxy/heic", url=url) for _ in range(self.args.iterations)]
+
+    def run(self, scenarios: List[str]) -> dict:
+        results = {}
+        for name in scenarios:
+            results[name] = self.measure(name, getattr(self, name))
+        return results
+
+
+def print_comparison(current: dict, baseline: dict):
+    print(f"\nCompared with {baseline.get('commit', '?')} ({baseline.get('timestamp', '?')}):")
+    for name, result in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if not before:
+            continue
+        deltas = []
+        for key in ("p50_ms", "p95_ms", "p99_ms", "upstream_per_request", "rss_mb"):
+            old, new = before.get(key), result.get(key)
+            if not old or new is None:
+                continue
+            deltas.append(f"{key} {old}->{new} ({(new - old) / old * 100:+.1f}%)")
+        print(f"  {name}: " + ", ".join(deltas))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmarks against a local Notion stub")
+    parser.add_argument("--iterations", type=int, default=40)
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS, help="run only these scenarios")
+    parser.add_argument("--fixtures", help="fixture JSON for the stub (default: synthetic fixtures)")
+    parser.add_argument("--latency", type=float, default=0.03, help="stub latency per Notion call (seconds)")
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="fraction of Notion calls answered with 429")
+    parser.add_argument("--heic-bytes", type=int, default=2 * 1024 * 1024)
+    parser.add_argument("--more-limit", type=int, default=50)
+    parser.add_argument("--stub-port", type=int, default=8765)
+    parser.add_argument("--app-port", type=int, default=8766)
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--compare", help="baseline JSON from an earlier run")
+    parser.add_argument("--verbose", action="store_true", help="show application logs")
+    args = parser.parse_args()
+
+    bench = Bench(args)
+    try:
+        bench.start()
+        results = bench.run(args.scenario or SCENARIOS)
+    finally:
+        bench.stop()
+
+    report = {
+        **git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "config": {key: getattr(args, key) for key in ("iterations", "latency", "jitter", "rate_limit",
+                                                       "heic_bytes", "more_limit", "fixtures")},
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print_comparison(report, json.load(f))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+序列化基准：1000 块长页面（处理后的块）和页面列表在不同 JSON 序列化方式下的耗时
+
+先启动本地 Notion 替身和应用，用 /more 读取长页面全部处理后的块（full 配置，与 API 响应相同）和 /api/pages，
+然后在本进程中重复序列化同一份数据：
+- fastapi   处理函数返回 dict 时 FastAPI 的默认路径（jsonable_encoder + JSONResponse，标准库 json）
+- stdlib    FastJSONResponse 在未安装 orjson 时的回退路径（跳过 jsonable_encoder，紧凑分隔符）
+- orjson    FastJSONResponse（需要安装 orjson）
+
+    python benchmarks/serialization.py --runs 50
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from typing import Callable, Dict
+
+from run_benchmarks import Bench, git_revision, import_app, percentile
+
+
+def load_payloads(bench: Bench) -> Dict[str, object]:
+    """The long page as one /api/page-shaped response plus the page list, exactly as the app serves them."""
+    page_id = bench.meta["long_page_id"]
+    first = bench.client.get(f"/api/page/{page_id}", params={"limit": 15}).json()
+    blocks, cursor = first["blocks"], first.get("next_cursor")
+    while cursor:
+        data = bench.client.get(f"/api/page/{page_id}/more", params={"cursor": cursor, "limit": 100}).json()
+        blocks += data["blocks"]
+        cursor = data.get("next_cursor")
+    page = {**first, "blocks": blocks, "has_more": False, "next_cursor": None}
+    return {"long_page": page, "pages": bench.client.get("/api/pages").json()}
+
+
+def serializers() -> Dict[str, Callable[[object], bytes]]:
+    """Render functions for each mode, imported from the app in this process."""
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    main = import_app()
+
+    def stdlib(content) -> bytes:
+        saved, main.orjson = main.orjson, None
+        try:
+            return main.FastJSONResponse(content).body
+        finally:
+            main.orjson = saved
+
+    modes = {
+        "fastapi": lambda content: JSONResponse(jsonable_encoder(content)).body,
+        "stdlib": stdlib,
+    }
+    if main.orjson:
+        modes["orjson"] = lambda content: main.FastJSONResponse(content).body
+    return modes
+
+
+def measure(render: Callable[[object], bytes], content, runs: int) -> dict:
+    size = len(render(content))  # 预热
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        render(content)
+        samples.append((time.perf_counter() - started) * 1000)
+    median = statistics.median(samples)
+    return {"kb": round(size / 1024, 1), "p50_ms": round(median, 2), "p95_ms": round(percentile(samples, 95), 2),
+            "mb_per_s": round(size / 1024 / 1024 / (median / 1000), 1)}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="JSON serialization time for a 1000-block page and the page list")
+    parser.add_argument("--runs", type=int, default=30, help="serializations per mode and payload")
+    parser.add_argument("--fixtures", help="fixture JSON for the stub (default: synthetic fixtures)")
+    parser.add_argument("--stub-port", type=int, default=8765)
+    parser.add_argument("--app-port", type=int, default=8770)
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--verbose", action="store_true", help="show application logs")
+    args = parser.parse_args()
+    args.latency, args.jitter, args.rate_limit, args.heic_bytes = 0.0, 0.0, 0.0, 1024
+
+    bench = Bench(args, app_env={"CACHE_BACKEND": "memory"})
+    try:
+        bench.start()
+        payloads = load_payloads(bench)
+    finally:
+        bench.stop()
+
+    report = {**git_revision(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+              "config": {"runs": args.runs, "blocks": len(payloads["long_page"]["blocks"]),
+                         "pages": len(payloads["pages"]["pages"])}, "results": []}
+    for mode, render in serializers().items():
+        for name, content in payloads.items():
+            result = {"mode": mode, "payload": name, **measure(render, content, args.runs)}
+            report["results"].append(result)
+            print(f"{mode:8s} {name:10s} {result['kb']:8.1f} KB  p50 {result['p50_ms']:7.2f} ms  "
+                  f"p95 {result['p95_ms']:7.2f} ms  {result['mb_per_s']:6.1f} MB/s")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
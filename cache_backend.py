@@ -0,0 +1,240 @@
+"""
+可插拔的缓存后端
+
+页面索引、首屏内容和签名文件 URL 都通过 CacheBackend 读写：
+- MemoryCache：进程内 LRU（默认，单进程部署）
+- SQLiteCache：本地磁盘上的 SQLite（WAL 模式），同一台机器上的多个 uvicorn worker 共享一份缓存
+
+通过环境变量 CACHE_BACKEND=memory|sqlite 选择，SQLite 文件位置由 CACHE_SQLITE_PATH 指定。
+值必须可以序列化为 JSON（SQLiteCache 会序列化，MemoryCache 直接保存对象）。
+
+以 pinned_prefixes 中任一前缀开头的键（页面索引、层级索引、跨 worker 锁）不计入容量，也不会因容量被淘汰，
+只按自身的 ttl 过期：它们被淘汰会导致重复查询整个数据库，或者两个 worker 同时拿到锁。
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Iterable, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # 未安装 orjson 时使用标准库
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "memory").lower()
+CACHE_SQLITE_PATH = os.environ.get("CACHE_SQLITE_PATH", "/tmp/notionimg-cache.sqlite3")
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", "2000"))
+
+
+def _dumps(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _loads(raw: bytes) -> Any:
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+
+class CacheBackend:
+    """Key/value cache interface shared by all backends. ``ttl`` is in seconds; None means no expiry."""
+
+    pinned_prefixes: Tuple[str, ...] = ()
+
+    def is_pinned(self, key: str) -> bool:
+        return key.startswith(self.pinned_prefixes)
+
+    def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        raise NotImplementedError
+
+    async def set_async(self, key: str, value: Any, ttl: Optional[float] = None):
+        """``set`` for large values written from the event loop; backends doing I/O run it in a thread."""
+        self.set(key, value, ttl)
+
+    def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        """Store ``value`` only if ``key`` is absent (or expired); used as a cross-worker lock."""
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def keys(self, prefix: str = "") -> List[str]:
+        raise NotImplementedError
+
+    def clear(self, prefix: str = ""):
+        for key in self.keys(prefix):
+            self.delete(key)
+
+    def count(self, prefix: str = "") -> int:
+        return len(self.keys(prefix))
+
+
+class MemoryCache(CacheBackend):
+    """In-process LRU with per-entry expiry; pinned keys live in a separate dict outside the LRU."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, pinned_prefixes: Iterable[str] = ()):
+        self.max_entries = max_entries
+        self.pinned_prefixes = tuple(pinned_prefixes)
+        self.entries: "OrderedDict[str, Tuple[Optional[float], Any]]" = OrderedDict()
+        self.pinned: dict = {}
+
+    def _store(self, key: str) -> dict:
+        return self.pinned if self.is_pinned(key) else self.entries
+
+    def _live(self, key: str) -> Optional[Tuple[Optional[float], Any]]:
+        store = self._store(key)
+        entry = store.get(key)
+        if entry is None:
+            return None
+        if entry[0] is not None and entry[0] <= time.time():
+            del store[key]
+            return None
+        return entry
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._live(key)
+        if entry is None:
+            return None
+        if key in self.entries:
+            self.entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        entry = (time.time() + ttl if ttl is not None else None, value)
+        if self.is_pinned(key):
+            self.pinned[key] = entry
+            return
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        if self._live(key) is not None:
+            return False
+        self.set(key, value, ttl)
+        return True
+
+    def delete(self, key: str):
+        self._store(key).pop(key, None)
+
+    def keys(self, prefix: str = "") -> List[str]:
+        now = time.time()
+        return [key for store in (self.pinned, self.entries) for key, (expires_at, _) in store.items()
+                if key.startswith(prefix) and (expires_at is None or expires_at > now)]
+
+
+class SQLiteCache(CacheBackend):
+    """
+    Cache shared by every process on the host through one SQLite file in WAL mode.
+
+    Each operation is a single short statement on a local file (well under a millisecond
+    for page-sized values), so it is called directly from the event loop; whole-index values
+    go through ``set_async``, which serializes and writes them in a thread.
+    """
+
+    name = "sqlite"
+    PRUNE_EVERY = 200  # 每写入若干次清理一次过期条目
+
+    def __init__(self, path: str = CACHE_SQLITE_PATH, max_entries: int = CACHE_MAX_ENTRIES,
+                 pinned_prefixes: Iterable[str] = ()):
+        self.path = path
+        self.max_entries = max_entries
+        self.pinned_prefixes = tuple(pinned_prefixes)
+        self.local = threading.local()
+        self.writes = 0
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL, updated_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_updated ON cache (updated_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        row = self._connection().execute(
+            "SELECT value FROM cache WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time())
+        ).fetchone()
+        return _loads(row[0]) if row else None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        now = time.time()
+        self._connection().execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at, updated_at) VALUES (?, ?, ?, ?)",
+            (key, _dumps(value), now + ttl if ttl is not None else None, now)
+        )
+        self._maybe_prune()
+
+    async def set_async(self, key: str, value: Any, ttl: Optional[float] = None):
+        await asyncio.to_thread(self.set, key, value, ttl)
+
+    def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        now = time.time()
+        conn = self._connection()
+        conn.execute("DELETE FROM cache WHERE key = ? AND expires_at IS NOT NULL AND expires_at <= ?", (key, now))
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO cache (key, value, expires_at, updated_at) VALUES (?, ?, ?, ?)",
+            (key, _dumps(value), now + ttl if ttl is not None else None, now)
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, key: str):
+        self._connection().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def keys(self, prefix: str = "") -> List[str]:
+        rows = self._connection().execute(
+            "SELECT key FROM cache WHERE substr(key, 1, ?) = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (len(prefix), prefix, time.time())
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def clear(self, prefix: str = ""):
+        self._connection().execute("DELETE FROM cache WHERE substr(key, 1, ?) = ?", (len(prefix), prefix))
+
+    def _maybe_prune(self):
+        self.writes += 1
+        if self.writes % self.PRUNE_EVERY:
+            return
+        conn = self._connection()
+        conn.execute("DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+        # 超出容量时淘汰最久未写入的条目，固定的键不计入容量
+        unpinned = "".join(" AND substr(key, 1, ?) != ?" for _ in self.pinned_prefixes)
+        params = [value for prefix in self.pinned_prefixes for value in (len(prefix), prefix)]
+        conn.execute(
+            "DELETE FROM cache WHERE key IN (SELECT key FROM cache WHERE 1 = 1" + unpinned +
+            " ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+            (*params, self.max_entries)
+        )
+
+
+def create_cache_backend(kind: str = CACHE_BACKEND, pinned_prefixes: Iterable[str] = ()) -> CacheBackend:
+    """Build the configured backend, falling back to MemoryCache if SQLite cannot be opened."""
+    if kind == "sqlite":
+        try:
+            return SQLiteCache(pinned_prefixes=pinned_prefixes)
+        except sqlite3.Error as e:
+            logger.warning(f"SQLite cache at {CACHE_SQLITE_PATH} unavailable, using in-process cache: {e}")
+    elif kind != "memory":
+        logger.warning(f"Unknown CACHE_BACKEND '{kind}', using in-process cache")
+    return MemoryCache(pinned_prefixes=pinned_prefixes)
@@ -0,0 +1,231 @@
+"""
+代码块的服务端语法高亮（可选）
+
+安装 Pygments 后，块处理时把 code 块的源码切分为记号，输出与 highlight.js 类名相同（hljs-keyword、hljs-string 等）
+的 HTML，前端沿用现有的 highlight.js 主题直接插入，不再在浏览器中高亮。未安装 Pygments、语言无法识别、
+代码超过 CODE_HIGHLIGHT_MAX_CHARS 或在请求截止时间内没有完成时不输出，前端照旧用 highlight.js 高亮。
+
+- 结果按 (语言, 源码) 的哈希缓存在进程内 LRU 中，同一段代码只高亮一次；并发请求同一段代码时共享同一个任务
+- 短代码直接在事件循环中处理（约 3ms / 千字符）；长代码交给进程池（CODE_HIGHLIGHT_WORKERS，为 0 时使用线程池；
+  运行环境不支持多进程时，例如没有 /dev/shm 的 serverless 平台，自动改用线程池）
+- Pygments、各语言的词法分析器和 multiprocessing 在第一次用到时才导入，不影响冷启动；短代码的词法分析器第一次加载也在线程中完成
+"""
+import asyncio
+import hashlib
+import html
+import importlib.util
+import itertools
+import logging
+import os
+from collections import Counter, OrderedDict
+from typing import TYPE_CHECKING, Dict, Optional
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+CODE_HIGHLIGHT = os.environ.get("CODE_HIGHLIGHT", "true").lower() != "false"
+# 进程池只有在有空闲 CPU 时才有意义，单核时默认用线程池（避免启动工作进程的开销）
+CODE_HIGHLIGHT_WORKERS = int(os.environ.get("CODE_HIGHLIGHT_WORKERS", str(max(0, min(2, (os.cpu_count() or 1) - 1)))))
+CODE_HIGHLIGHT_MAX_CHARS = int(os.environ.get("CODE_HIGHLIGHT_MAX_CHARS", "100000"))
+CODE_HIGHLIGHT_CACHE_ENTRIES = int(os.environ.get("CODE_HIGHLIGHT_CACHE_ENTRIES", "1000"))
+INLINE_MAX_CHARS = 2000  # 不超过该长度的代码直接在事件循环中处理
+
+# 只检查是否安装，导入推迟到第一次高亮
+PYGMENTS_AVAILABLE = importlib.util.find_spec("pygments") is not None
+
+# Notion 的语言名 -> Pygments 词法分析器名（None 表示不高亮）；其余名称 Pygments 可以直接识别（c++、c#、shell 等）
+LANGUAGE_ALIASES = {
+    "plain text": None,
+    "mermaid": None,
+    "markup": "html",
+    "flow": "javascript",
+    "java/c/c++/c#": "java",
+    "visual basic": "vbnet",
+    "webassembly": "wast",
+    "reason": "reasonml",
+}
+
+# Pygments 记号类型 -> highlight.js 类名；未列出的类型沿父类型查找，运算符、标点等不加样式
+TOKEN_CLASSES = {
+    "Keyword": "keyword",
+    "Keyword.Constant": "literal",
+    "Keyword.Type": "type",
+    "Name.Builtin": "built_in",
+    "Name.Builtin.Pseudo": "variable language_",
+    "Name.Function": "title function_",
+    "Name.Class": "title class_",
+    "Name.Exception": "title class_",
+    "Name.Decorator": "meta",
+    "Name.Tag": "name",
+    "Name.Attribute": "attr",
+    "Name.Variable": "variable",
+    "Name.Constant": "variable constant_",
+    "Name.Label": "symbol",
+    "Name.Entity": "symbol",
+    "Literal": "literal",
+    "Literal.String": "string",
+    "Literal.String.Regex": "regexp",
+    "Literal.String.Escape": "char escape_",
+    "Literal.String.Interpol": "subst",
+    "Literal.Number": "number",
+    "Operator.Word": "keyword",
+    "Comment": "comment",
+    "Comment.Preproc": "meta",
+    "Comment.PreprocFile": "string",
+    "Generic.Deleted": "deletion",
+    "Generic.Inserted": "addition",
+    "Generic.Heading": "section",
+    "Generic.Subheading": "section",
+    "Generic.Emph": "emphasis",
+    "Generic.Strong": "strong",
+}
+
+# 每个进程（包括进程池中的工作进程）各自缓存词法分析器和记号类型的类名
+_lexers: Dict[str, object] = {}
+_token_classes: Dict[object, Optional[str]] = {}
+
+
+def resolve_language(language: Optional[str]) -> Optional[str]:
+    name = (language or "").strip().lower()
+    return LANGUAGE_ALIASES.get(name, name) or None
+
+
+def token_class(ttype) -> Optional[str]:
+    if ttype not in _token_classes:
+        node = ttype
+        # str(Token.Keyword.Type) == "Token.Keyword.Type"
+        while node is not None and str(node)[6:] not in TOKEN_CLASSES:
+            node = node.parent
+        _token_classes[ttype] = TOKEN_CLASSES[str(node)[6:]] if node is not None else None
+    return _token_classes[ttype]
+
+
+def get_lexer(name: str):
+    lexer = _lexers.get(name)
+    if lexer is None:
+        from pygments.lexers import get_lexer_by_name
+        # 保留源码原样：不去掉首尾空行，不补末尾换行
+        lexer = _lexers[name] = get_lexer_by_name(name, stripnl=False, ensurenl=False)
+    return lexer
+
+
+def render_html(lexer_name: str, source: str) -> Optional[str]:
+    """Tokenize ``source`` and wrap styled runs in highlight.js class spans; None for unknown languages."""
+    from pygments.util import ClassNotFound
+    try:
+        lexer = get_lexer(lexer_name)
+    except ClassNotFound:
+        return None
+    parts = []
+    for css, tokens in itertools.groupby(lexer.get_tokens(source), key=lambda token: token_class(token[0])):
+        text = html.escape("".join(value for _, value in tokens), quote=False)
+        parts.append(f'<span class="hljs-{css}">{text}</span>' if css else text)
+    return "".join(parts)
+
+
+class CodeHighlighter:
+    """
+    Server-side highlighting for code blocks, with an LRU of rendered HTML keyed by (language, source).
+
+    Short snippets whose lexer is already loaded render on the event loop; everything else runs in
+    a process pool (the default thread pool when ``workers`` is 0) so tokenizing never stalls requests.
+    """
+
+    def __init__(self, enabled: bool = CODE_HIGHLIGHT and PYGMENTS_AVAILABLE, workers: int = CODE_HIGHLIGHT_WORKERS,
+                 max_chars: int = CODE_HIGHLIGHT_MAX_CHARS, max_entries: int = CODE_HIGHLIGHT_CACHE_ENTRIES):
+        self.enabled = enabled
+        self.workers = workers
+        self.max_chars = max_chars
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, Optional[str]]" = OrderedDict()
+        self.pending: Dict[str, asyncio.Future] = {}
+        self.pool: Optional["ProcessPoolExecutor"] = None
+        self.stats = Counter(hits=0, inline=0, offloaded=0, timeouts=0, skipped=0, failures=0)
+
+    def _remember(self, key: str, rendered: Optional[str]):
+        self.entries[key] = rendered
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def _executor(self) -> Optional["ProcessPoolExecutor"]:
+        if self.workers <= 0:
+            return None
+        if self.pool is None:
+            try:
+                # multiprocessing 和进程池在第一次处理长代码时才导入，不影响冷启动
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                # 事件循环和 Notion 线程池已在运行，fork 不安全，工作进程用 spawn 启动
+                self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+            except (OSError, NotImplementedError, ImportError) as e:
+                logger.warning(f"Process pool unavailable, highlighting long snippets in threads: {e}")
+                self.workers = 0
+        return self.pool
+
+    async def highlight(self, language: Optional[str], source: str, timeout: Optional[float] = None) -> Optional[str]:
+        """
+        Highlighted HTML for ``source``, or None to leave the block to the browser: highlighting is off,
+        the language is plain text or unknown, the snippet is too long, or rendering did not finish
+        within ``timeout`` seconds (it still completes in the background and lands in the cache).
+        """
+        lexer_name = resolve_language(language)
+        if not self.enabled or lexer_name is None or not source or len(source) > self.max_chars:
+            self.stats["skipped"] += 1
+            return None
+
+        key = hashlib.sha1(f"{lexer_name}\0{source}".encode("utf-8")).hexdigest()
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return self.entries[key]
+
+        if len(source) <= INLINE_MAX_CHARS and lexer_name in _lexers:
+            try:
+                rendered = render_html(lexer_name, source)
+            except Exception as e:
+                logger.warning(f"Code highlighting failed for {lexer_name} ({len(source)} chars): {e}")
+                self.stats["failures"] += 1
+                return None
+            self.stats["inline"] += 1
+            self._remember(key, rendered)
+            return rendered
+
+        task = self.pending.get(key)
+        if task is None:
+            task = self.pending[key] = asyncio.ensure_future(self._render_off_loop(key, lexer_name, source))
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            return None
+
+    async def _render_off_loop(self, key: str, lexer_name: str, source: str) -> Optional[str]:
+        # 短代码只是词法分析器还没加载：在线程中加载，之后同一语言的短代码直接在事件循环中处理
+        executor = self._executor() if len(source) > INLINE_MAX_CHARS else None
+        try:
+            rendered = await asyncio.get_running_loop().run_in_executor(executor, render_html, lexer_name, source)
+        except Exception as e:
+            logger.warning(f"Code highlighting failed for {lexer_name} ({len(source)} chars): {e}")
+            self.stats["failures"] += 1
+            if executor is not None:
+                from concurrent.futures.process import BrokenProcessPool
+                if isinstance(e, BrokenProcessPool):
+                    self.pool = None
+            return None
+        finally:
+            self.pending.pop(key, None)
+        self.stats["offloaded"] += 1
+        self._remember(key, rendered)
+        return rendered
+
+    def snapshot(self) -> dict:
+        return {"enabled": self.enabled, "pool_workers": self.workers if self.pool else 0,
+                "cached": len(self.entries), **self.stats}
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
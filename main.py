@@ -1,13 +1,47 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Query, Body, Header
 from fastapi.responses import RedirectResponse, JSONResponse, FileResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from notion_client import Client
+from notion_api import AsyncNotion, NotionUnavailable, TokenBucket, request_deadline, remaining_time
+from snapshots import SnapshotStore
+from cache_backend import create_cache_backend
+from highlighting import CodeHighlighter
 import os
+import sys
 import logging
+import mimetypes
+import asyncio
+import time
+import re
+import html
+import hmac
+import hashlib
+import math
+from bisect import bisect_left
+from operator import itemgetter
+import heapq
+from collections import Counter, OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime
 from typing import List, Dict, Optional
 import httpx
-from pydantic import BaseModel
+from starlette.datastructures import Headers, MutableHeaders
+import gzip
+import stat
+import anyio
+
+import json
+
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖，缺失时回退到 gzip
+    brotli = None
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖，缺失时回退到标准库 json
+    orjson = None
 
 # Configure logging
 logging.basicConfig(
@@ -32,56 +66,738 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 响应压缩配置
+COMPRESSION_MINIMUM_SIZE = 1024  # 小于该字节数的 JSON 不压缩
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+def choose_encoding(accept_encoding: str, available: List[str]) -> Optional[str]:
+    """Pick the first encoding from ``available`` that the client accepts."""
+    accepted = set()
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0"):
+            continue
+        accepted.add(name.strip())
+    for encoding in available:
+        if encoding in accepted:
+            return encoding
+    return None
+
+def compress_body(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+class JSONCompressionMiddleware:
+    """Compress JSON API responses above a size threshold (brotli preferred, gzip fallback)."""
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encodings = ["br", "gzip"] if brotli else ["gzip"]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+        if not encoding:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        body_parts = []
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if "application/json" not in headers.get("content-type", "") or "content-encoding" in headers:
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message
+                return
+
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            # 缓冲完整响应体后一次性压缩（API JSON 均为非流式响应）
+            body_parts.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            body = b"".join(body_parts)
+            headers = MutableHeaders(raw=list(start_message["headers"]))
+            if len(body) >= self.minimum_size:
+                body = compress_body(body, encoding)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+            headers["Content-Length"] = str(len(body))
+            start_message["headers"] = headers.raw
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
+
+app.add_middleware(JSONCompressionMiddleware)
+
+# 按需性能剖析：仅在设置 PROFILING_TOKEN 时导入并挂载，默认关闭且没有任何额外开销
+if os.environ.get("PROFILING_TOKEN"):
+    import profiling
+    app.add_middleware(profiling.RouteProfilingMiddleware)
+    app.include_router(profiling.router)
+
+# 预压缩静态资源的后缀（由 precompress_static.py 生成）
+PRECOMPRESSED_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles that serves ``.br``/``.gz`` siblings when the client accepts them and the sibling
+    is at least as new as the source file; stale or orphaned variants fall back to the source.
+    """
+
+    def lookup_variant(self, path: str, suffix: str):
+        full_path, stat_result = self.lookup_path(path + suffix)
+        if not stat_result or not stat.S_ISREG(stat_result.st_mode):
+            return full_path, None
+        # 修改源文件后没有重新运行 precompress_static.py 时，压缩副本比源文件旧，不能使用
+        _, source_stat = self.lookup_path(path)
+        if not source_stat or source_stat.st_mtime > stat_result.st_mtime:
+            return full_path, None
+        return full_path, stat_result
+
+    async def get_response(self, path: str, scope) -> Response:
+        accept_encoding = Headers(scope=scope).get("accept-encoding", "")
+        candidates = list(PRECOMPRESSED_SUFFIXES)
+        # 首选编码的副本过期时依次尝试下一个（br -> gzip），都不可用时返回源文件
+        while encoding := choose_encoding(accept_encoding, candidates):
+            candidates.remove(encoding)
+            full_path, stat_result = await anyio.to_thread.run_sync(
+                self.lookup_variant, path, PRECOMPRESSED_SUFFIXES[encoding]
+            )
+            if stat_result:
+                response = self.file_response(full_path, stat_result, scope)
+                media_type, _ = mimetypes.guess_type(path)
+                media_type = media_type or "application/octet-stream"
+                if media_type.startswith("text/"):
+                    media_type += "; charset=utf-8"
+                response.headers["Content-Type"] = media_type
+                response.headers["Content-Encoding"] = encoding
+                response.headers.add_vary_header("Accept-Encoding")
+                return response
+        return await super().get_response(path, scope)
+
 # Mount static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
+app.mount("/static", PrecompressedStaticFiles(directory="static"), name="static")
 
 # Initialize Notion client with timeout settings
-try:
-    notion = Client(
+# 所有 Notion 调用都经由 AsyncNotion 在专用线程池中执行，不阻塞事件循环
+# NOTION_BASE_URL 可指向本地的 Notion API 替身（见 benchmarks/notion_stub.py）
+NOTION_BASE_URL = os.environ.get("NOTION_BASE_URL", "https://api.notion.com").rstrip("/")
+
+def create_notion_client() -> Client:
+    return Client(
         auth=os.environ.get("NOTION_TOKEN"),
-        timeout_ms=30000  # 30 second timeout
+        timeout_ms=30000,  # 30 second timeout
+        base_url=NOTION_BASE_URL
     )
-except Exception as e:
-    logger.error(f"Failed to initialize Notion client: {e}")
-    notion = None
+
+# 客户端（httpx 传输层、TLS 证书加载）在首次使用时才创建，缩短冷启动的导入时间
+notion = AsyncNotion(client_factory=create_notion_client)
+# 层级索引的后台扫描共用客户端，但限速（Notion 对每个集成平均约 3 次/秒，给实时请求留出余量）
+# 并使用独立的熔断器：后台请求失败不会让实时请求直接退回到快照
+BACKGROUND_NOTION_RATE = float(os.environ.get("BACKGROUND_NOTION_RATE", "1.5"))
+background_notion = notion.derive(limiter=TokenBucket(BACKGROUND_NOTION_RATE))
+
+# 代理和原始数据透传共用的 HTTP 客户端，首次使用时创建并复用连接和 TLS 上下文
+http_client: Optional[httpx.AsyncClient] = None
+
+def get_http_client() -> httpx.AsyncClient:
+    global http_client
+    if http_client is None:
+        http_client = httpx.AsyncClient(timeout=httpx.Timeout(60.0), follow_redirects=True)
+    return http_client
 
 DATABASE_ID = os.environ.get("NOTION_DATABASE_ID")
 
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson when available.
+
+    Handlers return it directly with already JSON-ready dicts (plain str/int/bool/list/dict,
+    as produced by process_block_content), so FastAPI skips jsonable_encoder entirely.
+    """
+
+    def render(self, content) -> bytes:
+        if orjson:
+            return orjson.dumps(content)
+        return json.dumps(
+            content,
+            ensure_ascii=False,
+            allow_nan=False,
+            separators=(",", ":")
+        ).encode("utf-8")
+
 # 存储页面数据的字典
 pages_data = {}
-suffix_pages = {}
-
-class Page(BaseModel):
-    id: str
-    title: str
-    last_edited_time: str
-    created_time: Optional[str] = None
-    parent_id: Optional[str] = None
-    edit_date: Optional[str] = None
-    show_back: Optional[bool] = True
-    suffix: Optional[str] = None
-
-async def init_pages():
-    """初始化时加载所有页面的数据"""
+
+# 共享缓存后端（页面索引、首屏内容、签名文件 URL），多 worker 部署时使用 CACHE_BACKEND=sqlite
+# 页面索引（index*）、层级索引（hierarchy*）和跨 worker 锁（lock:*）不会因容量被淘汰
+cache = create_cache_backend(pinned_prefixes=("index", "hierarchy", "lock:"))
+INDEX_CACHE_KEY = "index"
+INDEX_VERSION_KEY = "index:version"  # 只存刷新时间，供各 worker 低成本地检查索引是否有更新
+INDEX_LOCK_KEY = "lock:index"
+INDEX_CACHE_TTL = float(os.environ.get("INDEX_CACHE_TTL", "30"))  # 共享索引在该时间内不重新查询数据库（秒）
+INDEX_LOCK_TTL = 60.0
+INDEX_LOCK_WAIT = 10.0  # 其他 worker 正在刷新时最多等待的时间（秒）
+SIGNED_URL_KEY = "url:"  # 缓存键 url:{page_id} -> 文件 URL
+SIGNED_URL_MARGIN = 300  # 签名 URL 在过期前这么多秒就不再使用（秒）
+SIGNED_URL_DEFAULT_TTL = 3000  # 没有 expiry_time 时的缓存时间（Notion 签名 URL 有效期为 1 小时）
+EXTERNAL_URL_TTL = 3600
+
+# stale-if-error：最近一次成功的页面索引和页面内容快照
+# 页面索引和层级索引的快照不因页面快照的数量被淘汰
+snapshots = SnapshotStore(pinned_prefixes=("index", "hierarchy"))
+slice_snapshots = SnapshotStore(directory=None)  # /more 分段数量多，只保存在内存中，且不挤占页面和索引快照
+INDEX_SNAPSHOT_KEY = "index"
+index_refreshed_at: Optional[float] = None  # 当前索引对应的数据库查询时间（time.time()）
+index_stale = False  # 最近一次刷新失败，正在使用旧索引
+
+def stale_headers(saved_at: float) -> Dict[str, str]:
+    """过期内容的响应头：Age 为快照的年龄（秒），Warning 110 标记内容已过期"""
+    return {
+        "Age": str(max(0, int(time.time() - saved_at))),
+        "Warning": '110 - "Response is Stale"'
+    }
+
+def normalize_suffix(suffix: str) -> str:
+    """suffix 不区分大小写，忽略首尾空白和斜杠"""
+    return suffix.strip().strip("/").lower()
+
+class SuffixRouter:
+    """
+    Routing index mapping a normalized suffix to an ordered set of page IDs.
+
+    The redirect target for single-page suffixes is precomputed on insert, so
+    resolving ``/{suffix}`` is a pair of dict lookups.
+    """
+
+    def __init__(self):
+        # dict 作为有序集合：保留数据库顺序并自动去重
+        self.pages: Dict[str, Dict[str, None]] = {}
+        self.targets: Dict[str, Optional[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self.pages)
+
+    def clear(self):
+        self.pages.clear()
+        self.targets.clear()
+
+    def add(self, suffix: str, page_id: str):
+        key = normalize_suffix(suffix)
+        if not key:
+            return
+        page_ids = self.pages.setdefault(key, {})
+        page_ids[page_id] = None
+        # 单页面直接重定向，多页面返回列表页（target 为 None）
+        self.targets[key] = f"/static/page.html?id={page_id}" if len(page_ids) == 1 else None
+
+    def page_ids(self, suffix: str) -> List[str]:
+        return list(self.pages.get(normalize_suffix(suffix), ()))
+
+    def resolve(self, suffix: str):
+        """返回 (是否存在, 重定向地址)；多页面时重定向地址为 None"""
+        key = normalize_suffix(suffix)
+        if key not in self.targets:
+            return False, None
+        return True, self.targets[key]
+
+suffix_routes = SuffixRouter()
+
+# 首屏缓存与后台预热配置
+FIRST_SCREEN_LIMIT = 15  # 首屏加载的块数（与前端 limit=15 一致）
+FIRST_SCREEN_TTL = 300  # 首屏缓存在最近一次确认页面未编辑后的有效期（秒）
+WARM_POPULAR_PAGES = 10  # 每次索引刷新后预热访问量最高的页面数
+WARM_CHANGED_PAGES = 20  # 每次索引刷新后最多预热的已变更页面数
+WARM_IDLE_WAIT = 0.5  # 有实时请求时预热任务的让步间隔（秒）
+
+FIRST_SCREEN_KEY = "first:"  # 缓存键 first:{page_id} -> {"last_edited_time", "cached_at", "data"}
+PAGE_SNAPSHOT_KEY = "page:"  # 快照键 page:{page_id} -> 最近一次成功的首屏
+FIRST_SCREEN_MAX_AGE = 86400  # 缓存条目的最长保留时间，是否可用由 get_cached_first_screen 判断
+page_access_counts: Counter = Counter()
+live_requests = 0
+warm_task: Optional[asyncio.Task] = None
+
+@asynccontextmanager
+async def track_live_request():
+    """Mark a live request as in flight so background warming yields to it."""
+    global live_requests
+    live_requests += 1
+    try:
+        yield
+    finally:
+        live_requests -= 1
+
+def get_cached_first_screen(page_id: str) -> Optional[dict]:
+    """Return the cached first-screen response if it is still fresh."""
+    entry = cache.get(page_cache_key(FIRST_SCREEN_KEY, page_id))
+    if not entry:
+        return None
+    
+    indexed = pages_data.get(page_id)
+    if indexed and indexed.last_edited_time != entry["last_edited_time"]:
+        fresh = False
+    else:
+        # 没有 webhook 时只能靠索引刷新发现编辑：索引中的页面在缓存后或最近一次索引刷新（编辑时间未变）后
+        # FIRST_SCREEN_TTL 内有效，其余页面在缓存后 FIRST_SCREEN_TTL 内有效
+        confirmed_at = max(entry["cached_at"], index_refreshed_at or 0) if indexed else entry["cached_at"]
+        fresh = time.time() - confirmed_at < FIRST_SCREEN_TTL
+    
+    if not fresh:
+        cache.delete(page_cache_key(FIRST_SCREEN_KEY, page_id))
+        return None
+    return entry["data"]
+
+def is_empty_partial(response_data: dict) -> bool:
+    """超时或上游错误导致的空结果：没有块但仍有更多内容"""
+    return not response_data["blocks"] and response_data["has_more"]
+
+async def store_first_screen(page_id: str, response_data: dict):
+    """Cache a first-screen response unless it is an empty partial result, and keep it as the page snapshot."""
+    if is_empty_partial(response_data):
+        return
+    await snapshots.save_async(page_cache_key(PAGE_SNAPSHOT_KEY, page_id), response_data)
+    cache.set(page_cache_key(FIRST_SCREEN_KEY, page_id), {
+        "last_edited_time": response_data["page"].get("last_edited_time"),
+        "cached_at": time.time(),
+        "data": response_data
+    }, ttl=FIRST_SCREEN_MAX_AGE)
+
+async def warm_first_screens(page_ids: List[str]):
+    """后台预热首屏缓存，有实时请求时让步"""
+    warmed = 0
+    for page_id in page_ids:
+        while live_requests > 0:
+            await asyncio.sleep(WARM_IDLE_WAIT)
+        if get_cached_first_screen(page_id) is not None:
+            continue
+        try:
+            with request_deadline(REQUEST_DEADLINE):
+                await store_first_screen(page_id, await build_page_response(page_id, FIRST_SCREEN_LIMIT))
+            warmed += 1
+        except Exception as e:
+            logger.warning(f"Cache warming failed for page {page_id}: {e}")
+    logger.info(f"Cache warming finished: {warmed}/{len(page_ids)} pages warmed")
+
+def schedule_cache_warming(previous_edits: Dict[str, str]):
+    """索引刷新后，为热门页面和已变更页面安排首屏预热"""
+    global warm_task
+    
+    popular = [page_id for page_id, _ in page_access_counts.most_common(WARM_POPULAR_PAGES)]
+    changed = sorted(
+        (page_id for page_id, page in pages_data.items()
+         if previous_edits.get(page_id) != page.last_edited_time),
+        key=lambda page_id: pages_data[page_id].last_edited_time,
+        reverse=True
+    )[:WARM_CHANGED_PAGES]
+    
+    targets = list(dict.fromkeys(popular + changed))
+    if not targets:
+        return
+    
+    if warm_task and not warm_task.done():
+        warm_task.cancel()
+    logger.info(f"Scheduling cache warming for {len(targets)} pages")
+    warm_task = asyncio.get_event_loop().create_task(warm_first_screens(targets))
+
+# 请求时间预算：同一请求内的所有 Notion 调用（元数据、块列表、嵌套子块）共享一个截止时间
+REQUEST_DEADLINE = float(os.environ.get("REQUEST_DEADLINE_SECONDS", "8.5"))  # 低于 Vercel 的 10 秒函数限制
+LEGACY_REQUEST_DEADLINE = 20.0  # /page/{page_id} 旧版接口
+RESPONSE_RESERVE = 0.5  # 为序列化和返回响应预留的时间（秒）
+METADATA_TIMEOUT = 15.0  # 单次元数据请求的超时上限，实际还受请求截止时间约束
+
+# 块加载引擎预算（块数上限由各路由决定）
+API_PAGE_SIZE = 30  # /api/page 和 /more 每次向 Notion 请求的块数
+LEGACY_PAGE_SIZE = 100  # /page/{page_id} 旧版接口的批次大小
+SUBSEQUENT_LIMIT = 100  # 带 cursor 且未指定 limit 时的块数上限
+
+# /more 配置：实际处理的块数由剩余时间决定，MAX_MORE_LIMIT 只是上限
+MAX_MORE_LIMIT = 100
+MIN_MORE_LIMIT = 5
+PREFETCH_SLICE_LIMIT = 20  # 前端首个 /more 批次的块数，也是首屏触发的推测性预取的块数上限
+# 自适应分段：按页面的历史列表请求耗时和单块处理耗时选择块数，使每段耗时接近目标
+SLICE_TARGET_SECONDS = float(os.environ.get("MORE_SLICE_TARGET_SECONDS", "2.5"))
+PAGE_COST_KEY = "cost:"  # 缓存键 cost:{page_id} -> {"fetch_cost", "block_cost", "updated_at"}（秒，EWMA）
+PAGE_COST_TTL = 86400
+SLICE_CACHE_TTL = 60  # 预取结果的有效期（秒）
+
+# (page_id, cursor) -> {"max_limit", "cached_at", "data"}
+slice_cache: Dict[tuple, dict] = {}
+# (page_id, cursor) -> (max_limit, task)
+slice_inflight: Dict[tuple, tuple] = {}
+prefetch_stats: Counter = Counter(scheduled=0, hits=0, misses=0, inflight_joins=0, wasted=0)
+
+# 已加载的顶层块 ID（去掉连字符）-> 所属页面 ID，用于按块失效缓存；超过上限时淘汰最久未加载的块
+BLOCK_PAGES_MAX_ENTRIES = 20000
+block_pages: "OrderedDict[str, str]" = OrderedDict()
+
+def normalize_notion_id(value: str) -> str:
+    """Notion ID 可能带或不带连字符，比较前统一去掉"""
+    return value.replace("-", "").lower()
+
+def page_cache_key(prefix: str, page_id: str) -> str:
+    """按页面存放的缓存和快照键统一使用去掉连字符的 ID，两种写法的请求共用一个条目，失效时按同样的键删除"""
+    return prefix + normalize_notion_id(page_id)
+
+def remember_block_pages(page_id: str, blocks: List[dict]):
+    page_key = sys.intern(page_id)
+    for block in blocks:
+        block_id = normalize_notion_id(block["id"])
+        block_pages[block_id] = page_key
+        block_pages.move_to_end(block_id)
+    while len(block_pages) > BLOCK_PAGES_MAX_ENTRIES:
+        block_pages.popitem(last=False)
+
+# 图片/文件资源目录配置
+ASSET_CATALOG_TTL = 300  # 目录过期后在后台重新同步（秒）
+ASSET_PAGE_SIZE = 100
+ASSET_MAX_PAGE_SIZE = 500
+ASSET_SORT_FIELDS = ("title", "created_time", "last_edited_time")
+
+# asset_type -> {"entries", "sorted", "synced_at"}
+asset_catalogs: Dict[str, dict] = {}
+asset_sync_locks = {"image": asyncio.Lock(), "file": asyncio.Lock()}
+
+# 站内搜索配置
+SEARCH_FIELD_WEIGHTS = {"title": 5.0, "suffix": 3.0, "content": 1.0}
+SEARCH_PREFIX_EXPANSION = 64  # 前缀查询最多展开的词项数
+SEARCH_PREFIX_PENALTY = 0.5  # 前缀匹配相对完整匹配的得分系数
+# 英文和数字按单词切分，中日韩文字按单字切分
+SEARCH_TOKEN_RE = re.compile(r"[0-9a-z]+|[\u3040-\u30ff\u3400-\u9fff\uac00-\ud7af\uf900-\ufaff]")
+HTML_TAG_RE = re.compile(r"<[^>]+>")
+
+def tokenize(text: str) -> List[str]:
+    return SEARCH_TOKEN_RE.findall(text.lower())
+
+def html_to_text(value: str) -> str:
+    return html.unescape(HTML_TAG_RE.sub(" ", value))
+
+def extract_block_text(block: dict) -> List[str]:
+    """Collect the plain text of a processed block and its nested children."""
+    parts = []
+    for key in ("text", "title", "caption"):
+        if isinstance(block.get(key), str) and block[key]:
+            parts.append(html_to_text(block[key]))
+    for row in block.get("rows") or []:
+        for cell in row.get("cells", []):
+            parts.extend(item.get("plain_text", "") for item in cell)
+    for key in ("children", "columns"):
+        for child in block.get(key) or []:
+            parts.extend(extract_block_text(child))
+    return parts
+
+def weigh_terms(text: str, weight: float) -> Dict[str, float]:
+    counts = Counter(tokenize(text))
+    return {term: weight * (1 + math.log(count)) for term, count in counts.items()}
+
+class SearchIndex:
+    """
+    In-process inverted index over page titles, suffixes and processed block text.
+
+    Each document keeps the term scores it contributed per field ("meta" for title/suffix,
+    block id for content), so a single block or the page metadata can be re-indexed
+    without rebuilding the page.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, float]] = {}
+        self.documents: Dict[str, dict] = {}
+        self.vocabulary: List[str] = []
+        self.vocabulary_dirty = False
+
+    def _document(self, page_id: str) -> dict:
+        doc = self.documents.get(page_id)
+        if doc is None:
+            doc = self.documents[page_id] = {
+                "title": "",
+                "suffix": None,
+                "last_edited_time": None,
+                "from_database": False,
+                "fields": {}
+            }
+        return doc
+
+    def _set_field(self, page_id: str, field: str, terms: Dict[str, float]):
+        doc = self._document(page_id)
+        self._remove_field(page_id, field)
+        for term, score in terms.items():
+            posting = self.postings.get(term)
+            if posting is None:
+                posting = self.postings[term] = {}
+                self.vocabulary_dirty = True
+            posting[page_id] = posting.get(page_id, 0.0) + score
+        if terms:
+            doc["fields"][field] = terms
+
+    def _remove_field(self, page_id: str, field: str):
+        terms = self.documents[page_id]["fields"].pop(field, None) or {}
+        for term, score in terms.items():
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            remaining = posting.get(page_id, 0.0) - score
+            if remaining > 1e-9:
+                posting[page_id] = remaining
+            else:
+                posting.pop(page_id, None)
+                if not posting:
+                    del self.postings[term]
+                    self.vocabulary_dirty = True
+
+    def index_page(self, page_id: str, title: str, suffix: Optional[str], last_edited_time: Optional[str], from_database: bool = False):
+        """索引页面标题和 suffix；页面被编辑过时丢弃旧的正文内容"""
+        doc = self._document(page_id)
+        if doc["last_edited_time"] and last_edited_time and doc["last_edited_time"] != last_edited_time:
+            for field in [f for f in doc["fields"] if f != "meta"]:
+                self._remove_field(page_id, field)
+        doc.update(
+            title=title or doc["title"],
+            suffix=suffix or doc["suffix"],
+            last_edited_time=last_edited_time or doc["last_edited_time"],
+            from_database=doc["from_database"] or from_database
+        )
+        terms = weigh_terms(doc["title"], SEARCH_FIELD_WEIGHTS["title"])
+        for term, score in weigh_terms(doc["suffix"] or "", SEARCH_FIELD_WEIGHTS["suffix"]).items():
+            terms[term] = terms.get(term, 0.0) + score
+        self._set_field(page_id, "meta", terms)
+
+    def index_blocks(self, page_id: str, blocks: List[dict]):
+        """增量索引已处理块的正文"""
+        for block in blocks:
+            block_id = block.get("id")
+            if not block_id:
+                continue
+            text = " ".join(extract_block_text(block))
+            self._set_field(page_id, block_id, weigh_terms(text, SEARCH_FIELD_WEIGHTS["content"]))
+
+    def remove_page(self, page_id: str):
+        if page_id not in self.documents:
+            return
+        for field in list(self.documents[page_id]["fields"]):
+            self._remove_field(page_id, field)
+        del self.documents[page_id]
+
+    def retain_database_pages(self, page_ids):
+        """移除已不在数据库索引中的页面（子页面不受影响）"""
+        page_ids = set(page_ids)
+        for page_id in [pid for pid, doc in self.documents.items() if doc["from_database"] and pid not in page_ids]:
+            self.remove_page(page_id)
+
+    def _expand(self, prefix: str) -> List[str]:
+        if self.vocabulary_dirty:
+            self.vocabulary = sorted(self.postings)
+            self.vocabulary_dirty = False
+        expansions = []
+        i = bisect_left(self.vocabulary, prefix)
+        while i < len(self.vocabulary) and len(expansions) < SEARCH_PREFIX_EXPANSION:
+            term = self.vocabulary[i]
+            if not term.startswith(prefix):
+                break
+            expansions.append(term)
+            i += 1
+        return expansions
+
+    def search(self, query: str, limit: int = 10) -> List[dict]:
+        """所有词项都需匹配；最后一个词项按前缀匹配以支持输入提示"""
+        terms = tokenize(query)
+        if not terms:
+            return []
+        
+        scores = None
+        for i, term in enumerate(terms):
+            is_prefix = i == len(terms) - 1 and not query[-1:].isspace()
+            candidates = self._expand(term) if is_prefix else [term]
+            if candidates == [term]:
+                # 完整匹配直接复用倒排表，无需复制
+                matches = self.postings.get(term, {})
+            else:
+                matches = {}
+                for candidate in candidates:
+                    boost = 1.0 if candidate == term else SEARCH_PREFIX_PENALTY
+                    for page_id, score in self.postings[candidate].items():
+                        score *= boost
+                        if score > matches.get(page_id, 0.0):
+                            matches[page_id] = score
+            if scores is None:
+                scores = matches
+            else:
+                smaller, larger = (scores, matches) if len(scores) <= len(matches) else (matches, scores)
+                scores = {page_id: score + larger[page_id] for page_id, score in smaller.items() if page_id in larger}
+            if not scores:
+                return []
+        
+        top = heapq.nlargest(limit, scores.items(), key=itemgetter(1))
+        ranked = sorted(top, key=lambda item: (-item[1], self.documents[item[0]]["title"]))
+        return [
+            {
+                "id": page_id,
+                "title": self.documents[page_id]["title"],
+                "suffix": self.documents[page_id]["suffix"],
+                "score": round(score, 3)
+            }
+            for page_id, score in ranked
+        ]
+
+search_index = SearchIndex()
+
+def intern_optional(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value else value
+
+class PageRecord:
+    """
+    Compact page index entry.
+
+    Stored once in pages_data and referenced by ID from the suffix index; repeated
+    strings (database parent ID, suffixes, timestamps) are interned and ``edit_date``
+    is derived on serialization instead of being stored twice.
+    """
+
+    __slots__ = ("id", "title", "last_edited_time", "created_time", "parent_id", "show_back", "suffix")
+
+    def __init__(self, id: str, title: str, last_edited_time: str, created_time: Optional[str] = None,
+                 parent_id: Optional[str] = None, show_back: bool = True, suffix: Optional[str] = None):
+        self.id = sys.intern(id)
+        self.title = title
+        self.last_edited_time = intern_optional(last_edited_time)
+        self.created_time = intern_optional(created_time)
+        self.parent_id = intern_optional(parent_id)
+        self.show_back = show_back
+        self.suffix = intern_optional(suffix)
+
+    def to_dict(self) -> dict:
+        """API 响应中的页面结构"""
+        return {
+            "id": self.id,
+            "title": self.title,
+            "last_edited_time": self.last_edited_time,
+            "created_time": self.created_time,
+            "parent_id": self.parent_id,
+            "edit_date": self.last_edited_time,
+            "show_back": self.show_back,
+            "suffix": self.suffix
+        }
+
+def install_index(records: List[PageRecord]):
+    """用新的页面记录整体替换页面索引、suffix 路由和搜索索引中的数据库页面"""
+    global suffix_routes
+    
+    routes = SuffixRouter()
+    for record in records:
+        search_index.index_page(record.id, record.title, record.suffix, record.last_edited_time, from_database=True)
+        if record.suffix:
+            routes.add(record.suffix, record.id)
+    
+    # 同步替换，不会有请求看到一半的索引
+    pages_data.clear()
+    pages_data.update((record.id, record) for record in records)
+    suffix_routes = routes
+    search_index.retain_database_pages(pages_data.keys())
+
+def records_from_dicts(records: List[dict]) -> List[PageRecord]:
+    return [PageRecord(**{field: record.get(field) for field in PageRecord.__slots__}) for record in records]
+
+def restore_index_snapshot() -> bool:
+    """刷新失败且内存中没有索引时（冷启动），从快照恢复页面索引"""
+    global index_refreshed_at
+    
+    snapshot = snapshots.load(INDEX_SNAPSHOT_KEY)
+    if snapshot is None:
+        return False
+    saved_at, records = snapshot
+    install_index(records_from_dicts(records))
+    index_refreshed_at = saved_at
+    logger.warning(f"Restored {len(records)} pages from index snapshot taken {int(time.time() - saved_at)}s ago")
+    return True
+
+def sync_shared_index(max_age: Optional[float] = None) -> bool:
+    """
+    其他 worker 刷新过共享索引时安装到本进程。
+    max_age 不为 None 时只接受该时间内刷新的索引；返回本进程索引是否为共享索引的最新版本。
+    """
+    global index_refreshed_at, index_stale
+    
+    version = cache.get(INDEX_VERSION_KEY)
+    if version is None or (max_age is not None and time.time() - version >= max_age):
+        return False
+    if version == index_refreshed_at and pages_data:
+        return True
+    
+    shared = cache.get(INDEX_CACHE_KEY)
+    if not shared or shared["refreshed_at"] != version:
+        return False
+    install_index(records_from_dicts(shared["records"]))
+    index_refreshed_at = version
+    index_stale = False
+    logger.info(f"Installed shared page index ({len(shared['records'])} pages)")
+    return True
+
+async def init_pages(force: bool = False) -> bool:
+    """
+    刷新页面索引，成功时返回 True。
+    共享缓存中的索引足够新时直接使用（force=True 时跳过），多个 worker 同时刷新时只有一个查询数据库。
+    刷新失败时保留上一次的索引（内存为空则从快照恢复），并标记为过期。
+    """
+    global index_stale
+    
     if not notion:
         logger.error("Notion client not initialized, skipping page initialization")
-        return
-        
+        return False
+    
+    if not force and sync_shared_index(INDEX_CACHE_TTL):
+        return True
+    
+    locked = cache.add(INDEX_LOCK_KEY, os.getpid(), ttl=INDEX_LOCK_TTL)
+    if not locked:
+        # 其他 worker 正在查询数据库，等待它写入共享索引
+        waited_from = time.time()
+        while time.time() - waited_from < INDEX_LOCK_WAIT:
+            await asyncio.sleep(0.1)
+            if sync_shared_index(time.time() - waited_from + 0.1):
+                return True
+            if cache.get(INDEX_LOCK_KEY) is None:
+                break
+    
+    try:
+        refreshed = await refresh_index()
+    finally:
+        if locked:
+            cache.delete(INDEX_LOCK_KEY)
+    index_stale = not refreshed
+    if not refreshed and not pages_data:
+        restore_index_snapshot()
+    return refreshed
+
+async def refresh_index() -> bool:
+    """查询数据库中的全部页面并替换索引；任何一步失败都不改动现有索引"""
+    global index_refreshed_at
+    
     try:
-        import asyncio
-        from functools import partial
         
         logger.info("\n" + "="*50)
         logger.info("Starting to initialize pages...")
-        # 清空现有数据
-        pages_data.clear()
-        suffix_pages.clear()
+        # 记录刷新前的编辑时间，用于判断哪些页面需要预热
+        previous_edits = {page_id: page.last_edited_time for page_id, page in pages_data.items()}
         
         # 查询数据库中的所有页面 - 使用异步包装
         logger.info("Querying Notion database with pagination...")
         pages = []
         cursor = None
-        max_retries = 3
         
         while True:
             query_params = {
@@ -108,27 +824,15 @@ async def init_pages():
             if cursor:
                 query_params["start_cursor"] = cursor
             
-            # Retry logic for database queries
-            for attempt in range(max_retries):
-                try:
-                    loop = asyncio.get_event_loop()
-                    response = await asyncio.wait_for(
-                        loop.run_in_executor(None, partial(notion.databases.query, **query_params)),
-                        timeout=30.0  # 30 second timeout
-                    )
-                    break  # Success, exit retry loop
-                except asyncio.TimeoutError:
-                    logger.warning(f"Timeout on attempt {attempt + 1}/{max_retries} for database query")
-                    if attempt == max_retries - 1:
-                        logger.error("Max retries exceeded for database query")
-                        return  # Skip initialization if all retries failed
-                    await asyncio.sleep(2 ** attempt)  # Exponential backoff
-                except Exception as e:
-                    logger.warning(f"Error on attempt {attempt + 1}/{max_retries}: {e}")
-                    if attempt == max_retries - 1:
-                        logger.error(f"Max retries exceeded: {e}")
-                        return
-                    await asyncio.sleep(2 ** attempt)
+            # 重试与熔断由 Notion 访问层统一处理
+            try:
+                response = await notion.query_database(**query_params, timeout=30.0)  # 30 second timeout
+            except asyncio.TimeoutError:
+                logger.error("Timeout querying database, keeping previous index")
+                return False
+            except Exception as e:
+                logger.error(f"Error querying database, keeping previous index: {e}")
+                return False
             
             # 记录原始响应数据用于调试
             logger.info(f"\nRaw response data:")
@@ -149,9 +853,9 @@ async def init_pages():
         
         if not pages:
             logger.warning("No pages found in database")
-            return
             
         # 处理每个页面
+        records = []
         for page in pages:
             try:
                 page_id = page['id']
@@ -190,61 +894,433 @@ async def init_pages():
                 logger.info(f"Final suffix: '{suffix}'")
                 
                 # 创建页面对象
-                page_obj = Page(
+                record = PageRecord(
                     id=page_id,
                     title=title,
                     created_time=page.get('created_time', ''),
                     last_edited_time=page.get('last_edited_time', ''),
                     parent_id=page.get('parent', {}).get('database_id'),
-                    edit_date=page.get('last_edited_time', ''),
                     show_back=True,
                     suffix=suffix
                 )
                 
-                # 更新 pages_data
-                pages_data[page_id] = page_obj.dict()
-                logger.info(f"Added page to pages_data: {page_obj.dict()}")
-                
-                # 更新 suffix 索引
-                if suffix:
-                    if suffix not in suffix_pages:
-                        suffix_pages[suffix] = []
-                    if not any(p['id'] == page_id for p in suffix_pages[suffix]):
-                        suffix_pages[suffix].append(page_obj.dict())
-                        logger.info(f"Added page to suffix_pages[{suffix}]")
+                records.append(record)
+                logger.info(f"Added page to index: {record.id} (suffix '{normalize_suffix(suffix)}')")
                 
             except Exception as e:
                 logger.error(f"Error processing page {page.get('id', 'unknown')}: {str(e)}")
                 logger.error("Stack trace:", exc_info=True)
                 continue
         
+        install_index(records)
+        record_dicts = [record.to_dict() for record in records]
+        await snapshots.save_async(INDEX_SNAPSHOT_KEY, record_dicts)
+        refreshed_at = time.time()
+        # 版本号在共享索引写完后才更新，写入期间 sync_shared_index() 不会装回旧的共享索引
+        await cache.set_async(INDEX_CACHE_KEY, {"refreshed_at": refreshed_at, "records": record_dicts})
+        index_refreshed_at = refreshed_at
+        cache.set(INDEX_VERSION_KEY, index_refreshed_at)
+        
         logger.info("\nInitialization complete:")
         logger.info(f"Total pages in pages_data: {len(pages_data)}")
-        logger.info(f"Total unique suffixes: {len(suffix_pages)}")
+        logger.info(f"Total unique suffixes: {len(suffix_routes)}")
         logger.info("Pages data:")
         for page_id, page in pages_data.items():
-            logger.info(f"  - {page['title']} ({page_id})")
+            logger.info(f"  - {page.title} ({page_id})")
+        
+        schedule_cache_warming(previous_edits)
+        # 数据库页面有增删或编辑时重新列出它们的子页面
+        schedule_hierarchy_build(force=previous_edits != {page_id: page.last_edited_time for page_id, page in pages_data.items()})
+        return True
         
     except Exception as e:
-        logger.error(f"Error initializing pages: {str(e)}")
+        logger.error(f"Error initializing pages, keeping previous index: {str(e)}")
         logger.error("Stack trace:", exc_info=True)
-        raise
+        return False
 
-@app.on_event("startup")
-async def startup_event():
-    """应用启动时的初始化函数"""
-    try:
-        # Check if environment variables are set
-        if not os.environ.get("NOTION_TOKEN") or not os.environ.get("NOTION_DATABASE_ID"):
-            logger.warning("NOTION_TOKEN or NOTION_DATABASE_ID not set, skipping page initialization")
-            logger.warning("The app will run but may not function properly without proper configuration")
+# 子页面层级索引：数据库页面为根，递归记录子页面，后台构建
+HIERARCHY_KEY = "hierarchy"  # 共享缓存和快照中的层级索引 {"built_at", "nodes"}
+HIERARCHY_VERSION_KEY = "hierarchy:version"
+HIERARCHY_LOCK_KEY = "lock:hierarchy"
+HIERARCHY_LOCK_TTL = 600.0
+HIERARCHY_MAX_AGE = float(os.environ.get("HIERARCHY_MAX_AGE", "21600"))  # 超过该时间完整重建，不复用未变更页面（秒）
+HIERARCHY_CONCURRENCY = 4  # 扫描页面结构（层级索引、大纲）时同时进行的 Notion 列表请求数
+HIERARCHY_MAX_DEPTH = 10
+# 只在这些布局容器中查找子页面和大纲标题；列表项、表格等块下的子页面和标题不常见，向下查找的请求数却最多
+# （extract_outline 从已渲染的块中提取大纲时使用同样的规则，两条路径得到相同的大纲）
+HIERARCHY_CONTAINER_TYPES = {"column_list", "column", "toggle", "synced_block", "callout", "quote",
+                             "heading_1", "heading_2", "heading_3"}
+
+class PageHierarchy:
+    """
+    Child-page tree rooted at the database pages.
+
+    ``nodes`` maps the hyphen-free page ID to {"id", "title", "parent", "last_edited_time", "children"},
+    where ``parent`` and ``children`` are hyphen-free IDs and database pages have no parent. A build
+    replaces the whole object, so readers never see a half-built tree; ``learn`` only adds child pages
+    discovered while rendering between builds.
+    """
+
+    def __init__(self, nodes: Optional[Dict[str, dict]] = None, roots: Optional[List[str]] = None,
+                 built_at: Optional[float] = None):
+        self.nodes = nodes or {}
+        self.roots = roots or []
+        self.built_at = built_at
+        self.dirty = set()  # 内容有变化的页面，下次构建时重新列出其子页面
+
+    def get(self, page_id: str) -> Optional[dict]:
+        return self.nodes.get(normalize_notion_id(page_id))
+
+    def parent_id(self, page_id: str) -> Optional[str]:
+        node = self.get(page_id)
+        parent = self.nodes.get(node["parent"]) if node and node["parent"] else None
+        return parent["id"] if parent else None
+
+    def breadcrumbs(self, page_id: str) -> List[dict]:
+        """从数据库页面到该页面（含）的路径"""
+        trail = []
+        node = self.get(page_id)
+        while node is not None and len(trail) <= HIERARCHY_MAX_DEPTH:
+            trail.append({"id": node["id"], "title": node["title"]})
+            node = self.nodes.get(node["parent"]) if node["parent"] else None
+        trail.reverse()
+        return trail
+
+    def subtree(self, key: str, depth: Optional[int]) -> dict:
+        node = self.nodes[key]
+        result = {"id": node["id"], "title": node["title"], "last_edited_time": node["last_edited_time"]}
+        if node["parent"] is None and key in self.roots:
+            record = pages_data.get(node["id"])
+            result["suffix"] = record.suffix if record else None
+        if depth is None or depth > 0:
+            result["children"] = [self.subtree(child, None if depth is None else depth - 1)
+                                  for child in node["children"] if child in self.nodes]
+        return result
+
+    def tree(self, depth: Optional[int] = None) -> List[dict]:
+        return [self.subtree(key, depth) for key in self.roots if key in self.nodes]
+
+    def learn(self, page_id: str, title: str, parent: Optional[dict], last_edited_time: Optional[str]):
+        """记录渲染时遇到的 child_page 块；只接受父页面已在树中的子页面"""
+        if not parent or parent.get("type") != "page_id":
             return
-        
+        parent_key = normalize_notion_id(parent["page_id"])
+        parent_node = self.nodes.get(parent_key)
+        if parent_node is None:
+            return
+        key = normalize_notion_id(page_id)
+        node = self.nodes.get(key)
+        if node is None:
+            self.nodes[key] = {"id": page_id, "title": title, "parent": parent_key,
+                               "last_edited_time": last_edited_time, "children": []}
+        elif node["parent"] == parent_key:
+            node["title"] = title
+        if key not in parent_node["children"]:
+            parent_node["children"].append(key)
+
+    def mark_dirty(self, page_ids: List[str]):
+        self.dirty.update(normalize_notion_id(page_id) for page_id in page_ids)
+
+    def to_dict(self) -> dict:
+        return {"built_at": self.built_at, "roots": self.roots, "nodes": self.nodes}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PageHierarchy":
+        return cls(data["nodes"], data["roots"], data["built_at"])
+
+page_hierarchy = PageHierarchy()
+hierarchy_task: Optional[asyncio.Task] = None
+structure_scan_slots = asyncio.Semaphore(HIERARCHY_CONCURRENCY)
+background_scan_slots = asyncio.Semaphore(HIERARCHY_CONCURRENCY)
+
+async def scan_page_structure(page_id: str, background: bool = False) -> dict:
+    """
+    按文档顺序列出页面中的 child_page 块和标题块（包括分栏、折叠块、可折叠标题等布局容器内的），
+    不处理块内容。返回 {"child_pages", "outline"}。
+    容器块并发展开，同类扫描共享 HIERARCHY_CONCURRENCY 个 Notion 请求名额。background=True（层级索引构建）
+    时经由限速的 background_notion 请求，并使用另一组名额，不会挡住请求触发的大纲扫描。
+    """
+    api, slots = (background_notion, background_scan_slots) if background else (notion, structure_scan_slots)
+
+    async def walk(block_id: str, parent: Optional[str]) -> List[tuple]:
+        items = []  # ("page" | "heading", 条目) 或 ("nested", 子容器的扫描任务)，保持文档顺序
+        cursor = None
+        try:
+            while True:
+                params = {"page_size": 100}
+                if cursor:
+                    params["start_cursor"] = cursor
+                async with slots:
+                    response = await api.list_children(block_id=block_id, timeout=METADATA_TIMEOUT, **params)
+                for block in response["results"]:
+                    if block["type"] == "child_page":
+                        items.append(("page", {
+                            "id": block["id"],
+                            "title": block["child_page"].get("title") or "Untitled",
+                            "last_edited_time": block.get("last_edited_time")
+                        }))
+                    elif block["type"] in HEADING_LEVELS:
+                        items.append(("heading", outline_entry(block["id"], block["type"], block[block["type"]], parent)))
+                    if block.get("has_children") and block["type"] in HIERARCHY_CONTAINER_TYPES:
+                        items.append(("nested", asyncio.ensure_future(walk(block["id"], normalize_notion_id(block["id"])))))
+                if not response.get("has_more"):
+                    break
+                cursor = response["next_cursor"]
+            
+            flat = []
+            for kind, item in items:
+                flat.extend(await item if kind == "nested" else [(kind, item)])
+            return flat
+        finally:
+            for kind, item in items:
+                if kind != "nested":
+                    continue
+                if not item.done():
+                    item.cancel()
+                elif not item.cancelled():
+                    item.exception()  # 兄弟容器先失败时，已失败的子任务的异常在这里取走，不再报告未处理
+    
+    items = await walk(page_id, None)
+    return {
+        "child_pages": [item for kind, item in items if kind == "page"],
+        "outline": [item for kind, item in items if kind == "heading"]
+    }
+
+async def build_hierarchy(full: bool = False) -> PageHierarchy:
+    """
+    从页面索引中的数据库页面开始递归列出子页面，同时缓存列出的每个页面的标题大纲。
+    last_edited_time 未变化（且未被标记为已变更）的页面直接复用上一次的子页面列表；full=True 时全部重新列出。
+    单个页面列出失败时保留它上一次的子页面。
+    """
+    previous = page_hierarchy
+    nodes: Dict[str, dict] = {}
+    listed = 0
+    
+    def previous_children(key: str) -> List[dict]:
+        old = previous.nodes.get(key)
+        if old is None:
+            return []
+        return [{"id": previous.nodes[child]["id"], "title": previous.nodes[child]["title"],
+                 "last_edited_time": previous.nodes[child]["last_edited_time"]}
+                for child in old["children"] if child in previous.nodes]
+    
+    async def visit(page_id: str, title: str, parent: Optional[str], edited: Optional[str], depth: int):
+        nonlocal listed
+        key = normalize_notion_id(page_id)
+        if key in nodes:
+            return
+        node = nodes[key] = {"id": page_id, "title": title, "parent": parent, "last_edited_time": edited, "children": []}
+        old = previous.nodes.get(key)
+        if not full and old and edited and old["last_edited_time"] == edited and key not in previous.dirty:
+            children = previous_children(key)
+        else:
+            while live_requests > 0:
+                await asyncio.sleep(WARM_IDLE_WAIT)
+            try:
+                structure = await scan_page_structure(page_id, background=True)
+                children = structure["child_pages"]
+                if edited:
+                    store_outline(page_id, edited, structure["outline"])
+                listed += 1
+            except Exception as e:
+                logger.warning(f"Listing child pages of {page_id} failed, keeping previous children: {e}")
+                children = previous_children(key)
+        node["children"] = [normalize_notion_id(child["id"]) for child in children]
+        if depth < HIERARCHY_MAX_DEPTH:
+            await asyncio.gather(*(visit(child["id"], child["title"], key, child["last_edited_time"], depth + 1)
+                                   for child in children))
+    
+    roots = list(pages_data.values())
+    await asyncio.gather(*(visit(record.id, record.title, None, record.last_edited_time, 0) for record in roots))
+    logger.info(f"Page hierarchy built: {len(nodes)} pages, {listed} listed, {len(nodes) - len(roots)} child pages")
+    return PageHierarchy(nodes, [normalize_notion_id(record.id) for record in roots], time.time())
+
+def install_hierarchy(hierarchy: PageHierarchy, consumed: frozenset = frozenset()):
+    """替换层级索引；尚未被构建处理（不在 consumed 中）的变更标记保留到下一次构建"""
+    global page_hierarchy
+    hierarchy.dirty = page_hierarchy.dirty - consumed
+    page_hierarchy = hierarchy
+
+def sync_shared_hierarchy() -> bool:
+    """其他 worker 构建过更新的层级索引时安装到本进程"""
+    version = cache.get(HIERARCHY_VERSION_KEY)
+    if version is None or version == page_hierarchy.built_at:
+        return False
+    shared = cache.get(HIERARCHY_KEY)
+    if not shared or shared["built_at"] != version:
+        return False
+    install_hierarchy(PageHierarchy.from_dict(shared))
+    return True
+
+def restore_hierarchy_snapshot() -> bool:
+    snapshot = snapshots.load(HIERARCHY_KEY)
+    if snapshot is None:
+        return False
+    install_hierarchy(PageHierarchy.from_dict(snapshot[1]))
+    return True
+
+async def refresh_hierarchy(full: bool = False):
+    """后台构建层级索引；多个 worker 同时触发时只有一个查询 Notion，其余从共享缓存同步"""
+    if not cache.add(HIERARCHY_LOCK_KEY, os.getpid(), ttl=HIERARCHY_LOCK_TTL):
+        return
+    try:
+        consumed = frozenset(page_hierarchy.dirty)
+        with request_deadline(None):
+            hierarchy = await build_hierarchy(full)
+        data = hierarchy.to_dict()
+        # 先写共享缓存再安装，写入期间 sync_shared_hierarchy() 不会装回旧的层级索引
+        await cache.set_async(HIERARCHY_KEY, data)
+        install_hierarchy(hierarchy, consumed)
+        cache.set(HIERARCHY_VERSION_KEY, hierarchy.built_at)
+        await snapshots.save_async(HIERARCHY_KEY, data)
+    except Exception as e:
+        logger.warning(f"Page hierarchy build failed, keeping previous tree: {e}")
+    finally:
+        cache.delete(HIERARCHY_LOCK_KEY)
+
+def schedule_hierarchy_build(force: bool = False):
+    """
+    层级索引为空、已超过 HIERARCHY_MAX_AGE、有页面被标记为已变更或 force=True 时在后台重建。
+    超过 HIERARCHY_MAX_AGE 时完整重建，其余情况只重新列出变更过的页面。
+    """
+    global hierarchy_task
+    if hierarchy_task and not hierarchy_task.done():
+        return
+    sync_shared_hierarchy()
+    expired = page_hierarchy.built_at is None or time.time() - page_hierarchy.built_at >= HIERARCHY_MAX_AGE
+    if not (force or expired or page_hierarchy.dirty) or not pages_data:
+        return
+    hierarchy_task = asyncio.get_event_loop().create_task(refresh_hierarchy(full=expired))
+
+# 页面大纲（目录）：按 (page_id, last_edited_time) 缓存，随首屏返回，长文档不必等全部 /more 加载完
+OUTLINE_KEY = "toc:"  # 缓存键 toc:{page_id} -> {"last_edited_time", "outline"}
+HEADING_LEVELS = {"heading_1": 1, "heading_2": 2, "heading_3": 3}
+outline_tasks: Dict[str, asyncio.Task] = {}
+
+def outline_entry(block_id: str, block_type: str, content: dict, parent: Optional[str]) -> dict:
+    """大纲条目；anchor 与前端渲染标题时使用的元素 id 相同（去掉连字符的块 ID）"""
+    return {
+        "anchor": normalize_notion_id(block_id),
+        "level": HEADING_LEVELS[block_type],
+        "text": "".join(item.get("plain_text", "") for item in content.get("rich_text", [])),
+        "parent": parent  # 所在容器块（折叠块、可折叠标题、分栏）的 anchor，顶层为 None
+    }
+
+def extract_outline(blocks: List[dict], parent: Optional[str] = None) -> Optional[List[dict]]:
+    """
+    按文档顺序从已处理的块中提取标题，只进入 HIERARCHY_CONTAINER_TYPES 中的容器（与 scan_page_structure 相同，
+    列表项、待办等块下的标题两边都不收录）。
+    渲染时不处理可折叠标题的子块，遇到可折叠标题时返回 None，需要扫描页面结构。
+    """
+    outline = []
+    for block in blocks:
+        block_type = block.get("type")
+        if block_type in HEADING_LEVELS:
+            content = block.get(block_type) or {}
+            if content.get("is_toggleable"):
+                return None
+            outline.append(outline_entry(block["id"], block_type, content, parent))
+        if block_type not in HIERARCHY_CONTAINER_TYPES:
+            continue
+        for key in ("children", "columns"):
+            if block.get(key):
+                nested = extract_outline(block[key], normalize_notion_id(block["id"]) if block.get("id") else parent)
+                if nested is None:
+                    return None
+                outline.extend(nested)
+    return outline
+
+def get_cached_outline(page_id: str, last_edited_time: Optional[str]) -> Optional[List[dict]]:
+    entry = cache.get(page_cache_key(OUTLINE_KEY, page_id))
+    if entry and last_edited_time and entry["last_edited_time"] == last_edited_time:
+        return entry["outline"]
+    return None
+
+def store_outline(page_id: str, last_edited_time: str, outline: List[dict]):
+    cache.set(page_cache_key(OUTLINE_KEY, page_id), {"last_edited_time": last_edited_time, "outline": outline}, ttl=FIRST_SCREEN_MAX_AGE)
+
+async def refresh_outline(page_id: str, last_edited_time: str) -> Optional[List[dict]]:
+    """扫描页面结构生成大纲并缓存，扫描到的子页面顺便记入层级索引"""
+    try:
+        # 后台任务会继承触发它的请求的截止时间，扫描只受单次请求超时约束
+        with request_deadline(None):
+            structure = await scan_page_structure(page_id)
+        store_outline(page_id, last_edited_time, structure["outline"])
+        for child in structure["child_pages"]:
+            page_hierarchy.learn(child["id"], child["title"], {"type": "page_id", "page_id": page_id},
+                                 child["last_edited_time"])
+        return structure["outline"]
+    except Exception as e:
+        logger.warning(f"Building outline for page {page_id} failed: {e}")
+        return None
+    finally:
+        outline_tasks.pop(page_id, None)
+
+def schedule_outline_build(page_id: str, last_edited_time: str) -> asyncio.Task:
+    task = outline_tasks.get(page_id)
+    if task is None:
+        task = outline_tasks[page_id] = asyncio.get_event_loop().create_task(refresh_outline(page_id, last_edited_time))
+    return task
+
+def attach_outline(page_id: str, response_data: dict, schedule: bool = True) -> dict:
+    """首屏响应附带页面大纲（toc）；还没有时在后台生成，本次响应中 toc 为 None"""
+    edited = response_data["page"].get("last_edited_time")
+    outline = get_cached_outline(page_id, edited)
+    if outline is None and edited and schedule:
+        schedule_outline_build(page_id, edited)
+    return {**response_data, "toc": outline}
+
+# 启动模式：background（默认）在后台加载页面索引，启动后立即开始服务；blocking 在加载完索引后才开始服务
+STARTUP_INDEX = os.environ.get("STARTUP_INDEX", "background").lower()
+startup_task: Optional[asyncio.Task] = None
+
+async def load_index_on_startup():
+    """创建 Notion 客户端并加载页面索引，随后在后台构建图片和文件目录"""
+    try:
+        await notion.warm_up()
         await init_pages()
+        schedule_hierarchy_build()
+        
+        # 后台构建图片和文件目录，不阻塞启动
+        for asset_type in asset_sync_locks:
+            asyncio.get_event_loop().create_task(refresh_asset_catalog(asset_type))
     except Exception as e:
         logger.error(f"Error during startup initialization: {str(e)}")
         logger.warning("App will continue running but may not function properly")
 
+async def wait_for_startup_index():
+    """后台加载启动索引期间，需要索引的请求等待这次加载，而不是再查询一次数据库"""
+    if startup_task is not None and not startup_task.done():
+        await asyncio.shield(startup_task)
+
+@app.on_event("startup")
+async def startup_event():
+    """应用启动时的初始化函数"""
+    global startup_task, index_stale
+    
+    # Check if environment variables are set
+    if not os.environ.get("NOTION_TOKEN") or not os.environ.get("NOTION_DATABASE_ID"):
+        logger.warning("NOTION_TOKEN or NOTION_DATABASE_ID not set, skipping page initialization")
+        logger.warning("The app will run but may not function properly without proper configuration")
+        return
+    
+    if not sync_shared_hierarchy():
+        restore_hierarchy_snapshot()
+    if STARTUP_INDEX == "blocking":
+        await load_index_on_startup()
+        return
+    
+    # 先用共享缓存或快照中的索引提供服务（快照标记为过期），需要索引的路由在索引为空时会自行等待加载
+    if not sync_shared_index() and restore_index_snapshot():
+        index_stale = True
+    startup_task = asyncio.get_event_loop().create_task(load_index_on_startup())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if http_client is not None:
+        await http_client.aclose()
+    code_highlighter.shutdown()
+
 @app.get("/")
 async def root():
     """根路由处理"""
@@ -263,15 +1339,46 @@ async def health_check():
         
         # 检查数据
         pages_count = len(pages_data)
-        suffixes_count = len(suffix_pages)
+        suffixes_count = len(suffix_routes)
+        
+        notion_health = notion.health() if notion else None
+        breaker_closed = notion_health is None or notion_health["breaker"]["state"] == "closed"
         
         status = {
-            "status": "healthy" if has_token and has_database_id and notion else "degraded",
+            "status": "healthy" if has_token and has_database_id and notion and breaker_closed else "degraded",
             "notion_token": "present" if has_token else "missing",
             "database_id": "present" if has_database_id else "missing", 
             "notion_client": notion_client_status,
+            "notion": notion_health,
+            "notion_background": background_notion.health() if notion else None,
             "pages_loaded": pages_count,
             "suffixes_loaded": suffixes_count,
+            "first_screens_cached": cache.count(FIRST_SCREEN_KEY),
+            "cache_backend": cache.name,
+            "index": {
+                "stale": index_stale,
+                "age": int(time.time() - index_refreshed_at) if index_refreshed_at else None,
+                "snapshots": len(snapshots),
+                "slice_snapshots": len(slice_snapshots),
+                "persisted": bool(snapshots.directory)
+            },
+            "hierarchy": {
+                "pages": len(page_hierarchy.nodes),
+                "age": int(time.time() - page_hierarchy.built_at) if page_hierarchy.built_at else None,
+                "building": bool(hierarchy_task and not hierarchy_task.done()),
+                "dirty": len(page_hierarchy.dirty)
+            },
+            "code_highlight": code_highlighter.snapshot(),
+            "search_index": {
+                "documents": len(search_index.documents),
+                "terms": len(search_index.postings)
+            },
+            "prefetch": {
+                **prefetch_stats,
+                "hit_rate": round(prefetch_stats["hits"] / max(1, prefetch_stats["hits"] + prefetch_stats["misses"]), 3),
+                "cached_slices": len(slice_cache),
+                "inflight": len(slice_inflight)
+            },
             "timestamp": "2024-01-01T00:00:00Z"  # 可以用实际时间戳
         }
         
@@ -301,7 +1408,9 @@ def get_file_info(page: dict) -> dict:
             
         return {
             "id": str(page["id"]),
-            "title": title
+            "title": title,
+            "created_time": page.get("created_time"),
+            "last_edited_time": page.get("last_edited_time")
         }
         
     except (KeyError, IndexError) as e:
@@ -406,7 +1515,60 @@ def process_rich_text(rich_text_array):
     
     return "".join(formatted_text)
 
-def process_block_content(block: dict) -> dict:
+# 响应负载配置：compact 只保留前端渲染所需的字段
+COMPACT_PROFILE = "compact"
+COMPACT_MEDIA_TYPE = "application/vnd.notionimg.compact+json"
+
+# 这些块的嵌套对象只重复了已渲染的 text（原始 rich_text）
+RICH_TEXT_DUPLICATE_KEYS = {
+    "paragraph": "paragraph",
+    "heading_1": "heading_1",
+    "heading_2": "heading_2",
+    "heading_3": "heading_3",
+    "bulleted_list_item": "content",
+    "numbered_list_item": "content",
+    "callout": "callout",
+    "quote": "quote",
+}
+INTERNAL_BLOCK_FIELDS = ("_sequence", "_batch")
+
+def use_compact_profile(request: Request, profile: Optional[str]) -> bool:
+    """Resolve the response profile from the query parameter or Accept header."""
+    if profile:
+        return profile.lower() == COMPACT_PROFILE
+    return COMPACT_MEDIA_TYPE in request.headers.get("accept", "")
+
+def compact_block(block: dict) -> dict:
+    """Strip raw rich_text duplicates and ordering metadata from a processed block."""
+    compact = {k: v for k, v in block.items() if k not in INTERNAL_BLOCK_FIELDS}
+
+    nested_key = RICH_TEXT_DUPLICATE_KEYS.get(compact.get("type"))
+    if nested_key and isinstance(compact.get(nested_key), dict):
+        # color 已在顶层返回，只保留渲染器还需要的字段（如 callout 的 icon）
+        remaining = {
+            k: v for k, v in compact[nested_key].items()
+            if k not in ("rich_text", "color") and v
+        }
+        if remaining:
+            compact[nested_key] = remaining
+        else:
+            del compact[nested_key]
+
+    if compact.get("highlighted"):
+        # 服务端已高亮的代码块，前端直接插入 highlighted，不再需要源码的 rich_text 和 text
+        compact.pop("rich_text", None)
+        compact.pop("text", None)
+
+    for key in ("children", "columns", "rows"):
+        if isinstance(compact.get(key), list):
+            compact[key] = [compact_block(child) for child in compact[key]]
+
+    return compact
+
+# code 块的服务端语法高亮（可选依赖 Pygments，见 highlighting.py）
+code_highlighter = CodeHighlighter()
+
+async def process_block_content(block: dict) -> dict:
     """Process block content."""
     try:
         block_type = block["type"]
@@ -435,11 +1597,11 @@ def process_block_content(block: dict) -> dict:
             logger.info(f"Processing column_list block: {block['id']}")
             if block.get("has_children", False):
                 try:
-                    columns = notion.blocks.children.list(block_id=block["id"])["results"]
+                    columns = (await notion.list_children(block_id=block["id"]))["results"]
                     processed_columns = []
                     for column in columns:
                         if column["type"] == "column":
-                            column_content = process_block_content(column)
+                            column_content = await process_block_content(column)
                             if column_content:
                                 processed_columns.append(column_content)
                     result["columns"] = processed_columns
@@ -453,10 +1615,10 @@ def process_block_content(block: dict) -> dict:
             logger.info(f"Processing column block: {block['id']}")
             if block.get("has_children", False):
                 try:
-                    column_blocks = notion.blocks.children.list(block_id=block["id"])["results"]
+                    column_blocks = (await notion.list_children(block_id=block["id"]))["results"]
                     processed_blocks = []
                     for child_block in column_blocks:
-                        child_content = process_block_content(child_block)
+                        child_content = await process_block_content(child_block)
                         if child_content:
                             processed_blocks.append(child_content)
                     result["children"] = processed_blocks
@@ -506,9 +1668,18 @@ def process_block_content(block: dict) -> dict:
         elif block_type == "code":
             result["language"] = block_content.get("language", "plain text")
             result["rich_text"] = block_content.get("rich_text", [])
+            # 服务端高亮，未完成或不支持时由前端高亮
+            remaining = remaining_time()
+            highlighted = await code_highlighter.highlight(
+                result["language"], "".join(item.get("plain_text", "") for item in result["rich_text"]),
+                timeout=None if remaining is None else remaining - RESPONSE_RESERVE
+            )
+            if highlighted is not None:
+                result["highlighted"] = highlighted
         elif block_type == "child_page":
             result["page_id"] = block["id"]
             result["title"] = block_content.get("title", "Untitled")
+            page_hierarchy.learn(block["id"], result["title"], block.get("parent"), block.get("last_edited_time"))
         elif block_type == "toggle":
             # For toggle blocks, we need to process the rich_text content
             result["text"] = process_rich_text(block_content.get("rich_text", []))
@@ -517,12 +1688,12 @@ def process_block_content(block: dict) -> dict:
             # Process children if present
             if block.get("has_children", False):
                 try:
-                    child_blocks = notion.blocks.children.list(block_id=block["id"])["results"]
+                    child_blocks = (await notion.list_children(block_id=block["id"]))["results"]
                     logger.info(f"Toggle block {block['id']}: found {len(child_blocks)} children")
                     children = []
                     for child_block in child_blocks:
                         logger.info(f"Toggle block {block['id']}: processing child of type '{child_block['type']}'")
-                        child_content = process_block_content(child_block)
+                        child_content = await process_block_content(child_block)
                         if child_content:
                             children.append(child_content)
                     if children:
@@ -539,11 +1710,11 @@ def process_block_content(block: dict) -> dict:
             # Process table rows if present
             if block.get("has_children", False):
                 try:
-                    table_rows = notion.blocks.children.list(block_id=block["id"])["results"]
+                    table_rows = (await notion.list_children(block_id=block["id"]))["results"]
                     rows = []
                     for row_block in table_rows:
                         if row_block["type"] == "table_row":
-                            row_content = process_block_content(row_block)
+                            row_content = await process_block_content(row_block)
                             if row_content:
                                 rows.append(row_content)
                     result["rows"] = rows
@@ -577,10 +1748,10 @@ def process_block_content(block: dict) -> dict:
             # Process children if present
             if block.get("has_children", False):
                 try:
-                    child_blocks = notion.blocks.children.list(block_id=block["id"])["results"]
+                    child_blocks = (await notion.list_children(block_id=block["id"]))["results"]
                     children = []
                     for child_block in child_blocks:
-                        child_content = process_block_content(child_block)
+                        child_content = await process_block_content(child_block)
                         if child_content:
                             children.append(child_content)
                     result["children"] = children
@@ -593,24 +1764,19 @@ def process_block_content(block: dict) -> dict:
                 "caption": process_rich_text(block_content.get("caption", [])) if block_content.get("caption") else ""
             }
         elif block_type in ["bulleted_list_item", "numbered_list_item"]:
-            # 处理列表项的富文本内容
-            result = {
-                "type": block_type,
-                "text": text,
-                "color": color,
-                "content": {
-                    "rich_text": block_content.get("rich_text", []),
-                    "color": color
-                }
+            # 处理列表项的富文本内容（保留 id，搜索索引和 block_pages 按块 ID 记录）
+            result["content"] = {
+                "rich_text": block_content.get("rich_text", []),
+                "color": color
             }
             
             # 处理嵌套内容
             if block.get("has_children", False):
                 try:
-                    child_blocks = notion.blocks.children.list(block_id=block["id"])["results"]
+                    child_blocks = (await notion.list_children(block_id=block["id"]))["results"]
                     children = []
                     for child_block in child_blocks:
-                        child_content = process_block_content(child_block)
+                        child_content = await process_block_content(child_block)
                         if child_content:
                             children.append(child_content)
                     if children:
@@ -650,10 +1816,10 @@ def process_block_content(block: dict) -> dict:
             # Process children if present
             if block.get("has_children", False):
                 try:
-                    child_blocks = notion.blocks.children.list(block_id=block["id"])["results"]
+                    child_blocks = (await notion.list_children(block_id=block["id"]))["results"]
                     children = []
                     for child_block in child_blocks:
-                        child_content = process_block_content(child_block)
+                        child_content = await process_block_content(child_block)
                         if child_content:
                             children.append(child_content)
                     result["children"] = children
@@ -669,10 +1835,10 @@ def process_block_content(block: dict) -> dict:
             # Process children if present
             if block.get("has_children", False):
                 try:
-                    child_blocks = notion.blocks.children.list(block_id=block["id"])["results"]
+                    child_blocks = (await notion.list_children(block_id=block["id"]))["results"]
                     children = []
                     for child_block in child_blocks:
-                        child_content = process_block_content(child_block)
+                        child_content = await process_block_content(child_block)
                         if child_content:
                             children.append(child_content)
                     result["children"] = children
@@ -702,203 +1868,147 @@ def process_block_content(block: dict) -> dict:
         logger.warning(f"Block type: {block.get('type', 'unknown')}, Block ID: {block.get('id', 'unknown')}")
         return None
 
-@app.get("/images")
-async def get_images():
-    try:
-        response = notion.databases.query(
-            database_id=DATABASE_ID,
-            filter={
-                "property": "type",
-                "select": {
-                    "equals": "image"
-                }
+async def sync_asset_catalog(asset_type: str):
+    """分页查询数据库，重建指定类型（image/file）的资源目录"""
+    
+    async with asset_sync_locks[asset_type]:
+        entries = []
+        cursor = None
+        
+        while True:
+            query_params = {
+                "database_id": DATABASE_ID,
+                "filter": {
+                    "property": "type",
+                    "select": {
+                        "equals": asset_type
+                    }
+                },
+                "page_size": 100
             }
-        )
+            if cursor:
+                query_params["start_cursor"] = cursor
+            
+            response = await notion.query_database(**query_params, timeout=30.0)
+            
+            for page in response.get("results", []):
+                file_info = get_file_info(page)
+                if file_info:
+                    entries.append(file_info)
+            
+            if not response.get("has_more", False):
+                break
+            cursor = response.get("next_cursor")
         
-        images = []
-        for page in response["results"]:
-            file_info = get_file_info(page)
-            if file_info:
-                images.append(file_info)
-                
-        return {"images": images}
+        # 同步成功后整体替换，避免请求读到半成品
+        asset_catalogs[asset_type] = {
+            "entries": entries,
+            "sorted": {},
+            "synced_at": time.monotonic()
+        }
+        logger.info(f"Synced {len(entries)} {asset_type} entries into catalog")
+
+async def refresh_asset_catalog(asset_type: str):
+    """后台同步资源目录，失败时保留旧目录"""
+    try:
+        await sync_asset_catalog(asset_type)
+    except Exception as e:
+        logger.warning(f"Background {asset_type} catalog sync failed: {e}")
+
+async def get_asset_catalog(asset_type: str) -> dict:
+    """返回资源目录；首次访问同步构建，过期后在后台刷新"""
+    catalog = asset_catalogs.get(asset_type)
+    if catalog is None:
+        if asset_sync_locks[asset_type].locked():
+            # 已有同步在进行，等待其完成而不是重复查询
+            async with asset_sync_locks[asset_type]:
+                pass
+        if asset_type not in asset_catalogs:
+            await sync_asset_catalog(asset_type)
+        return asset_catalogs[asset_type]
+    
+    stale = time.monotonic() - catalog["synced_at"] >= ASSET_CATALOG_TTL
+    if stale and not asset_sync_locks[asset_type].locked():
+        asyncio.get_event_loop().create_task(refresh_asset_catalog(asset_type))
+    return catalog
+
+def query_asset_catalog(catalog: dict, page: int, page_size: int, sort: Optional[str], order: str, q: Optional[str]) -> dict:
+    """在资源目录上执行过滤、排序和分页"""
+    if sort and sort not in ASSET_SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"Invalid sort field, expected one of {list(ASSET_SORT_FIELDS)}")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="Invalid order, expected 'asc' or 'desc'")
+    
+    entries = catalog["entries"]
+    if sort:
+        # 每个排序字段只排序一次，缓存到下次同步
+        if sort not in catalog["sorted"]:
+            catalog["sorted"][sort] = sorted(entries, key=lambda e: (e.get(sort) or "").lower())
+        entries = catalog["sorted"][sort]
+    if order == "desc":
+        entries = entries[::-1]
+    if q:
+        needle = q.lower()
+        entries = [e for e in entries if needle in e["title"].lower()]
+    
+    start = (page - 1) * page_size
+    return {
+        "items": entries[start:start + page_size],
+        "total": len(entries),
+        "page": page,
+        "page_size": page_size,
+        "has_more": start + page_size < len(entries)
+    }
+
+@app.get("/images")
+async def get_images(
+    page: int = Query(1, ge=1),
+    page_size: int = Query(ASSET_PAGE_SIZE, ge=1, le=ASSET_MAX_PAGE_SIZE),
+    sort: Optional[str] = None,
+    order: str = "asc",
+    q: Optional[str] = None
+):
+    """图片列表，支持分页（page/page_size）、排序（sort/order）和标题过滤（q）"""
+    try:
+        catalog = await get_asset_catalog("image")
+        result = query_asset_catalog(catalog, page, page_size, sort, order, q)
+        result["images"] = result.pop("items")
+        return FastJSONResponse(result)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching images: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/files")
-async def get_files():
+async def get_files(
+    page: int = Query(1, ge=1),
+    page_size: int = Query(ASSET_PAGE_SIZE, ge=1, le=ASSET_MAX_PAGE_SIZE),
+    sort: Optional[str] = None,
+    order: str = "asc",
+    q: Optional[str] = None
+):
+    """文件列表，支持分页（page/page_size）、排序（sort/order）和标题过滤（q）"""
     try:
-        response = notion.databases.query(
-            database_id=DATABASE_ID,
-            filter={
-                "property": "type",
-                "select": {
-                    "equals": "file"
-                }
-            }
-        )
-        
-        files = []
-        for page in response["results"]:
-            file_info = get_file_info(page)
-            if file_info:
-                files.append(file_info)
-                
-        return {"files": files}
+        catalog = await get_asset_catalog("file")
+        result = query_asset_catalog(catalog, page, page_size, sort, order, q)
+        result["files"] = result.pop("items")
+        return FastJSONResponse(result)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching files: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/page/{page_id}")
-async def get_page_content(page_id: str):
+async def get_page_content(page_id: str, limit: Optional[int] = None, cursor: Optional[str] = None):
+    """页面内容（旧版接口），与 /api/page 共用块加载引擎，但使用更大的批次和更长的截止时间"""
     try:
-        logger.info(f"Fetching page content for ID: {page_id}")
-        # First try to get the block to check if it's a child page
-        try:
-            block = notion.blocks.retrieve(block_id=page_id)
-            logger.info(f"Retrieved block type: {block['type']}")
-            if block["type"] == "child_page":
-                # If it's a child page, get the full page to get all properties including cover
-                try:
-                    page = notion.pages.retrieve(page_id=page_id)
-                    page_info = get_page_info(page)  # This will handle the cover properly
-                    if page_info:
-                        page_info["parent_id"] = block["parent"]["page_id"] if block["parent"]["type"] == "page_id" else None
-                    logger.info(f"Found child page: {page_info['title'] if page_info else 'None'}")
-                except Exception as e:
-                    logger.warning(f"Error getting full page for child page, falling back to basic info: {e}")
-                    # Try to get title from block first
-                    title = block.get("child_page", {}).get("title", "")
-                    if not title:
-                        # Try to get title from page object if available
-                        title = page.get("properties", {}).get("title", {}).get("title", [{}])[0].get("text", {}).get("content", "Untitled")
-                    
-                    back_property = page.get("properties", {}).get("Back", {}).get("select", {}).get("name")
-                    show_back = True if back_property is None else back_property != "False"
-                    page_info = {
-                        "id": str(block["id"]),
-                        "title": title,
-                        "created_time": block["created_time"],
-                        "last_edited_time": block["last_edited_time"],
-                        "parent_id": block["parent"]["page_id"] if block["parent"]["type"] == "page_id" else None,
-                        "show_back": show_back,
-                        "cover": None  # No cover in fallback case
-                    }
-            else:
-                # If it's not a child page, get page metadata normally
-                page = notion.pages.retrieve(page_id=page_id)
-                page_info = get_page_info(page)
-                logger.info(f"Found regular page: {page_info['title'] if page_info else 'None'}")
-        except Exception as e:
-            logger.warning(f"Error retrieving block, trying page: {e}")
-            # If block retrieval fails, try page retrieval as fallback
-            page = notion.pages.retrieve(page_id=page_id)
-            page_info = get_page_info(page)
-            if page_info and "parent" in page and page["parent"]["type"] == "page_id":
-                page_info["parent_id"] = page["parent"]["page_id"]
-        
-        if not page_info:
-            logger.error("Page info not found")
-            raise HTTPException(status_code=404, detail="Page not found")
-        
-        # Get page blocks with timeout and pagination support
-        blocks = []
-        has_more = True
-        next_cursor = cursor
-        total_blocks = 0
-        blocks_processed = 0
-        
-        # Set default limit to 15 for initial load, None for subsequent loads
-        effective_limit = limit if limit is not None else (15 if cursor is None else 100)
-        
-        logger.info(f"Fetching page blocks with limit={effective_limit}, cursor={cursor}")
-        try:
-            while has_more and (effective_limit is None or blocks_processed < effective_limit):
-                # Wrap block children list call with timeout
-                loop = asyncio.get_event_loop()
-                
-                # Build API parameters
-                api_params = {"block_id": page_id}
-                if next_cursor:
-                    api_params["start_cursor"] = next_cursor
-                
-                # Calculate page size for this request
-                remaining_limit = effective_limit - blocks_processed if effective_limit else 100
-                page_size = min(100, remaining_limit) if effective_limit else 100
-                api_params["page_size"] = page_size
-                
-                response = await asyncio.wait_for(
-                    loop.run_in_executor(None, partial(notion.blocks.children.list, **api_params)),
-                    timeout=20.0  # 20 second timeout for blocks
-                )
-                
-                current_blocks = response["results"]
-                total_blocks += len(current_blocks)
-                logger.info(f"Retrieved {len(current_blocks)} blocks (total: {total_blocks})")
-                
-                # Process blocks in the exact order received from Notion API
-                batch_processed_blocks = []
-                for i, block in enumerate(current_blocks):
-                    if effective_limit and blocks_processed >= effective_limit:
-                        break
-                        
-                    logger.info(f"Processing block {i+1}/{len(current_blocks)}, type: {block['type']}, id: {block.get('id', 'unknown')}")
-                    processed_block = process_block_content(block)
-                    if processed_block:
-                        # Add sequence information to help with ordering
-                        processed_block["_sequence"] = blocks_processed
-                        processed_block["_batch"] = len(blocks) // 100  # Which batch this came from
-                        batch_processed_blocks.append(processed_block)
-                        blocks_processed += 1
-                
-                # Add batch to blocks list while preserving order
-                blocks.extend(batch_processed_blocks)
-                logger.info(f"Added {len(batch_processed_blocks)} processed blocks to output (total processed: {blocks_processed})")
-                
-                has_more = response["has_more"]
-                if has_more:
-                    next_cursor = response["next_cursor"]
-                    logger.info(f"More blocks available, next_cursor: {next_cursor}")
-                else:
-                    next_cursor = None
-                    
-                # Stop if we've reached the limit
-                if effective_limit and blocks_processed >= effective_limit:
-                    logger.info(f"Reached limit of {effective_limit} blocks")
-                    break
-                    
-        except asyncio.TimeoutError:
-            logger.error(f"Timeout retrieving blocks for page {page_id}")
-            # Return partial content instead of failing completely
-            logger.info(f"Returning partial content with {len(blocks)} blocks")
-            
-        logger.info(f"Successfully processed {len(blocks)} blocks")
-        
-        response_data = {
-            "page": page_info,
-            "blocks": blocks,
-            "has_more": has_more,
-            "next_cursor": next_cursor,
-            "total_loaded": blocks_processed,
-            "debug_info": {
-                "total_batches": (blocks_processed // 100) + 1,
-                "blocks_with_sequence": len([b for b in blocks if "_sequence" in b]),
-                "first_block_sequence": blocks[0].get("_sequence") if blocks else None,
-                "last_block_sequence": blocks[-1].get("_sequence") if blocks else None,
-                "request_cursor": cursor,
-                "response_cursor": next_cursor
-            }
-        }
-        
-        # Add pagination info for debugging
-        if cursor is None:
-            logger.info(f"Initial load: returned {len(blocks)} blocks")
-        else:
-            logger.info(f"Subsequent load: returned {len(blocks)} blocks with cursor {cursor}")
-        
-        return response_data
-        
+        logger.info(f"Fetching page content for ID: {page_id}, limit={limit}, cursor={cursor}")
+        async with track_live_request():
+            with request_deadline(LEGACY_REQUEST_DEADLINE):
+                response_data = await build_page_response(page_id, limit, cursor, page_size=LEGACY_PAGE_SIZE)
+        return FastJSONResponse(response_data)
     except HTTPException:
         # Re-raise HTTP exceptions as-is
         raise
@@ -907,19 +2017,51 @@ async def get_page_content(page_id: str):
         logger.error("Stack trace:", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+async def resolve_content_url(page_id: str) -> Optional[str]:
+    """
+    返回页面 Content 属性中第一个文件的 URL。
+    Notion 托管文件的签名 URL 会过期，缓存到 expiry_time 前 SIGNED_URL_MARGIN 秒；外部链接缓存 EXTERNAL_URL_TTL。
+    """
+    key = page_cache_key(SIGNED_URL_KEY, page_id)
+    url = cache.get(key)
+    if url:
+        return url
+    
+    page = await notion.retrieve_page(page_id=page_id)
+    content_property = page["properties"].get("Content")
+    if not content_property or not content_property.get("files"):
+        return None
+    
+    file_obj = content_property["files"][0]
+    if file_obj.get("type") == "external":
+        url = file_obj["external"]["url"]
+        ttl = EXTERNAL_URL_TTL
+    else:
+        url = file_obj["file"]["url"]
+        ttl = SIGNED_URL_DEFAULT_TTL
+        expiry_time = file_obj["file"].get("expiry_time")
+        if expiry_time:
+            try:
+                expires_at = datetime.fromisoformat(expiry_time.replace("Z", "+00:00")).timestamp()
+                ttl = expires_at - time.time() - SIGNED_URL_MARGIN
+            except ValueError:
+                pass
+    if ttl > 0:
+        cache.set(key, url, ttl=ttl)
+    return url
+
 @app.get("/image/{image_id}")
 async def get_image(image_id: str):
     try:
-        page = notion.pages.retrieve(page_id=image_id)
-        content_property = page["properties"].get("Content")
-        
-        if not content_property or not content_property.get("files"):
+        image_url = await resolve_content_url(image_id)
+        if not image_url:
             raise HTTPException(status_code=404, detail="No image found")
             
-        image_url = content_property["files"][0]["file"]["url"]
         logger.info(f"Redirecting to fresh image URL for {image_id}")
         return RedirectResponse(url=image_url)
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error retrieving image {image_id}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -927,16 +2069,15 @@ async def get_image(image_id: str):
 @app.get("/file/{file_id}")
 async def get_file(file_id: str):
     try:
-        page = notion.pages.retrieve(page_id=file_id)
-        content_property = page["properties"].get("Content")
-        
-        if not content_property or not content_property.get("files"):
+        file_url = await resolve_content_url(file_id)
+        if not file_url:
             raise HTTPException(status_code=404, detail="No file found")
             
-        file_url = content_property["files"][0]["file"]["url"]
         logger.info(f"Redirecting to fresh file URL for {file_id}")
         return RedirectResponse(url=file_url)
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error retrieving file {file_id}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -948,36 +2089,44 @@ async def serve_page_html(page_id: str):
     return FileResponse("static/page.html")
 
 @app.get("/{suffix}")
+@app.get("/{suffix}/")
 async def read_suffix_pages(suffix: str):
-    """通过 suffix 访问页面"""
+    """通过 suffix 访问页面（不区分大小写，支持结尾斜杠）"""
     try:
-        logger.info(f"\n{'='*50}")
         logger.info(f"Accessing suffix route: '{suffix}'")
         
         # 检查是否是特殊路由
         if suffix == "page":
             logger.info("Detected 'page' route, returning page.html")
             return FileResponse("static/page.html")
-            
-        # 直接调用 API 函数获取页面数据
-        response = await get_pages(suffix=suffix)
-        pages = response["pages"]
         
-        if not pages:
+        # 索引尚未加载（如冷启动）时才初始化；其余情况直接查路由索引（其他 worker 刷新过时先同步），
+        # 索引超过 INDEX_CACHE_TTL 时在后台刷新
+        refresh = None
+        if not pages_data and notion and DATABASE_ID:
+            await wait_for_startup_index()
+            if not pages_data:
+                await init_pages()
+        else:
+            refresh = refresh_expired_index()
+        
+        found, target = suffix_routes.resolve(suffix)
+        
+        if not found and refresh is not None:
+            # 可能是索引过期后新增的页面，等待这次刷新后再查一次
+            await asyncio.shield(refresh)
+            found, target = suffix_routes.resolve(suffix)
+        
+        if not found:
             logger.warning(f"No pages found for suffix '{suffix}'")
             # 返回自定义错误页面，而不是抛出 HTTPException
             return FileResponse("static/suffix_not_found.html")
         
-        logger.info(f"Found {len(pages)} pages for suffix '{suffix}'")
-        for page in pages:
-            logger.info(f"  - {page['title']} ({page['id']})")
-        
         # 根据页面数量返回不同的视图
-        if len(pages) == 1:
+        if target:
             # 如果只有一个页面，重定向到带查询参数的页面
-            page_id = pages[0]['id']
-            logger.info(f"Redirecting to single page: {page_id}")
-            return RedirectResponse(f"/static/page.html?id={page_id}", status_code=302)
+            logger.info(f"Redirecting suffix '{suffix}' to {target}")
+            return RedirectResponse(target, status_code=302)
         else:
             # 如果有多个页面，返回列表页面
             logger.info("Returning suffix_pages.html for multiple pages")
@@ -989,218 +2138,408 @@ async def read_suffix_pages(suffix: str):
         logger.error(f"Error processing suffix route '{suffix}': {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+async def load_pages(suffix: Optional[str] = None) -> List[PageRecord]:
+    """刷新页面数据并返回页面列表，支持通过 suffix 筛选"""
+    # 确保数据是最新的
+    logger.info("Initializing pages data...")
+    await wait_for_startup_index()
+    await init_pages()
+    
+    if suffix:
+        logger.info(f"\nGetting pages with suffix: '{suffix}'")
+        pages = [pages_data[page_id] for page_id in suffix_routes.page_ids(suffix) if page_id in pages_data]
+        logger.info(f"Found {len(pages)} pages with suffix '{suffix}'")
+        for page in pages:
+            logger.info(f"  - {page.title} ({page.id})")
+        return pages
+        
+    # 如果没有指定 suffix，返回所有页面
+    all_pages = list(pages_data.values())
+    logger.info(f"\nReturning all pages: {len(all_pages)} pages")
+    logger.info("Pages data:")
+    for page in all_pages:
+        logger.info(f"  - {page.title} ({page.id})")
+    return all_pages
+
 @app.get("/api/pages")
 async def get_pages(suffix: Optional[str] = None):
-    """获取页面列表，支持通过 suffix 筛选"""
+    """获取页面列表，支持通过 suffix 筛选；刷新失败时返回上一次的索引并带上过期响应头"""
     try:
-        # 确保数据是最新的
-        logger.info("Initializing pages data...")
-        await init_pages()
-        
-        if suffix:
-            logger.info(f"\nGetting pages with suffix: '{suffix}'")
-            logger.info(f"Available suffixes: {list(suffix_pages.keys())}")
-            pages = suffix_pages.get(suffix, [])
-            logger.info(f"Found {len(pages)} pages with suffix '{suffix}'")
-            for page in pages:
-                logger.info(f"  - {page['title']} ({page['id']})")
-            return {"pages": pages}
-            
-        # 如果没有指定 suffix，返回所有页面
-        all_pages = list(pages_data.values())
-        logger.info(f"\nReturning all pages: {len(all_pages)} pages")
-        logger.info("Pages data:")
-        for page in all_pages:
-            logger.info(f"  - {page['title']} ({page['id']})")
-        return {"pages": all_pages}
+        pages = await load_pages(suffix)
+        headers = stale_headers(index_refreshed_at) if index_stale and index_refreshed_at else None
+        return FastJSONResponse({"pages": [page.to_dict() for page in pages]}, headers=headers)
     except Exception as e:
         logger.error(f"Error getting pages: {str(e)}")
         logger.error("Stack trace:", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/page/{page_id}")
-async def get_page(page_id: str, limit: Optional[int] = None, cursor: Optional[str] = None):
-    try:
-        logger.info(f"Fetching page content for API request: {page_id}, limit={limit}, cursor={cursor}")
-        
-        # Add timeout for Notion API calls
-        import asyncio
-        from functools import partial
-        
-        async def get_notion_data_with_timeout():
-            # First try to get the block to check if it's a child page
+class BlockBudget:
+    """
+    Limits for one block-loading pass: block count, wall-clock deadline, Notion page size and
+    whether the first children request may be hedged.
+
+    The deadline is whatever is left of the current request deadline minus RESPONSE_RESERVE,
+    so time already spent on metadata is not available to block loading.
+    """
+
+    __slots__ = ("max_blocks", "deadline", "page_size", "hedge")
+
+    def __init__(self, max_blocks: int, page_size: int, hedge: bool = False):
+        remaining = remaining_time()
+        if remaining is None:
+            remaining = REQUEST_DEADLINE
+        self.max_blocks = max_blocks
+        self.deadline = time.monotonic() + remaining - RESPONSE_RESERVE
+        self.page_size = page_size
+        self.hedge = hedge  # 首次列表请求使用对冲请求（首屏）
+
+    def remaining(self) -> float:
+        return self.deadline - time.monotonic()
+
+def ewma(previous: Optional[float], sample: float, alpha: float = 0.3) -> float:
+    return sample if previous is None else previous + alpha * (sample - previous)
+
+def load_page_costs(page_id: str) -> dict:
+    """Per-page fetch/block cost EWMAs remembered across requests (shared by workers via the cache)."""
+    return cache.get(page_cache_key(PAGE_COST_KEY, page_id)) or {}
+
+def save_page_costs(page_id: str, fetch_cost: Optional[float], block_cost: Optional[float]):
+    cache.set(page_cache_key(PAGE_COST_KEY, page_id), {
+        "fetch_cost": fetch_cost,
+        "block_cost": block_cost,
+        "updated_at": time.time()
+    }, ttl=PAGE_COST_TTL)
+
+async def load_blocks(page_id: str, cursor: Optional[str], budget: BlockBudget) -> dict:
+    """
+    块加载引擎：从 cursor 开始分批拉取并处理块，直到达到块数上限、截止时间或没有更多内容。
+    超时或上游出错时返回已处理的部分内容，next_cursor 始终指向下一个未返回的块。
+    
+    批次大小按列表请求耗时和单块处理耗时调整：剩余时间不够再拉一批或再处理一个块时提前停止，
+    并把 next_cursor 指向第一个未处理的块（Notion 的 cursor 即块 ID）。两个耗时从该页面之前
+    请求的观测值开始，结束时写回，供 plan_slice() 选择下一段的块数。
+    """
+    blocks = []
+    has_more = True
+    next_cursor = cursor
+    timed_out = False
+    error = None
+    costs = load_page_costs(page_id)
+    fetch_cost = costs.get("fetch_cost")  # 单次 list_children 耗时（秒，EWMA）
+    block_cost = costs.get("block_cost")  # 单块处理耗时（秒，EWMA），包含嵌套子块请求
+    fetches = 0
+    processed = 0
+    
+    logger.info(f"Loading blocks for {page_id}: max_blocks={budget.max_blocks}, page_size={budget.page_size}, "
+                f"cursor={cursor}, budget={budget.remaining():.2f}s")
+    while has_more and len(blocks) < budget.max_blocks:
+        remaining = budget.remaining()
+        if remaining <= 0 or (fetches and remaining < fetch_cost):
+            timed_out = True
+            break
+        
+        # Build API parameters
+        page_size = min(budget.page_size, budget.max_blocks - len(blocks))
+        if block_cost and fetch_cost is not None:
+            page_size = max(1, min(page_size, int((remaining - fetch_cost) / block_cost)))
+        api_params = {"page_size": page_size}
+        if next_cursor:
+            api_params["start_cursor"] = next_cursor
+        
+        fetch_started = time.monotonic()
+        try:
+            response = await notion.list_children(
+                block_id=page_id, timeout=remaining, hedge=budget.hedge and not fetches, **api_params
+            )
+        except NotionUnavailable as e:
+            if not blocks:
+                raise HTTPException(status_code=503, detail=str(e))
+            error = str(e)
+            break
+        except asyncio.TimeoutError:
+            logger.error(f"Timeout retrieving blocks for page {page_id}, cursor {next_cursor}")
+            # Return partial content instead of failing completely
+            timed_out = True
+            break
+        except Exception as e:
+            logger.error(f"Error retrieving blocks for page {page_id}: {e}")
+            error = str(e)
+            break
+        
+        fetch_cost = ewma(fetch_cost, time.monotonic() - fetch_started)
+        fetches += 1
+        
+        current_blocks = response["results"]
+        logger.info(f"Retrieved {len(current_blocks)} blocks")
+        remember_block_pages(page_id, current_blocks)
+        
+        # Process blocks in the exact order received from Notion API
+        stopped_at = None
+        for index, block in enumerate(current_blocks):
+            # 历史耗时只用于规划，本次至少尝试处理一个块
+            if len(blocks) >= budget.max_blocks or (processed and budget.remaining() < block_cost):
+                stopped_at = block
+                break
+            block_started = time.monotonic()
             try:
-                # Wrap synchronous notion calls in async with timeout
-                loop = asyncio.get_event_loop()
-                block = await asyncio.wait_for(
-                    loop.run_in_executor(None, partial(notion.blocks.retrieve, block_id=page_id)),
-                    timeout=15.0  # 15 second timeout
-                )
-                logger.info(f"Retrieved block type: {block['type']}")
-                
-                if block["type"] == "child_page":
-                    # If it's a child page, get the full page to get all properties including cover
-                    try:
-                        page = await asyncio.wait_for(
-                            loop.run_in_executor(None, partial(notion.pages.retrieve, page_id=page_id)),
-                            timeout=15.0
-                        )
-                        page_info = get_page_info(page)  # This will handle the cover properly
-                        if page_info:
-                            page_info["parent_id"] = block["parent"]["page_id"] if block["parent"]["type"] == "page_id" else None
-                        logger.info(f"Found child page: {page_info['title'] if page_info else 'None'}")
-                    except Exception as e:
-                        logger.warning(f"Error getting full page for child page, falling back to basic info: {e}")
-                        # Try to get title from block first
-                        title = block.get("child_page", {}).get("title", "")
-                        if not title:
-                            # Try to get title from page object if available
-                            title = page.get("properties", {}).get("title", {}).get("title", [{}])[0].get("text", {}).get("content", "Untitled")
-                        
-                        back_property = page.get("properties", {}).get("Back", {}).get("select", {}).get("name")
-                        show_back = True if back_property is None else back_property != "False"
-                        page_info = {
-                            "id": str(block["id"]),
-                            "title": title,
-                            "created_time": block["created_time"],
-                            "last_edited_time": block["last_edited_time"],
-                            "parent_id": block["parent"]["page_id"] if block["parent"]["type"] == "page_id" else None,
-                            "show_back": show_back,
-                            "cover": None  # No cover in fallback case
-                        }
-                else:
-                    # If it's not a child page, get page metadata normally
-                    page = await asyncio.wait_for(
-                        loop.run_in_executor(None, partial(notion.pages.retrieve, page_id=page_id)),
-                        timeout=15.0
-                    )
-                    page_info = get_page_info(page)
-                    logger.info(f"Found regular page: {page_info['title'] if page_info else 'None'}")
-            except asyncio.TimeoutError:
-                logger.error(f"Timeout retrieving page metadata for {page_id}")
-                raise HTTPException(status_code=504, detail="Timeout retrieving page metadata from Notion API")
+                processed_block = await process_block_content(block)
             except Exception as e:
-                logger.warning(f"Error retrieving block, trying page: {e}")
-                # If block retrieval fails, try page retrieval as fallback
-                try:
-                    page = await asyncio.wait_for(
-                        loop.run_in_executor(None, partial(notion.pages.retrieve, page_id=page_id)),
-                        timeout=15.0
-                    )
-                    page_info = get_page_info(page)
-                    if page_info and "parent" in page and page["parent"]["type"] == "page_id":
-                        page_info["parent_id"] = page["parent"]["page_id"]
-                except asyncio.TimeoutError:
-                    logger.error(f"Timeout retrieving page {page_id}")
-                    raise HTTPException(status_code=504, detail="Timeout retrieving page from Notion API")
-                except Exception as fallback_error:
-                    logger.error(f"Both block and page retrieval failed for {page_id}: {fallback_error}")
-                    raise HTTPException(status_code=404, detail="Page not found or inaccessible")
-                    
+                logger.error(f"Error processing block {block.get('id', 'unknown')}: {e}")
+                # 创建一个错误块而不是跳过
+                processed_block = {
+                    "type": "paragraph",
+                    "text": f"[错误: 无法加载此块 - {str(e)[:100]}]",
+                    "color": "red",
+                    "id": str(block.get('id', 'error')),
+                    "_error": True
+                }
+            # 被截止时间截断的块也计入耗时（至少这么慢），下一段据此缩小
+            block_cost = ewma(block_cost, time.monotonic() - block_started)
+            processed += 1
+            if budget.remaining() <= 0 and blocks:
+                # 嵌套子块可能因截止时间被截断，这个块留给下一段重新加载
+                stopped_at = block
+                break
+            if processed_block:
+                # Add sequence information to help with ordering
+                processed_block["_sequence"] = len(blocks)
+                processed_block["_batch"] = len(blocks) // 100  # Which batch this came from
+                blocks.append(processed_block)
+            else:
+                logger.warning(f"Block {block.get('id', 'unknown')} returned None after processing")
+            if budget.remaining() <= 0:
+                # 这一段的第一个块就用完了时间：仍然返回它（嵌套子块可能不完整），下一段从后一个块开始，
+                # 否则每一段都在同一个块上超时，/more 反复返回空结果而 cursor 不前进
+                logger.warning(f"Deadline passed while processing block {block.get('id', 'unknown')}, returning it partially")
+                if index + 1 < len(current_blocks):
+                    stopped_at = current_blocks[index + 1]
+                break
+        
+        if stopped_at is not None:
+            has_more = True
+            next_cursor = stopped_at["id"]
+            timed_out = timed_out or len(blocks) < budget.max_blocks
+            break
+        
+        has_more = response["has_more"]
+        next_cursor = response["next_cursor"] if has_more else None
+        if not current_blocks:
+            logger.info("No more blocks returned from API")
+            break
+    
+    logger.info(f"Successfully processed {len(blocks)} blocks for {page_id}")
+    search_index.index_blocks(page_id, blocks)
+    if fetches or processed:
+        save_page_costs(page_id, fetch_cost, block_cost)
+    
+    return {
+        "blocks": blocks,
+        "has_more": has_more,
+        "next_cursor": next_cursor,
+        "total_loaded": len(blocks),
+        "timed_out": timed_out,
+        "error": error
+    }
+
+def block_debug_info(result: dict, cursor: Optional[str]) -> dict:
+    blocks = result["blocks"]
+    return {
+        "blocks_with_sequence": len([b for b in blocks if "_sequence" in b]),
+        "first_block_sequence": blocks[0].get("_sequence") if blocks else None,
+        "last_block_sequence": blocks[-1].get("_sequence") if blocks else None,
+        "request_cursor": cursor,
+        "response_cursor": result["next_cursor"],
+        "error_blocks": len([b for b in blocks if b.get("_error")]),
+        "timed_out": result["timed_out"]
+    }
+
+async def fetch_page_info(page_id: str) -> Optional[dict]:
+    """
+    获取页面元数据（区分子页面与数据库页面），带超时保护。
+    层级索引中的页面只请求 pages.retrieve，父页面和面包屑来自层级索引；
+    其他页面 blocks.retrieve 和 pages.retrieve 并发请求，两者都返回后再判断页面类型。
+    """
+    sync_shared_hierarchy()
+    if page_hierarchy.get(page_id) is not None:
+        try:
+            page = await notion.retrieve_page(page_id=page_id, timeout=METADATA_TIMEOUT)
+        except NotionUnavailable as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail="Timeout retrieving page metadata from Notion API")
+        except Exception as e:
+            logger.warning(f"Error retrieving indexed page {page_id}, falling back to block lookup: {e}")
+        else:
+            page_info = get_page_info(page)
+            if page_info:
+                page_info["parent_id"] = page_hierarchy.parent_id(page_id)
+                page_info["breadcrumbs"] = page_hierarchy.breadcrumbs(page_id)
             return page_info
-            
-        page_info = await get_notion_data_with_timeout()
+    
+    block, page = await asyncio.gather(
+        notion.retrieve_block(block_id=page_id, timeout=METADATA_TIMEOUT),
+        notion.retrieve_page(page_id=page_id, timeout=METADATA_TIMEOUT),
+        return_exceptions=True
+    )
+    block_ok = not isinstance(block, BaseException)
+    page_ok = not isinstance(page, BaseException)
+    if not page_ok and isinstance(page, NotionUnavailable):
+        raise HTTPException(status_code=503, detail=str(page))
+    
+    if block_ok and block["type"] == "child_page":
+        logger.info(f"Retrieved block type: {block['type']}")
+        parent_id = block["parent"]["page_id"] if block["parent"]["type"] == "page_id" else None
+        page_hierarchy.learn(block["id"], block.get("child_page", {}).get("title") or "Untitled", block["parent"],
+                             block["last_edited_time"])
+        if page_ok:
+            page_info = get_page_info(page)  # This will handle the cover properly
+            if page_info:
+                page_info["parent_id"] = parent_id
+            logger.info(f"Found child page: {page_info['title'] if page_info else 'None'}")
+        else:
+            logger.warning(f"Error getting full page for child page, falling back to basic info: {page}")
+            page_info = {
+                "id": str(block["id"]),
+                "title": block.get("child_page", {}).get("title", "") or "Untitled",
+                "created_time": block["created_time"],
+                "last_edited_time": block["last_edited_time"],
+                "parent_id": parent_id,
+                "show_back": True,
+                "cover": None  # No cover in fallback case
+            }
+        return page_info
+    
+    if page_ok:
+        page_info = get_page_info(page)
+        if not block_ok:
+            logger.warning(f"Error retrieving block, using page: {block!r}")
+            if page_info and "parent" in page and page["parent"]["type"] == "page_id":
+                page_info["parent_id"] = page["parent"]["page_id"]
+        logger.info(f"Found regular page: {page_info['title'] if page_info else 'None'}")
+        return page_info
+    
+    if isinstance(page, asyncio.TimeoutError) or isinstance(block, asyncio.TimeoutError):
+        logger.error(f"Timeout retrieving page metadata for {page_id}")
+        raise HTTPException(status_code=504, detail="Timeout retrieving page metadata from Notion API")
+    logger.error(f"Both block and page retrieval failed for {page_id}: {page}")
+    raise HTTPException(status_code=404, detail="Page not found or inaccessible")
+
+def indexed_page_info(page_id: str) -> Optional[dict]:
+    """元数据请求超时时，用页面索引中的记录代替（没有封面）"""
+    page = pages_data.get(page_id)
+    if page is None:
+        return None
+    return {
+        "id": page.id,
+        "title": page.title,
+        "created_time": page.created_time,
+        "last_edited_time": page.last_edited_time,
+        "parent_id": page.parent_id,
+        "show_back": page.show_back,
+        "cover": None
+    }
+
+async def build_page_response(page_id: str, limit: Optional[int] = None, cursor: Optional[str] = None,
+                              page_size: int = API_PAGE_SIZE) -> dict:
+    """
+    获取页面元数据和一段块内容，组装 /api/page 的完整响应。
+    元数据与第一批子块并发请求，首屏延迟约为一次 Notion 往返。
+    """
+    # Set default limit to 15 for initial load, 100 for subsequent loads
+    effective_limit = limit if limit is not None else (FIRST_SCREEN_LIMIT if cursor is None else SUBSEQUENT_LIMIT)
+    blocks_task = asyncio.ensure_future(load_blocks(
+        page_id, cursor, BlockBudget(effective_limit, page_size, hedge=cursor is None)
+    ))
+    
+    try:
+        try:
+            page_info = await fetch_page_info(page_id)
+        except HTTPException as e:
+            page_info = indexed_page_info(page_id) if e.status_code in (503, 504) else None
+            if page_info is None:
+                raise
+            logger.warning(f"Metadata for {page_id} unavailable ({e.status_code}), using indexed record")
         
         if not page_info:
             logger.error("Page info not found")
             raise HTTPException(status_code=404, detail="Page not found")
+    except BaseException as e:
+        blocks_task.cancel()
+        if blocks_task.done() and getattr(e, "status_code", None) == 404:
+            # 隐藏或不可访问的页面：块可能已先于元数据加载完成并被索引
+            search_index.remove_page(page_id)
+        raise
+    
+    search_index.index_page(page_id, page_info.get("title"), None, page_info.get("last_edited_time"))
+    result = await blocks_task
+    if cursor is None and not result["has_more"] and not result["error"] and page_info.get("last_edited_time"):
+        # 首段已包含整个页面，大纲直接取自处理过的块
+        outline = extract_outline(result["blocks"])
+        if outline is not None:
+            store_outline(page_id, page_info["last_edited_time"], outline)
+    
+    return {
+        "page": page_info,
+        "blocks": result["blocks"],
+        "has_more": result["has_more"],
+        "next_cursor": result["next_cursor"],
+        "total_loaded": result["total_loaded"],
+        "debug_info": block_debug_info(result, cursor)
+    }
+
+@app.get("/api/page/{page_id}")
+async def get_page(request: Request, page_id: str, limit: Optional[int] = None, cursor: Optional[str] = None, profile: Optional[str] = None):
+    try:
+        logger.info(f"Fetching page content for API request: {page_id}, limit={limit}, cursor={cursor}")
+        if page_id in pages_data or page_hierarchy.get(page_id):
+            # 只统计已知页面，任意 ID 的请求不会让计数无限增长
+            page_access_counts[page_id] += 1
         
-        # Get page blocks with timeout and pagination support
-        blocks = []
-        has_more = True
-        next_cursor = cursor
-        total_blocks = 0
-        blocks_processed = 0
-        
-        # Set default limit to 15 for initial load, None for subsequent loads
-        effective_limit = limit if limit is not None else (15 if cursor is None else 100)
+        first_screen = cursor is None and limit in (None, FIRST_SCREEN_LIMIT)
+        response_data = get_cached_first_screen(page_id) if first_screen else None
         
-        logger.info(f"Fetching page blocks with limit={effective_limit}, cursor={cursor}")
-        try:
-            while has_more and (effective_limit is None or blocks_processed < effective_limit):
-                # Wrap block children list call with timeout
-                loop = asyncio.get_event_loop()
-                
-                # Build API parameters
-                api_params = {"block_id": page_id}
-                if next_cursor:
-                    api_params["start_cursor"] = next_cursor
-                
-                # Calculate page size for this request
-                remaining_limit = effective_limit - blocks_processed if effective_limit else 100
-                page_size = min(30, remaining_limit) if effective_limit else 100
-                api_params["page_size"] = page_size
-                
-                response = await asyncio.wait_for(
-                    loop.run_in_executor(None, partial(notion.blocks.children.list, **api_params)),
-                    timeout=8.0  # 减少到8秒避免Vercel的10秒限制
-                )
-                
-                current_blocks = response["results"]
-                total_blocks += len(current_blocks)
-                logger.info(f"Retrieved {len(current_blocks)} blocks (total: {total_blocks})")
-                
-                # Process blocks in the exact order received from Notion API
-                batch_processed_blocks = []
-                for i, block in enumerate(current_blocks):
-                    if effective_limit and blocks_processed >= effective_limit:
-                        break
-                        
-                    logger.info(f"Processing block {i+1}/{len(current_blocks)}, type: {block['type']}, id: {block.get('id', 'unknown')}")
-                    processed_block = process_block_content(block)
-                    if processed_block:
-                        # Add sequence information to help with ordering
-                        processed_block["_sequence"] = blocks_processed
-                        processed_block["_batch"] = len(blocks) // 100  # Which batch this came from
-                        batch_processed_blocks.append(processed_block)
-                        blocks_processed += 1
-                
-                # Add batch to blocks list while preserving order
-                blocks.extend(batch_processed_blocks)
-                logger.info(f"Added {len(batch_processed_blocks)} processed blocks to output (total processed: {blocks_processed})")
-                
-                has_more = response["has_more"]
-                if has_more:
-                    next_cursor = response["next_cursor"]
-                    logger.info(f"More blocks available, next_cursor: {next_cursor}")
-                else:
-                    next_cursor = None
-                    
-                # Stop if we've reached the limit
-                if effective_limit and blocks_processed >= effective_limit:
-                    logger.info(f"Reached limit of {effective_limit} blocks")
-                    break
-                    
-        except asyncio.TimeoutError:
-            logger.error(f"Timeout retrieving blocks for page {page_id}")
-            # Return partial content instead of failing completely
-            logger.info(f"Returning partial content with {len(blocks)} blocks")
+        stale_since = None
+        if response_data is None:
+            error = None
+            try:
+                async with track_live_request():
+                    with request_deadline(REQUEST_DEADLINE):
+                        response_data = await build_page_response(page_id, limit, cursor)
+            except HTTPException as e:
+                if not (first_screen and e.status_code in (503, 504)):
+                    raise
+                error = e
             
-        logger.info(f"Successfully processed {len(blocks)} blocks")
-        
-        response_data = {
-            "page": page_info,
-            "blocks": blocks,
-            "has_more": has_more,
-            "next_cursor": next_cursor,
-            "total_loaded": blocks_processed,
-            "debug_info": {
-                "total_batches": (blocks_processed // 100) + 1,
-                "blocks_with_sequence": len([b for b in blocks if "_sequence" in b]),
-                "first_block_sequence": blocks[0].get("_sequence") if blocks else None,
-                "last_block_sequence": blocks[-1].get("_sequence") if blocks else None,
-                "request_cursor": cursor,
-                "response_cursor": next_cursor
-            }
-        }
+            if first_screen and (error or is_empty_partial(response_data)):
+                # Notion 超时或不可用：退回到最近一次成功的首屏快照
+                snapshot = snapshots.load(page_cache_key(PAGE_SNAPSHOT_KEY, page_id))
+                if snapshot is not None:
+                    stale_since, response_data = snapshot
+                    logger.warning(f"Notion unavailable, serving first screen of {page_id} from snapshot")
+                elif error:
+                    raise error
+            elif first_screen:
+                await store_first_screen(page_id, response_data)
+        else:
+            logger.info(f"Serving first screen of {page_id} from cache")
+        
+        # 推测前端接下来会请求的第一段 /more
+        if stale_since is None:
+            schedule_next_slice(page_id, response_data["next_cursor"], cap=PREFETCH_SLICE_LIMIT)
+        if cursor is None:
+            response_data = attach_outline(page_id, response_data, schedule=stale_since is None)
         
         # Add pagination info for debugging
         if cursor is None:
-            logger.info(f"Initial load: returned {len(blocks)} blocks")
+            logger.info(f"Initial load: returned {len(response_data['blocks'])} blocks")
         else:
-            logger.info(f"Subsequent load: returned {len(blocks)} blocks with cursor {cursor}")
+            logger.info(f"Subsequent load: returned {len(response_data['blocks'])} blocks with cursor {cursor}")
         
-        return response_data
+        if use_compact_profile(request, profile):
+            response_data = {k: v for k, v in response_data.items() if k != "debug_info"}
+            response_data["blocks"] = [compact_block(b) for b in response_data["blocks"]]
+        
+        return FastJSONResponse(response_data, headers=stale_headers(stale_since) if stale_since else None)
         
     except HTTPException:
         # Re-raise HTTP exceptions as-is
@@ -1210,6 +2549,83 @@ async def get_page(page_id: str, limit: Optional[int] = None, cursor: Optional[s
         logger.error("Stack trace:", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+@app.get("/api/search")
+async def search_pages(q: str = Query(..., min_length=1), limit: int = Query(10, ge=1, le=50)):
+    """站内搜索：检索页面标题、suffix 和已同步的正文，最后一个词按前缀匹配"""
+    started = time.perf_counter()
+    results = search_index.search(q, limit)
+    return FastJSONResponse({
+        "query": q,
+        "results": results,
+        "took_ms": round((time.perf_counter() - started) * 1000, 3)
+    })
+
+@app.get("/api/page/{page_id}/toc")
+async def get_page_toc(page_id: str):
+    """页面大纲；缓存中没有时扫描页面结构生成（只列出块，不处理块内容）"""
+    record = pages_data.get(page_id)
+    if record is not None:
+        edited = record.last_edited_time
+    else:
+        with request_deadline(REQUEST_DEADLINE):
+            page_info = await fetch_page_info(page_id)
+        if not page_info:
+            raise HTTPException(status_code=404, detail="Page not found")
+        edited = page_info.get("last_edited_time")
+    if not edited:
+        # 大纲按编辑时间缓存；没有编辑时间时生成的结果无法缓存，不在这里发起构建
+        raise HTTPException(status_code=503, detail="Page edit time is unknown; outline is not available")
+
+    outline = get_cached_outline(page_id, edited)
+    if outline is None:
+        try:
+            outline = await asyncio.wait_for(asyncio.shield(schedule_outline_build(page_id, edited)),
+                                             timeout=REQUEST_DEADLINE - RESPONSE_RESERVE)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail="Outline is still being built", headers={"Retry-After": "5"})
+        if outline is None:
+            raise HTTPException(status_code=503, detail="Could not read the page structure from Notion")
+    return FastJSONResponse({"page_id": page_id, "last_edited_time": edited, "toc": outline})
+
+def require_hierarchy():
+    """安排过期的层级索引在后台重建；首次构建尚未完成时返回 503"""
+    schedule_hierarchy_build()
+    if not page_hierarchy.nodes and hierarchy_task and not hierarchy_task.done():
+        raise HTTPException(status_code=503, detail="Page hierarchy is being built", headers={"Retry-After": "5"})
+
+@app.get("/api/hierarchy")
+async def get_hierarchy(root: Optional[str] = None, depth: Optional[int] = Query(None, ge=0, le=HIERARCHY_MAX_DEPTH)):
+    """子页面层级树（站点地图），数据库页面为根；root 只返回该页面的子树，depth 限制子页面层数"""
+    require_hierarchy()
+    if root:
+        if page_hierarchy.get(root) is None:
+            raise HTTPException(status_code=404, detail="Page is not in the hierarchy index")
+        tree = [page_hierarchy.subtree(normalize_notion_id(root), depth)]
+    else:
+        tree = page_hierarchy.tree(depth)
+    return FastJSONResponse({
+        "built_at": page_hierarchy.built_at,
+        "building": bool(hierarchy_task and not hierarchy_task.done()),
+        "pages": len(page_hierarchy.nodes),
+        "tree": tree
+    })
+
+@app.get("/api/page/{page_id}/breadcrumbs")
+async def get_page_breadcrumbs(page_id: str):
+    """页面的父页面、面包屑和直接子页面，只读层级索引，不请求 Notion"""
+    require_hierarchy()
+    node = page_hierarchy.get(page_id)
+    if node is None:
+        raise HTTPException(status_code=404, detail="Page is not in the hierarchy index")
+    return FastJSONResponse({
+        "page_id": node["id"],
+        "parent_id": page_hierarchy.parent_id(page_id),
+        "breadcrumbs": page_hierarchy.breadcrumbs(page_id),
+        "children": [{"id": page_hierarchy.nodes[child]["id"], "title": page_hierarchy.nodes[child]["title"]}
+                     for child in node["children"] if child in page_hierarchy.nodes],
+        "built_at": page_hierarchy.built_at
+    })
+
 # 添加获取页面块内容的端点 - 使用异步版本
 @app.get("/api/blocks/{page_id}")
 async def get_blocks(page_id: str):
@@ -1220,19 +2636,18 @@ async def get_blocks(page_id: str):
             "Notion-Version": "2022-06-28"
         }
         
-        # Use async HTTP client with timeout
-        timeout = httpx.Timeout(30.0)  # 30 second timeout
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            response = await client.get(
-                f"https://api.notion.com/v1/blocks/{page_id}/children",
-                headers=headers
-            )
+        # 复用共享的 HTTP 客户端，单独设置 30 秒超时
+        response = await get_http_client().get(
+            f"{NOTION_BASE_URL}/v1/blocks/{page_id}/children",
+            headers=headers,
+            timeout=httpx.Timeout(30.0)
+        )
+        
+        if response.status_code != 200:
+            logger.error(f"Notion API returned {response.status_code}: {response.text}")
+            raise HTTPException(status_code=response.status_code, detail=f"Notion API error: {response.text}")
             
-            if response.status_code != 200:
-                logger.error(f"Notion API returned {response.status_code}: {response.text}")
-                raise HTTPException(status_code=response.status_code, detail=f"Notion API error: {response.text}")
-                
-            return response.json()
+        return response.json()
             
     except httpx.TimeoutException:
         logger.error(f"Timeout fetching blocks for page {page_id}")
@@ -1241,137 +2656,198 @@ async def get_blocks(page_id: str):
         logger.error(f"Error fetching blocks: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def plan_slice(page_id: str, requested_limit: Optional[int]) -> dict:
+    """
+    选择一段 /more 的块数和 Notion page_size：一次列表请求加上 N 个块的处理耗时接近
+    SLICE_TARGET_SECONDS。没有该页面的历史耗时时沿用请求的 limit。
+    """
+    target = min(SLICE_TARGET_SECONDS, REQUEST_DEADLINE - RESPONSE_RESERVE)
+    costs = load_page_costs(page_id)
+    fetch_cost, block_cost = costs.get("fetch_cost"), costs.get("block_cost")
+    plan = {
+        "adaptive": True,
+        "requested_limit": requested_limit,
+        "target_seconds": target,
+        "fetch_cost_ms": round(fetch_cost * 1000, 1) if fetch_cost is not None else None,
+        "block_cost_ms": round(block_cost * 1000, 1) if block_cost is not None else None
+    }
+    
+    if fetch_cost is None or not block_cost:
+        limit = min(requested_limit or PREFETCH_SLICE_LIMIT, MAX_MORE_LIMIT)
+        return {**plan, "limit": limit, "page_size": API_PAGE_SIZE, "estimated_seconds": None,
+                "reason": "no cost history for this page; using the requested limit"}
+    
+    fits = int((target - fetch_cost) / block_cost)
+    if fits >= MAX_MORE_LIMIT:
+        limit, reason = MAX_MORE_LIMIT, "light blocks: more than MAX_MORE_LIMIT fit the target"
+    elif fits < MIN_MORE_LIMIT:
+        limit, reason = MIN_MORE_LIMIT, f"heavy blocks or slow upstream: only {max(fits, 0)} fit the target, using the minimum"
+    else:
+        limit, reason = fits, f"{fits} blocks fit the target"
+    # 块数不超过 100 时一次列表请求即可取完这一段
+    return {**plan, "limit": limit, "page_size": limit,
+            "estimated_seconds": round(fetch_cost + limit * block_cost, 3), "reason": reason}
+
+async def build_more_response(page_id: str, cursor: str, max_limit: Optional[int],
+                              requested_limit: Optional[int] = None, cap: Optional[int] = None) -> dict:
+    """
+    从 cursor 开始获取并处理一段块内容，组装 /more 的完整响应。
+    max_limit 为 None 时由 plan_slice() 按该页面的历史耗时选择块数，cap 限制自适应块数的上限。
+    """
+    if max_limit is None:
+        sizing = plan_slice(page_id, requested_limit)
+        if cap is not None and sizing["limit"] > cap:
+            sizing = {**sizing, "limit": cap, "page_size": min(sizing["page_size"], cap),
+                      "reason": f"{sizing['reason']}; capped at {cap} for a prefetch after the first screen"}
+    else:
+        sizing = {"adaptive": False, "requested_limit": requested_limit, "limit": max_limit,
+                  "page_size": API_PAGE_SIZE, "reason": "fixed limit (adaptive=false)"}
+    result = await load_blocks(page_id, cursor, BlockBudget(sizing["limit"], sizing["page_size"]))
+    
+    return {
+        "blocks": result["blocks"],
+        "has_more": result["has_more"],
+        "next_cursor": result["next_cursor"],
+        "total_loaded": result["total_loaded"],
+        "debug_info": {
+            **block_debug_info(result, cursor),
+            "actual_limit": sizing["limit"],
+            "slice_sizing": sizing
+        }
+    }
+
+async def speculate_slice(page_id: str, cursor: str, max_limit: Optional[int], cap: Optional[int] = None):
+    """后台预取下一段内容并放入 cursor 缓存"""
+    key = (page_id, cursor)
+    try:
+        # 任务继承了触发它的请求的截止时间，预取使用自己的完整预算
+        with request_deadline(REQUEST_DEADLINE):
+            response_data = await build_more_response(page_id, cursor, max_limit, cap=cap)
+        if not is_empty_partial(response_data):
+            slice_cache[key] = {
+                "max_limit": max_limit,
+                "cached_at": time.monotonic(),
+                "data": response_data
+            }
+    except Exception as e:
+        logger.warning(f"Speculative fetch failed for page {page_id}, cursor {cursor}: {e}")
+    finally:
+        slice_inflight.pop(key, None)
+
+def schedule_next_slice(page_id: str, next_cursor: Optional[str], max_limit: Optional[int] = None,
+                        cap: Optional[int] = None):
+    """
+    为返回的 next_cursor 安排推测性预取；max_limit 为 None 时预取自适应大小的一段。
+    首屏之后很多读者不会继续滚动，首屏触发的预取用 cap 限制块数。
+    """
+    if not next_cursor:
+        return
+    key = (page_id, next_cursor)
+    if key in slice_inflight or key in slice_cache:
+        return
+    prune_slice_cache()
+    prefetch_stats["scheduled"] += 1
+    slice_inflight[key] = (max_limit, asyncio.get_event_loop().create_task(
+        speculate_slice(page_id, next_cursor, max_limit, cap)
+    ))
+
+async def take_prefetched_slice(page_id: str, cursor: str, max_limit: Optional[int]) -> Optional[dict]:
+    """取出预取结果（块数设置须一致，自适应请求只使用自适应预取）；预取仍在进行时等待其完成"""
+    key = (page_id, cursor)
+    inflight = slice_inflight.get(key)
+    if inflight and inflight[0] == max_limit:
+        try:
+            await asyncio.wait_for(asyncio.shield(inflight[1]), timeout=remaining_time())
+            prefetch_stats["inflight_joins"] += 1
+        except asyncio.TimeoutError:
+            pass
+    
+    entry = slice_cache.pop(key, None)
+    if entry and entry["max_limit"] == max_limit and time.monotonic() - entry["cached_at"] < SLICE_CACHE_TTL:
+        prefetch_stats["hits"] += 1
+        return entry["data"]
+    
+    if entry:
+        prefetch_stats["wasted"] += 1
+    prefetch_stats["misses"] += 1
+    return None
+
+def prune_slice_cache():
+    """清理过期的预取结果"""
+    now = time.monotonic()
+    for key in [k for k, entry in slice_cache.items() if now - entry["cached_at"] >= SLICE_CACHE_TTL]:
+        del slice_cache[key]
+        prefetch_stats["wasted"] += 1
+
 # 添加专门的增量加载更多内容的端点
 @app.get("/api/page/{page_id}/more")
-async def get_more_blocks(page_id: str, cursor: str, limit: Optional[int] = 15):
+async def get_more_blocks(request: Request, page_id: str, cursor: str, limit: Optional[int] = 15,
+                          profile: Optional[str] = None, adaptive: bool = True):
     """
     获取页面的更多块内容 - 用于增量加载避免API限制
     支持超长文档的渐进式加载，针对Vercel的10秒函数限制优化
+    默认按该页面观测到的耗时自适应选择块数（limit 只在没有历史耗时时使用），
+    选择结果和原因在 debug_info.slice_sizing 中；adaptive=false 时严格按 limit 返回。
+    profile=compact 时省略原始 rich_text 与调试字段
     """
     try:
-        logger.info(f"Fetching more blocks for page {page_id} with cursor {cursor}, limit={limit}")
+        logger.info(f"Fetching more blocks for page {page_id} with cursor {cursor}, limit={limit}, adaptive={adaptive}")
         
-        import asyncio
-        from functools import partial
+        # 块数不再为 Vercel 的 10 秒限制而压低：由请求截止时间决定实际能返回多少
+        max_limit = None if adaptive else (min(limit, MAX_MORE_LIMIT) if limit else 15)
         
-        blocks = []
-        has_more = True
-        next_cursor = cursor
-        blocks_processed = 0
-        
-        # 减少单次请求的最大限制以适应Vercel的10秒函数限制
-        max_limit = min(limit, 20) if limit else 15  # 大幅减少避免超时
-        
-        logger.info(f"Loading more blocks with limit={max_limit}")
+        prefetched = False
+        error = None
         try:
-            while has_more and blocks_processed < max_limit:
-                # Wrap block children list call with timeout
-                loop = asyncio.get_event_loop()
-                
-                # Build API parameters
-                api_params = {
-                    "block_id": page_id,
-                    "start_cursor": next_cursor,
-                    "page_size": min(30, max_limit - blocks_processed)  # 减少页面大小
-                }
-                
-                logger.info(f"Requesting blocks with params: {api_params}")
-                
-                try:
-                    response = await asyncio.wait_for(
-                        loop.run_in_executor(None, partial(notion.blocks.children.list, **api_params)),
-                        timeout=8.0  # 减少到8秒避免Vercel的10秒限制
-                    )
-                except asyncio.TimeoutError:
-                    logger.error(f"Timeout retrieving more blocks for page {page_id}, cursor {cursor}")
-                    # 返回部分内容而不是完全失败
-                    break
-                except Exception as e:
-                    logger.error(f"Error retrieving blocks: {e}")
-                    # 对于其他错误，也尝试返回已获取的内容
-                    break
-                
-                current_blocks = response["results"]
-                logger.info(f"Retrieved {len(current_blocks)} more blocks")
-                
-                if not current_blocks:
-                    logger.info("No more blocks returned from API")
-                    break
-                
-                # Process blocks in the exact order received from Notion API
-                batch_processed_blocks = []
-                for i, block in enumerate(current_blocks):
-                    if blocks_processed >= max_limit:
-                        break
-                        
-                    logger.info(f"Processing additional block {i+1}/{len(current_blocks)}, type: {block['type']}, id: {block.get('id', 'unknown')}")
-                    
-                    try:
-                        processed_block = process_block_content(block)
-                        if processed_block:
-                            # Add sequence information to help with ordering
-                            processed_block["_sequence"] = blocks_processed
-                            processed_block["_cursor_batch"] = next_cursor[:10] if next_cursor else "initial"  # Identifier for this batch
-                            processed_block["_batch_index"] = i  # Position in this batch
-                            batch_processed_blocks.append(processed_block)
-                            blocks_processed += 1
-                        else:
-                            logger.warning(f"Block {block.get('id', 'unknown')} returned None after processing")
-                    except Exception as e:
-                        logger.error(f"Error processing block {block.get('id', 'unknown')}: {e}")
-                        # 创建一个错误块而不是跳过
-                        error_block = {
-                            "type": "paragraph",
-                            "text": f"[错误: 无法加载此块 - {str(e)[:100]}]",
-                            "color": "red",
-                            "id": str(block.get('id', 'error')),
-                            "_sequence": blocks_processed,
-                            "_error": True
-                        }
-                        batch_processed_blocks.append(error_block)
-                        blocks_processed += 1
-                
-                # Add batch to blocks list while preserving order
-                blocks.extend(batch_processed_blocks)
-                logger.info(f"Added {len(batch_processed_blocks)} processed blocks to output (total additional: {blocks_processed})")
-                
-                has_more = response["has_more"]
-                if has_more:
-                    next_cursor = response["next_cursor"]
-                    logger.info(f"More blocks still available, next_cursor: {next_cursor}")
-                else:
-                    next_cursor = None
-                    logger.info("No more blocks available from API")
-                    
-                # Stop if we've reached the limit
-                if blocks_processed >= max_limit:
-                    logger.info(f"Reached limit of {max_limit} additional blocks")
-                    break
-                    
-        except Exception as e:
-            logger.error(f"Unexpected error in more blocks loading: {e}")
-            logger.error("Stack trace:", exc_info=True)
-            # 不要抛出异常，而是返回已获取的内容
-            
-        logger.info(f"Successfully processed {len(blocks)} additional blocks")
-        
-        return {
-            "blocks": blocks,
-            "has_more": has_more,
-            "next_cursor": next_cursor,
-            "total_loaded": blocks_processed,
+            with request_deadline(REQUEST_DEADLINE):
+                response_data = await take_prefetched_slice(page_id, cursor, max_limit)
+                prefetched = response_data is not None
+                if not prefetched:
+                    async with track_live_request():
+                        response_data = await build_more_response(page_id, cursor, max_limit, limit)
+        except HTTPException as e:
+            if e.status_code not in (503, 504):
+                raise
+            error = e
+        if prefetched:
+            logger.info(f"Serving slice for page {page_id}, cursor {cursor} from prefetch cache")
+        
+        stale_since = None
+        snapshot_key = f"{normalize_notion_id(page_id)}:{cursor}"
+        if error or is_empty_partial(response_data):
+            # Notion 超时或不可用：退回到这一段最近一次成功的内容
+            snapshot = slice_snapshots.load(snapshot_key)
+            if snapshot is not None:
+                stale_since, response_data = snapshot
+                logger.warning(f"Notion unavailable, serving slice {cursor} of {page_id} from snapshot")
+            elif error:
+                raise error
+        else:
+            slice_snapshots.save(snapshot_key, response_data)
+            # 推测前端会继续请求下一段
+            schedule_next_slice(page_id, response_data["next_cursor"], max_limit)
+        headers = stale_headers(stale_since) if stale_since else {}
+        sizing = response_data["debug_info"].get("slice_sizing")
+        if sizing:
+            # compact 响应省略 debug_info，块数选择通过响应头暴露
+            headers["X-Slice-Size"] = f"{sizing['limit']}; adaptive={str(sizing['adaptive']).lower()}"
+        
+        if use_compact_profile(request, profile):
+            return FastJSONResponse({
+                "blocks": [compact_block(b) for b in response_data["blocks"]],
+                "has_more": response_data["has_more"],
+                "next_cursor": response_data["next_cursor"],
+                "total_loaded": response_data["total_loaded"]
+            }, headers=headers)
+        
+        return FastJSONResponse({
+            **response_data,
             "debug_info": {
+                **response_data["debug_info"],
                 "requested_limit": limit,
-                "actual_limit": max_limit,
-                "blocks_with_sequence": len([b for b in blocks if "_sequence" in b]),
-                "first_block_sequence": blocks[0].get("_sequence") if blocks else None,
-                "last_block_sequence": blocks[-1].get("_sequence") if blocks else None,
-                "request_cursor": cursor,
-                "response_cursor": next_cursor,
-                "error_blocks": len([b for b in blocks if b.get("_error")]),
-                "total_batches_processed": 1  # This endpoint processes one batch at a time
+                "prefetched": prefetched
             }
-        }
+        }, headers=headers)
         
     except HTTPException:
         raise
@@ -1394,11 +2870,220 @@ async def get_more_blocks(page_id: str, cursor: str, limit: Optional[int] = 15):
             }
         }
 
+# 缓存失效：鉴权的失效接口和 Notion webhook 接收端
+CACHE_INVALIDATION_TOKEN = os.environ.get("CACHE_INVALIDATION_TOKEN")
+NOTION_WEBHOOK_SECRET = os.environ.get("NOTION_WEBHOOK_SECRET")  # 订阅时 Notion 发来的 verification_token
+WEBHOOK_REWARM = os.environ.get("NOTION_WEBHOOK_REWARM", "true").lower() != "false"
+INDEX_REFRESH_DEBOUNCE = 2.0  # 合并短时间内的多次索引刷新（秒）
+
+# 影响页面索引（标题、suffix、Hidden 等属性或页面增删）的事件
+INDEX_EVENTS = {
+    "page.created", "page.properties_updated", "page.moved", "page.deleted", "page.undeleted",
+    "database.content_updated", "database.schema_updated", "data_source.content_updated",
+    "data_source.schema_updated"
+}
+CONTENT_EVENTS = {"page.content_updated", "page.properties_updated", "page.moved", "page.deleted", "page.locked", "page.unlocked"}
+
+index_refresh_task: Optional[asyncio.Task] = None
+
+def pages_containing_block(block_id: str) -> List[str]:
+    """找出包含该块的页面（块加载引擎记录了每个已加载顶层块所属的页面）"""
+    page_id = block_pages.get(normalize_notion_id(block_id))
+    return [page_id] if page_id else []
+
+def evict_pages(page_ids: List[str], drop_snapshots: bool = False) -> int:
+    """移除页面的首屏缓存、预取分段和进行中的预取；页面被删除时连同快照一起移除"""
+    targets = {normalize_notion_id(page_id) for page_id in page_ids}
+    evicted = 0
+    for page_id in targets:
+        # 写入时键已统一为去掉连字符的 ID（page_cache_key）
+        if cache.get(FIRST_SCREEN_KEY + page_id) is not None:
+            cache.delete(FIRST_SCREEN_KEY + page_id)
+            evicted += 1
+        cache.delete(SIGNED_URL_KEY + page_id)
+    for key in [k for k in slice_cache if normalize_notion_id(k[0]) in targets]:
+        del slice_cache[key]
+        evicted += 1
+    for key in [k for k in slice_inflight if normalize_notion_id(k[0]) in targets]:
+        slice_inflight.pop(key)[1].cancel()
+    if drop_snapshots:
+        for page_id in targets:
+            snapshots.discard(PAGE_SNAPSHOT_KEY + page_id)
+            cache.delete(PAGE_COST_KEY + page_id)
+            cache.delete(OUTLINE_KEY + page_id)
+        for key in [k for k in slice_snapshots.entries if k.split(":", 1)[0] in targets]:
+            slice_snapshots.discard(key)
+        for page_id in [pid for pid in search_index.documents if normalize_notion_id(pid) in targets]:
+            search_index.remove_page(page_id)
+        for block_id in [bid for bid, pid in block_pages.items() if normalize_notion_id(pid) in targets]:
+            del block_pages[block_id]
+    return evicted
+
+def expire_asset_catalogs():
+    """让资源目录在下次访问时后台重新同步"""
+    for catalog in asset_catalogs.values():
+        catalog["synced_at"] = -ASSET_CATALOG_TTL
+
+async def refresh_index_later():
+    await asyncio.sleep(INDEX_REFRESH_DEBOUNCE)
+    try:
+        await init_pages(force=True)
+    except Exception as e:
+        logger.warning(f"Scheduled index refresh failed: {e}")
+
+def schedule_index_refresh():
+    """安排一次页面索引刷新，短时间内的多次请求合并为一次"""
+    global index_refresh_task
+    if index_refresh_task and not index_refresh_task.done():
+        return
+    index_refresh_task = asyncio.get_event_loop().create_task(refresh_index_later())
+
+def refresh_expired_index() -> Optional[asyncio.Task]:
+    """
+    同步其他 worker 刷新的共享索引；本进程索引超过 INDEX_CACHE_TTL 时在后台刷新。
+    返回进行中的刷新任务（不需要刷新时为 None）。
+    """
+    global index_refresh_task
+    if sync_shared_index(INDEX_CACHE_TTL):
+        return None
+    if index_refreshed_at is not None and time.time() - index_refreshed_at < INDEX_CACHE_TTL:
+        return None
+    if not index_refresh_task or index_refresh_task.done():
+        index_refresh_task = asyncio.get_event_loop().create_task(init_pages())
+    return index_refresh_task
+
+def schedule_rewarm(page_ids: List[str]):
+    """在后台重新预热已失效的首屏"""
+    if page_ids:
+        asyncio.get_event_loop().create_task(warm_first_screens(page_ids))
+
+def require_bearer_token(authorization: Optional[str], token: Optional[str]):
+    if not token:
+        raise HTTPException(status_code=503, detail="Cache invalidation is not configured")
+    scheme, _, credentials = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(credentials.encode(), token.encode()):
+        raise HTTPException(status_code=401, detail="Invalid or missing bearer token")
+
+@app.post("/api/cache/invalidate")
+async def invalidate_cache(
+    authorization: Optional[str] = Header(None),
+    page_id: Optional[str] = Body(None),
+    block_id: Optional[str] = Body(None),
+    suffix: Optional[str] = Body(None),
+    all: bool = Body(False),
+    rewarm: bool = Body(False)
+):
+    """
+    按 page_id、block_id、suffix 或全部（all=true）使缓存失效，需要 Bearer CACHE_INVALIDATION_TOKEN。
+    rewarm=true 时在后台重新预热受影响页面的首屏。
+    """
+    require_bearer_token(authorization, CACHE_INVALIDATION_TOKEN)
+    if not (all or page_id or block_id or suffix):
+        raise HTTPException(status_code=400, detail="Specify page_id, block_id, suffix or all")
+    
+    if all:
+        first_screens = [key[len(FIRST_SCREEN_KEY):] for key in cache.keys(FIRST_SCREEN_KEY)]
+        page_ids = list(dict.fromkeys(first_screens + [normalize_notion_id(key[0]) for key in slice_cache]))
+        evicted = len(first_screens) + len(slice_cache)
+        cache.clear(FIRST_SCREEN_KEY)
+        slice_cache.clear()
+        for _, task in slice_inflight.values():
+            task.cancel()
+        slice_inflight.clear()
+        expire_asset_catalogs()
+        schedule_index_refresh()
+    else:
+        page_ids = []
+        if page_id:
+            page_ids.append(page_id)
+        if block_id:
+            page_ids.extend(pages_containing_block(block_id))
+        if suffix:
+            page_ids.extend(suffix_routes.page_ids(suffix))
+            # suffix 归属来自页面属性，刷新索引
+            schedule_index_refresh()
+        page_ids = list(dict.fromkeys(page_ids))
+        evicted = evict_pages(page_ids)
+    
+    if rewarm:
+        schedule_rewarm(page_ids)
+    logger.info(f"Cache invalidated: pages={page_ids if not all else 'all'}, entries={evicted}")
+    return FastJSONResponse({"invalidated_pages": page_ids, "evicted_entries": evicted, "rewarm": rewarm})
+
+def verify_webhook_signature(body: bytes, signature: Optional[str]) -> bool:
+    """X-Notion-Signature 为 sha256=<以 verification_token 为密钥的请求体 HMAC>"""
+    expected = "sha256=" + hmac.new(NOTION_WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+    return bool(signature) and hmac.compare_digest(signature, expected)
+
+def handle_webhook_event(event: dict) -> dict:
+    """根据事件类型失效页面缓存，并按需刷新索引和重新预热"""
+    event_type = event.get("type", "")
+    entity = event.get("entity") or {}
+    data = event.get("data") or {}
+    
+    page_ids = []
+    if entity.get("type") == "page" and event_type in CONTENT_EVENTS:
+        page_ids.append(entity["id"])
+        parent = data.get("parent") or {}
+        if parent.get("type") in ("page", "block"):
+            # 子页面标题等变化也会影响父页面中的 child_page 块
+            page_ids.append(parent["id"])
+    elif entity.get("type") == "block" and entity.get("id"):
+        page_ids.extend(pages_containing_block(entity["id"]))
+    
+    page_ids = list(dict.fromkeys(page_ids))
+    deleted = event_type == "page.deleted"
+    evicted = evict_pages(page_ids, drop_snapshots=deleted)
+    
+    refresh = event_type in INDEX_EVENTS
+    if entity.get("type") == "page":
+        # 子页面增删、移动或改名：重新列出该页面和父页面的子页面（索引刷新后会安排构建）
+        page_hierarchy.mark_dirty(page_ids)
+    if refresh:
+        expire_asset_catalogs()
+        schedule_index_refresh()
+    elif page_hierarchy.dirty:
+        schedule_hierarchy_build()
+    if WEBHOOK_REWARM and not deleted:
+        schedule_rewarm(page_ids)
+    return {"type": event_type, "invalidated_pages": page_ids, "evicted_entries": evicted, "index_refresh": refresh}
+
+@app.post("/api/notion/webhook")
+async def notion_webhook(request: Request, x_notion_signature: Optional[str] = Header(None)):
+    """
+    Notion webhook 接收端。
+    订阅时 Notion 会先发送 verification_token，需要把它配置为 NOTION_WEBHOOK_SECRET；
+    之后的事件都要通过签名校验才会处理。
+    """
+    body = await request.body()
+    try:
+        event = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON body")
+    if not isinstance(event, dict):
+        raise HTTPException(status_code=400, detail="Webhook body must be a JSON object")
+    
+    if "verification_token" in event and "type" not in event:
+        # 令牌就是签名密钥，日志中只保留前几位用于核对
+        token = str(event["verification_token"])
+        logger.warning(f"Notion webhook verification token received ({token[:10]}..., {len(token)} chars); "
+                       f"set it as NOTION_WEBHOOK_SECRET")
+        return FastJSONResponse({"ok": True})
+    
+    if not NOTION_WEBHOOK_SECRET:
+        raise HTTPException(status_code=503, detail="Webhook secret is not configured")
+    if not verify_webhook_signature(body, x_notion_signature):
+        raise HTTPException(status_code=401, detail="Invalid webhook signature")
+    
+    result = handle_webhook_event(event)
+    logger.info(f"Webhook {event.get('id')} handled: {result}")
+    return FastJSONResponse({"ok": True, **result})
+
 @app.get("/api/notion/page/{page_id}")
 async def get_notion_page(page_id: str):
     """直接返回 Notion API 的原始页面数据"""
     try:
-        page_data = notion.pages.retrieve(page_id=page_id)
+        page_data = await notion.retrieve_page(page_id=page_id)
         return page_data
     except Exception as e:
         logger.error(f"Error retrieving page {page_id}: {str(e)}")
@@ -1424,7 +3109,7 @@ async def query_notion_database(
             query["page_size"] = page_size
 
         logger.info(f"Querying database with params: {query}")
-        response = notion.databases.query(
+        response = await notion.query_database(
             database_id=DATABASE_ID,
             **query
         )
@@ -1438,7 +3123,7 @@ async def get_database_raw():
     """获取数据库原始数据，用于调试"""
     try:
         logger.info("Getting raw database data for debugging...")
-        response = notion.databases.query(
+        response = await notion.query_database(
             database_id=DATABASE_ID,
             page_size=100  # 设置较大的页面大小以获取更多数据
         )
@@ -1491,55 +3176,50 @@ async def proxy_heic_image(url: str):
         if 'notion.so' in url:
             headers['Referer'] = 'https://www.notion.so/'
         
-        # Use httpx for async HTTP requests with longer timeout
-        async with httpx.AsyncClient(
-            timeout=httpx.Timeout(60.0),  # 60 second timeout
-            follow_redirects=True,
-            headers=headers
-        ) as client:
-            logger.info(f"Making request to: {url}")
-            response = await client.get(url)
-            
-            logger.info(f"Response status: {response.status_code}")
-            logger.info(f"Response headers: {dict(response.headers)}")
-            
-            if response.status_code != 200:
-                logger.error(f"Failed to fetch image: HTTP {response.status_code}")
-                raise HTTPException(
-                    status_code=response.status_code, 
-                    detail=f"Failed to fetch image: HTTP {response.status_code}"
-                )
-            
-            # Get content type
-            content_type = response.headers.get('content-type', 'application/octet-stream')
-            content_length = len(response.content)
-            
-            logger.info(f"Successfully fetched {content_length} bytes")
-            logger.info(f"Content type: {content_type}")
-            
-            # Validate HEIC file signature
-            if content_length >= 12:
-                header = response.content[:12]
-                # Check for HEIC signature: ftypheic or ftypmif1
-                if b'ftypheic' in header or b'ftypmif1' in header:
-                    logger.info("✅ Valid HEIC file signature detected")
-                else:
-                    logger.warning(f"⚠️ File signature check: {header.hex()}")
-            
-            # Return the image data with proper headers
-            return Response(
-                content=response.content,
-                media_type='image/heic',
-                headers={
-                    'Content-Type': 'image/heic',
-                    'Content-Length': str(content_length),
-                    'Cache-Control': 'public, max-age=3600',  # Cache for 1 hour
-                    'Access-Control-Allow-Origin': '*',
-                    'Access-Control-Allow-Methods': 'GET',
-                    'Access-Control-Allow-Headers': '*',
-                }
+        # 共享客户端（60 秒超时、跟随重定向）复用连接，不必每次请求重新建立 TLS 上下文
+        logger.info(f"Making request to: {url}")
+        response = await get_http_client().get(url, headers=headers)
+        
+        logger.info(f"Response status: {response.status_code}")
+        logger.info(f"Response headers: {dict(response.headers)}")
+        
+        if response.status_code != 200:
+            logger.error(f"Failed to fetch image: HTTP {response.status_code}")
+            raise HTTPException(
+                status_code=response.status_code, 
+                detail=f"Failed to fetch image: HTTP {response.status_code}"
             )
-            
+        
+        # Get content type
+        content_type = response.headers.get('content-type', 'application/octet-stream')
+        content_length = len(response.content)
+        
+        logger.info(f"Successfully fetched {content_length} bytes")
+        logger.info(f"Content type: {content_type}")
+        
+        # Validate HEIC file signature
+        if content_length >= 12:
+            header = response.content[:12]
+            # Check for HEIC signature: ftypheic or ftypmif1
+            if b'ftypheic' in header or b'ftypmif1' in header:
+                logger.info("✅ Valid HEIC file signature detected")
+            else:
+                logger.warning(f"⚠️ File signature check: {header.hex()}")
+        
+        # Return the image data with proper headers
+        return Response(
+            content=response.content,
+            media_type='image/heic',
+            headers={
+                'Content-Type': 'image/heic',
+                'Content-Length': str(content_length),
+                'Cache-Control': 'public, max-age=3600',  # Cache for 1 hour
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': 'GET',
+                'Access-Control-Allow-Headers': '*',
+            }
+        )
+        
     except httpx.RequestError as e:
         logger.error(f"Network error while fetching image: {e}")
         raise HTTPException(status_code=503, detail=f"Network error: {str(e)}")
@@ -1560,15 +3240,9 @@ async def validate_page(page_id: str):
         logger.info(f"Validating page: {page_id}")
         
         # 使用简单的页面检索来验证
-        import asyncio
-        from functools import partial
         
         try:
-            loop = asyncio.get_event_loop()
-            page = await asyncio.wait_for(
-                loop.run_in_executor(None, partial(notion.pages.retrieve, page_id=page_id)),
-                timeout=10.0  # 短超时用于快速验证
-            )
+            page = await notion.retrieve_page(page_id=page_id, timeout=10.0)  # 短超时用于快速验证
             
             # 检查页面是否被隐藏
             properties = page.get("properties", {})
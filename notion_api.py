@@ -0,0 +1,371 @@
+"""
+Notion 异步访问层
+
+notion_client.Client 是同步客户端，直接在 async 路由中调用会阻塞整个事件循环。
+所有 Notion 请求都经由 AsyncNotion 在专用的有界线程池中执行，避免慢请求拖住其他请求，
+也不会占满事件循环默认线程池。每个请求可以设置统一的截止时间，其中所有 Notion 调用共享剩余时间。
+剩余时间同时作为该次 HTTP 请求的超时传给客户端：因截止时间放弃或对冲落败的调用在线程中也会随之结束，
+不会占着线程池等到客户端自己的 30 秒超时。
+
+所有读请求共用同一套容错策略：瞬时错误（超时、429、5xx）带抖动重试；连续失败时熔断器打开，
+在冷却期内直接抛出 NotionUnavailable，由调用方退回到缓存内容；首屏块列表可以发起对冲请求。
+后台任务（层级索引、大纲扫描）通过 derive() 得到的实例调用：共用客户端和线程池，但有自己的熔断器和
+令牌桶限速，既不会用完 Notion 的速率配额，失败也不会让实时请求的熔断器打开。
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from functools import partial
+from typing import Callable, Optional
+
+import httpx
+from notion_client.errors import HTTPResponseError, RequestTimeoutError
+
+# 专用线程池大小：限制同时进行的 Notion 请求数
+NOTION_EXECUTOR_WORKERS = int(os.environ.get("NOTION_EXECUTOR_WORKERS", "16"))
+
+# 重试：仅对幂等读请求生效，指数退避加全抖动
+NOTION_RETRY_ATTEMPTS = int(os.environ.get("NOTION_RETRY_ATTEMPTS", "3"))
+NOTION_RETRY_BASE_DELAY = 0.25
+NOTION_RETRY_MAX_DELAY = 4.0
+RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+
+# 熔断器：连续失败达到阈值后打开，冷却期结束后放行少量探测请求（一次页面请求会并发 3 个调用）
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get("NOTION_BREAKER_THRESHOLD", "5"))
+BREAKER_RESET_TIMEOUT = float(os.environ.get("NOTION_BREAKER_RESET_SECONDS", "30"))
+BREAKER_HALF_OPEN_PROBES = 3
+
+# 对冲请求：首个请求超过该延迟仍未返回时再发一个相同的请求，先返回者胜出（0 表示关闭）
+NOTION_HEDGE_DELAY = float(os.environ.get("NOTION_HEDGE_DELAY", "0.75"))
+
+# 当前请求的截止时间（time.monotonic() 时间点），由路由通过 request_deadline() 设置
+_request_deadline: ContextVar[Optional[float]] = ContextVar("notion_request_deadline", default=None)
+# 单次调用的 HTTP 超时（秒），在线程池中执行调用时设置，由 httpx 请求钩子写入请求
+_call_timeout: ContextVar[Optional[float]] = ContextVar("notion_call_timeout", default=None)
+
+
+@contextmanager
+def request_deadline(seconds: Optional[float]):
+    """Bound every Notion call made in this context to one shared wall-clock deadline (None disables it)."""
+    token = _request_deadline.set(time.monotonic() + seconds if seconds is not None else None)
+    try:
+        yield
+    finally:
+        _request_deadline.reset(token)
+
+
+def remaining_time() -> Optional[float]:
+    """Seconds left before the current request deadline, or None when no deadline is set."""
+    deadline = _request_deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def apply_call_timeout(request: httpx.Request):
+    """httpx request hook: bound the HTTP request to the timeout of the Notion call that sends it."""
+    timeout = _call_timeout.get()
+    if timeout is not None:
+        request.extensions["timeout"] = httpx.Timeout(max(timeout, 0.001)).as_dict()
+
+
+def install_timeout_hook(client):
+    """Register apply_call_timeout on the httpx client inside a notion_client.Client (no-op for other objects)."""
+    http_client = getattr(client, "client", None)
+    if isinstance(http_client, httpx.Client) and apply_call_timeout not in http_client.event_hooks["request"]:
+        http_client.event_hooks["request"].append(apply_call_timeout)
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """The request deadline ran out; says nothing about Notion's health and is never retried."""
+
+
+class NotionUnavailable(Exception):
+    """Raised without calling Notion while the circuit breaker is open."""
+
+
+def is_transient(error: BaseException) -> bool:
+    """Errors worth retrying and counting against the circuit breaker."""
+    if isinstance(error, (asyncio.TimeoutError, RequestTimeoutError, httpx.TransportError)):
+        return True
+    if isinstance(error, HTTPResponseError):
+        return error.status in RETRYABLE_STATUS
+    return False
+
+
+def retry_delay(attempt: int, error: BaseException) -> float:
+    """Full-jitter exponential backoff; 429 responses honour Retry-After."""
+    if isinstance(error, HTTPResponseError) and error.status == 429:
+        try:
+            return float(error.headers.get("retry-after"))
+        except (TypeError, ValueError):
+            pass
+    return random.uniform(0, min(NOTION_RETRY_MAX_DELAY, NOTION_RETRY_BASE_DELAY * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker: closed -> open -> half_open (a few probes) -> closed."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_timeout: float = BREAKER_RESET_TIMEOUT, half_open_probes: int = BREAKER_HALF_OPEN_PROBES):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probes = 0
+        self.stats = Counter(trips=0, rejected=0)
+
+    def allow(self) -> bool:
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                self.stats["rejected"] += 1
+                return False
+            self.state = self.HALF_OPEN
+            self.probes = 0
+        if self.state == self.HALF_OPEN:
+            if self.probes >= self.half_open_probes:
+                self.stats["rejected"] += 1
+                return False
+            self.probes += 1
+        return True
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self.probes = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.stats["trips"] += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self.probes = 0
+
+    def release(self):
+        """Give up a half-open probe slot without an outcome (e.g. the call was cancelled)."""
+        if self.state == self.HALF_OPEN and self.probes > 0:
+            self.probes -= 1
+
+    def snapshot(self) -> dict:
+        retry_in = self.reset_timeout - (time.monotonic() - self.opened_at) if self.state == self.OPEN else 0.0
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "retry_in": round(max(0.0, retry_in), 1),
+            **self.stats
+        }
+
+
+class TokenBucket:
+    """Async token bucket: ``rate`` calls per second on average, bursts of up to ``capacity`` calls."""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.waited = 0.0
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            delay = (1 - self.tokens) / self.rate
+            self.waited += delay
+            await asyncio.sleep(delay)
+
+    def snapshot(self) -> dict:
+        return {"rate": self.rate, "waited": round(self.waited, 1)}
+
+
+class AsyncNotion:
+    """
+    Async facade over a synchronous Notion client, backed by a dedicated executor.
+
+    Pass either a ready ``client`` or a ``client_factory``; the factory runs on first use, so
+    importing the app does not pay for the HTTP transport and TLS setup.
+    """
+
+    def __init__(self, client=None, max_workers: int = NOTION_EXECUTOR_WORKERS,
+                 client_factory: Optional[Callable[[], object]] = None):
+        self._client = client
+        if client is not None:
+            install_timeout_hook(client)
+        self.client_factory = client_factory
+        self.client_lock = threading.Lock()
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="notion")
+        self.breaker = CircuitBreaker()
+        self.limiter: Optional[TokenBucket] = None
+        self.source: Optional["AsyncNotion"] = None
+        self.stats = Counter(calls=0, retries=0, failures=0, hedged=0, hedge_wins=0)
+
+    def derive(self, limiter: Optional[TokenBucket] = None) -> "AsyncNotion":
+        """
+        A facade sharing this client and executor with its own circuit breaker and an optional rate
+        limit, for background work whose failures must not trip the breaker live requests go through.
+        """
+        derived = AsyncNotion.__new__(AsyncNotion)
+        derived.__dict__.update(self.__dict__)
+        derived.source = self
+        derived.breaker = CircuitBreaker()
+        derived.limiter = limiter
+        derived.stats = Counter(calls=0, retries=0, failures=0, hedged=0, hedge_wins=0)
+        return derived
+
+    @property
+    def client(self):
+        if self.source is not None:
+            return self.source.client
+        if self._client is None:
+            with self.client_lock:
+                if self._client is None:
+                    client = self.client_factory()
+                    install_timeout_hook(client)
+                    self._client = client
+        return self._client
+
+    async def warm_up(self):
+        """Build the client on the executor so its imports and TLS setup do not block the event loop."""
+        if self._client is None:
+            await asyncio.get_running_loop().run_in_executor(self.executor, lambda: self.client)
+
+    async def _call_once(self, method, timeout: Optional[float], kwargs: dict):
+        """
+        Run ``method(**kwargs)`` on the Notion executor.
+
+        The call is bounded by ``timeout`` and by the remaining request deadline, whichever is
+        shorter; once the deadline has passed no new upstream call is started. The same bound is
+        the HTTP timeout of the request, so the worker thread is released when the caller gives up.
+        """
+        clipped = False
+        remaining = remaining_time()
+        if remaining is not None:
+            if remaining <= 0:
+                raise DeadlineExceeded("Request deadline exceeded")
+            clipped = timeout is None or remaining < timeout
+            timeout = remaining if clipped else timeout
+
+        loop = asyncio.get_running_loop()
+        # run_in_executor 不传递上下文：在复制的上下文中设置超时，再在线程中运行
+        context = copy_context()
+        context.run(_call_timeout.set, timeout)
+        future = loop.run_in_executor(self.executor, partial(context.run, method, **kwargs))
+        if timeout is None:
+            return await future
+        try:
+            return await asyncio.wait_for(future, timeout=timeout)
+        except asyncio.TimeoutError:
+            if clipped:
+                raise DeadlineExceeded("Request deadline exceeded") from None
+            raise
+
+    async def call(self, method, timeout: Optional[float] = None, idempotent: bool = True, **kwargs):
+        """
+        Call Notion through the circuit breaker, retrying transient errors of idempotent requests
+        with jittered backoff as long as the request deadline leaves room for another attempt.
+        """
+        attempts = NOTION_RETRY_ATTEMPTS if idempotent else 1
+        for attempt in range(attempts):
+            if not self.breaker.allow():
+                raise NotionUnavailable("Notion API is unavailable (circuit breaker open)")
+            if self.limiter is not None:
+                try:
+                    await self.limiter.acquire()
+                except asyncio.CancelledError:
+                    self.breaker.release()
+                    raise
+            self.stats["calls"] += 1
+            try:
+                result = await self._call_once(method, timeout, kwargs)
+            except DeadlineExceeded:
+                self.breaker.release()
+                raise
+            except asyncio.CancelledError:
+                self.breaker.release()
+                raise
+            except Exception as e:
+                if not is_transient(e):
+                    # Notion 正常作答（如 404），不影响熔断状态
+                    self.breaker.record_success()
+                    raise
+                self.stats["failures"] += 1
+                self.breaker.record_failure()
+                if attempt == attempts - 1:
+                    raise
+                delay = retry_delay(attempt, e)
+                remaining = remaining_time()
+                if remaining is not None and remaining <= delay:
+                    raise
+                self.stats["retries"] += 1
+                await asyncio.sleep(delay)
+            else:
+                self.breaker.record_success()
+                return result
+
+    async def hedged_call(self, method, timeout: Optional[float] = None, delay: Optional[float] = None, **kwargs):
+        """
+        Start a duplicate of the call if the first one has not answered after ``delay`` seconds
+        (NOTION_HEDGE_DELAY by default) and return whichever succeeds first.
+        Hedging is skipped while the breaker is not closed.
+        """
+        if delay is None:
+            delay = NOTION_HEDGE_DELAY
+        if delay <= 0 or self.breaker.state != CircuitBreaker.CLOSED:
+            return await self.call(method, timeout=timeout, **kwargs)
+
+        first = asyncio.ensure_future(self.call(method, timeout=timeout, **kwargs))
+        pending = {first}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if not done:
+                self.stats["hedged"] += 1
+                pending.add(asyncio.ensure_future(self.call(method, timeout=timeout, **kwargs)))
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not first:
+                            self.stats["hedge_wins"] += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def health(self) -> dict:
+        health = {"breaker": self.breaker.snapshot(), **self.stats}
+        if self.limiter is not None:
+            health["rate_limit"] = self.limiter.snapshot()
+        return health
+
+    async def retrieve_block(self, block_id: str, timeout: Optional[float] = None) -> dict:
+        return await self.call(self.client.blocks.retrieve, timeout=timeout, block_id=block_id)
+
+    async def retrieve_page(self, page_id: str, timeout: Optional[float] = None) -> dict:
+        return await self.call(self.client.pages.retrieve, timeout=timeout, page_id=page_id)
+
+    async def list_children(self, block_id: str, timeout: Optional[float] = None, hedge: bool = False, **params) -> dict:
+        call = self.hedged_call if hedge else self.call
+        return await call(self.client.blocks.children.list, timeout=timeout, block_id=block_id, **params)
+
+    async def query_database(self, database_id: str, timeout: Optional[float] = None, **params) -> dict:
+        return await self.call(self.client.databases.query, timeout=timeout, database_id=database_id, **params)
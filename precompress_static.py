@@ -0,0 +1,70 @@
+"""
+预压缩静态资源：为 static/ 下的文本资源生成 .br / .gz 副本，
+由 main.py 中的 PrecompressedStaticFiles 直接返回，避免每次请求实时压缩。
+
+用法（部署前执行）：
+    python precompress_static.py
+"""
+import gzip
+import os
+import sys
+
+try:
+    import brotli
+except ImportError:  # 未安装 brotli 时只生成 .gz
+    brotli = None
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+COMPRESSIBLE_EXTENSIONS = (".css", ".js", ".html", ".json", ".svg", ".ico", ".txt")
+MINIMUM_SIZE = 1024  # 太小的文件压缩收益不大
+
+
+def compress_file(path: str) -> dict:
+    """Write .gz (and .br when available) siblings for ``path`` and return their sizes."""
+    with open(path, "rb") as f:
+        data = f.read()
+
+    sizes = {"raw": len(data)}
+    variants = [(".gz", lambda d: gzip.compress(d, compresslevel=9, mtime=0))]
+    if brotli:
+        variants.append((".br", lambda d: brotli.compress(d, quality=11)))
+
+    for suffix, compress in variants:
+        target = path + suffix
+        if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+            sizes[suffix] = os.path.getsize(target)
+            continue
+        compressed = compress(data)
+        if len(compressed) >= len(data):
+            # 压缩无收益时删除旧副本，直接返回原文件
+            if os.path.exists(target):
+                os.remove(target)
+            continue
+        with open(target, "wb") as f:
+            f.write(compressed)
+        sizes[suffix] = len(compressed)
+    return sizes
+
+
+def main() -> int:
+    totals = {"raw": 0, ".gz": 0, ".br": 0}
+    for root, _, files in os.walk(STATIC_DIR):
+        for name in sorted(files):
+            if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+                continue
+            path = os.path.join(root, name)
+            if os.path.getsize(path) < MINIMUM_SIZE:
+                continue
+            sizes = compress_file(path)
+            totals["raw"] += sizes["raw"]
+            for suffix in (".gz", ".br"):
+                totals[suffix] += sizes.get(suffix, sizes["raw"])
+            print(f"{os.path.relpath(path, STATIC_DIR)}: {sizes}")
+
+    print(f"Total raw: {totals['raw']} bytes, gzip: {totals['.gz']} bytes"
+          + (f", brotli: {totals['.br']} bytes" if brotli else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
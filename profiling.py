@@ -0,0 +1,299 @@
+"""
+按需性能剖析（默认关闭）
+
+设置 PROFILING_TOKEN 后 main.py 才会导入本模块、注册 /api/debug/profile 与 /api/debug/memory 路由并安装
+RouteProfilingMiddleware；未设置时既不导入也不挂载任何东西，对请求没有额外开销。所有接口都需要
+Authorization: Bearer $PROFILING_TOKEN。
+
+- 采样剖析（mode=sample）：后台线程定期读取所有线程的调用栈（包括执行 Notion 请求的线程池），
+  输出 flamegraph.pl / speedscope / inferno 可直接读取的 folded stacks 文本
+- cProfile（mode=cprofile）：剖析事件循环线程，输出 pstats 文件（snakeviz、flameprof、python -m pstats）
+  或 format=text 的文本摘要；协程交错执行，结果包含同一时间段内其他请求的开销
+- 剖析时长可以是固定秒数（seconds=N），也可以是下一个匹配路由模板的请求（route=/api/page/{page_id}）
+- tracemalloc：按需开启内存分配追踪，返回分配最多的代码位置（默认只看本仓库的文件），可与上一次快照对比
+"""
+import asyncio
+import cProfile
+import hmac
+import io
+import linecache
+import marshal
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+
+PROFILING_TOKEN = os.environ.get("PROFILING_TOKEN")
+PROFILE_MAX_SECONDS = 60.0
+SAMPLE_INTERVAL = 0.005  # 采样间隔（秒）
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# 空闲线程的栈顶位置：事件循环等待 IO、线程池等待任务
+IDLE_LEAVES = {("selectors.py", "select"), ("threading.py", "wait"), ("thread.py", "_worker")}
+
+
+# 不统计剖析接口自身的分配（快照、格式化 traceback 时读取源码）
+OWN_ALLOCATIONS = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, linecache.__file__),
+                   tracemalloc.Filter(False, __file__)]
+
+
+class SamplingProfiler:
+    """Wall-clock sampler over every thread, aggregated as folded stacks."""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL, include_idle: bool = False):
+        self.interval = interval
+        self.include_idle = include_idle
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="profiler-sampler", daemon=True)
+        self.thread.start()
+
+    def stop(self) -> Counter:
+        self.running = False
+        if self.thread:
+            self.thread.join()
+        return self.stacks
+
+    def _run(self):
+        own = threading.get_ident()
+        while self.running:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                leaf = (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name)
+                if not self.include_idle and leaf in IDLE_LEAVES:
+                    continue
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+            time.sleep(self.interval)
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class ProfileSession:
+    """
+    One profiling run in either mode; ``start``/``stop`` must be called from the event loop thread.
+    ``stop`` is idempotent, so a timed-out trigger and the middleware can both call it.
+    """
+
+    def __init__(self, mode: str, include_idle: bool = False):
+        self.mode = mode
+        self.sampler = SamplingProfiler(include_idle=include_idle) if mode == "sample" else None
+        self.profile = cProfile.Profile() if mode == "cprofile" else None
+        self.started = 0.0
+        self.elapsed = 0.0
+        self.running = False
+
+    def start(self):
+        self.running = True
+        self.started = time.perf_counter()
+        if self.sampler:
+            self.sampler.start()
+        else:
+            self.profile.enable()
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        if self.sampler:
+            self.sampler.stop()
+        else:
+            self.profile.disable()
+        self.elapsed = time.perf_counter() - self.started
+
+    def response(self, output_format: str, label: str) -> Response:
+        headers = {"X-Profile-Seconds": f"{self.elapsed:.3f}", "X-Profile-Target": label}
+        if self.sampler:
+            headers["X-Profile-Samples"] = str(self.sampler.samples)
+            return PlainTextResponse(self.sampler.folded(), headers={
+                **headers, "Content-Disposition": 'attachment; filename="profile.folded"'})
+        if output_format == "text":
+            buffer = io.StringIO()
+            pstats.Stats(self.profile, stream=buffer).sort_stats("cumulative").print_stats(60)
+            return PlainTextResponse(buffer.getvalue(), headers=headers)
+        # 与 pstats.Stats.dump_stats() 写出的格式相同
+        self.profile.create_stats()
+        return Response(marshal.dumps(self.profile.stats), media_type="application/octet-stream", headers={
+            **headers, "Content-Disposition": 'attachment; filename="profile.prof"'})
+
+
+def route_pattern(template: str) -> re.Pattern:
+    """'/api/page/{page_id}' -> regex matching concrete paths; parameters match one path segment."""
+    parts = re.split(r"(\{[^}]+\})", template)
+    return re.compile("".join("[^/]+" if part.startswith("{") else re.escape(part) for part in parts) + "$")
+
+
+class ProfilerState:
+    """Only one session runs at a time; a route trigger waits here for its request."""
+
+    def __init__(self):
+        self.busy = False
+        self.armed: Optional[tuple] = None  # (pattern, session, future)
+        self.memory_baseline: Optional[tracemalloc.Snapshot] = None
+
+
+state = ProfilerState()
+
+
+class RouteProfilingMiddleware:
+    """Profiles the next request whose path matches an armed route; a single attribute check otherwise."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        armed = state.armed
+        if armed is None or scope["type"] != "http" or not armed[0].match(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        pattern, session, future = armed
+        state.armed = None
+        session.start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            session.stop()
+            if not future.done():
+                future.set_result(scope["path"])
+
+
+def require_profiling_token(authorization: Optional[str] = Header(None)):
+    scheme, _, credentials = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(credentials.encode(), (PROFILING_TOKEN or "").encode()):
+        raise HTTPException(status_code=401, detail="Invalid or missing bearer token")
+
+
+router = APIRouter(prefix="/api/debug", dependencies=[Depends(require_profiling_token)])
+
+
+@router.post("/profile")
+async def run_profile(
+    mode: str = Query("sample", pattern="^(sample|cprofile)$"),
+    seconds: Optional[float] = Query(None, gt=0, le=PROFILE_MAX_SECONDS),
+    route: Optional[str] = Query(None, description="route template, e.g. /api/page/{page_id}"),
+    timeout: float = Query(30.0, gt=0, le=300),
+    output: str = Query("raw", alias="format", pattern="^(raw|text)$"),
+    idle: bool = False
+):
+    """
+    剖析 seconds 秒，或等待下一个匹配 route 的请求并剖析它（最多等待 timeout 秒）。
+    mode=sample 返回 folded stacks；mode=cprofile 返回 pstats 文件，format=text 时返回文本摘要。
+    """
+    if (seconds is None) == (route is None):
+        raise HTTPException(status_code=400, detail="Specify exactly one of seconds or route")
+    if state.busy:
+        raise HTTPException(status_code=409, detail="A profiling session is already running")
+
+    state.busy = True
+    session = ProfileSession(mode, include_idle=idle)
+    try:
+        if seconds is not None:
+            session.start()
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                session.stop()
+            return session.response(output, f"{seconds:g}s")
+
+        future = asyncio.get_running_loop().create_future()
+        state.armed = (route_pattern(route), session, future)
+        try:
+            path = await asyncio.wait_for(future, timeout=timeout)
+        except asyncio.TimeoutError:
+            # 匹配的请求可能已经开始剖析但还没结束：先停止，再释放 busy，避免与下一次剖析重叠
+            session.stop()
+            raise HTTPException(status_code=408, detail=f"No request matched {route} within {timeout:g}s")
+        finally:
+            state.armed = None
+        return session.response(output, path)
+    finally:
+        state.busy = False
+
+
+@router.post("/memory/start")
+async def start_memory_tracing(frames: int = Query(10, ge=1, le=64)):
+    """开始追踪内存分配（有明显开销，排查完后调用 /memory/stop）"""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+    state.memory_baseline = tracemalloc.take_snapshot()
+    return {"tracing": True, "frames": tracemalloc.get_traceback_limit()}
+
+
+@router.post("/memory/stop")
+async def stop_memory_tracing():
+    tracemalloc.stop()
+    state.memory_baseline = None
+    return {"tracing": False}
+
+
+def filter_snapshot(snapshot: tracemalloc.Snapshot, scope: str) -> tracemalloc.Snapshot:
+    snapshot = snapshot.filter_traces(OWN_ALLOCATIONS)
+    if scope == "repo":
+        snapshot = snapshot.filter_traces([tracemalloc.Filter(True, os.path.join(REPO_ROOT, "*"), all_frames=True)])
+    return snapshot
+
+
+@router.get("/memory")
+async def memory_snapshot(
+    top: int = Query(25, ge=1, le=200),
+    group_by: str = Query("lineno", pattern="^(lineno|traceback|filename)$"),
+    scope: str = Query("repo", pattern="^(repo|all)$"),
+    diff: bool = False
+):
+    """
+    分配最多的代码位置。scope=repo 只统计本仓库文件中的分配（块处理流水线都在这里），
+    diff=true 时与上一次快照（或 /memory/start 时的快照）对比增长量。
+    """
+    if not tracemalloc.is_tracing():
+        raise HTTPException(status_code=409, detail="Memory tracing is off; POST /api/debug/memory/start first")
+
+    snapshot = tracemalloc.take_snapshot()
+    if diff and state.memory_baseline is not None:
+        stats = filter_snapshot(snapshot, scope).compare_to(filter_snapshot(state.memory_baseline, scope), group_by)
+    else:
+        stats = filter_snapshot(snapshot, scope).statistics(group_by)
+    entries = []
+    for stat in stats[:top]:
+        entry = {
+            "location": stat.traceback.format(limit=8 if group_by == "traceback" else 1),
+            "size_kb": round(stat.size / 1024, 1),
+            "count": stat.count
+        }
+        if diff:
+            entry["size_diff_kb"] = round(getattr(stat, "size_diff", stat.size) / 1024, 1)
+            entry["count_diff"] = getattr(stat, "count_diff", stat.count)
+        entries.append(entry)
+    state.memory_baseline = snapshot
+
+    current, peak = tracemalloc.get_traced_memory()
+    return JSONResponse({
+        "traced_current_mb": round(current / 1024 / 1024, 2),
+        "traced_peak_mb": round(peak / 1024 / 1024, 2),
+        "group_by": group_by,
+        "scope": scope,
+        "diff": diff,
+        "top": entries
+    })
@@ -0,0 +1,134 @@
+"""
+最近一次成功结果的快照（stale-if-error）
+
+Notion 超时或不可用时，路由用这里保存的页面索引和已处理页面内容兜底，返回稍旧的内容而不是错误或空白页。
+快照默认只保存在内存中；设置 STALE_SNAPSHOT_DIR 后同时写入磁盘，冷启动后也能使用
+（Vercel 上只有 /tmp 可写，例如 STALE_SNAPSHOT_DIR=/tmp/notion-snapshots）。
+以 pinned_prefixes 中任一前缀开头的键（页面索引、层级索引）不计入容量，大量页面快照也不会把它们挤出内存。
+在事件循环中保存大快照时用 save_async，序列化和写文件在线程中进行。
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Iterable, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # 未安装 orjson 时使用标准库
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+STALE_SNAPSHOT_DIR = os.environ.get("STALE_SNAPSHOT_DIR") or None
+SNAPSHOT_MAX_ENTRIES = int(os.environ.get("SNAPSHOT_MAX_ENTRIES", "500"))
+
+
+def _dumps(data: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _loads(raw: bytes) -> Any:
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+
+class SnapshotStore:
+    """
+    Last-good payloads keyed by string, kept in an in-memory LRU and optionally mirrored
+    to one JSON file per key so they survive restarts. Pinned keys live outside the LRU.
+    """
+
+    def __init__(self, directory: Optional[str] = STALE_SNAPSHOT_DIR, max_entries: int = SNAPSHOT_MAX_ENTRIES,
+                 pinned_prefixes: Iterable[str] = ()):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.pinned_prefixes = tuple(pinned_prefixes)
+        self.entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.pinned: dict = {}
+        if directory:
+            try:
+                os.makedirs(directory, exist_ok=True)
+            except OSError as e:
+                logger.warning(f"Snapshot directory {directory} unavailable, keeping snapshots in memory: {e}")
+                self.directory = None
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".json")
+
+    def is_pinned(self, key: str) -> bool:
+        return key.startswith(self.pinned_prefixes)
+
+    def _remember(self, key: str, entry: Tuple[float, Any]):
+        if self.is_pinned(key):
+            self.pinned[key] = entry
+            return
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def save(self, key: str, data: Any):
+        """Record ``data`` as the last good value for ``key``."""
+        entry = (time.time(), data)
+        self._remember(key, entry)
+        if self.directory:
+            self._write(key, entry)
+
+    async def save_async(self, key: str, data: Any):
+        """``save`` from the event loop: memory is updated at once, the file is written in a thread."""
+        entry = (time.time(), data)
+        self._remember(key, entry)
+        if self.directory:
+            await asyncio.to_thread(self._write, key, entry)
+
+    def _write(self, key: str, entry: Tuple[float, Any]):
+        path = self._path(key)
+        try:
+            # 先写临时文件再替换，避免读到写了一半的快照
+            with open(path + ".tmp", "wb") as f:
+                f.write(_dumps({"key": key, "saved_at": entry[0], "data": entry[1]}))
+            os.replace(path + ".tmp", path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Failed to persist snapshot {key}: {e}")
+
+    def load(self, key: str) -> Optional[Tuple[float, Any]]:
+        """Return ``(saved_at, data)`` for ``key``, falling back to disk; None when never saved."""
+        entry = self.pinned.get(key)
+        if entry is not None:
+            return entry
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            return entry
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key), "rb") as f:
+                stored = _loads(f.read())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to read snapshot {key}: {e}")
+            return None
+        if stored.get("key") != key:
+            return None
+        entry = (stored["saved_at"], stored["data"])
+        self._remember(key, entry)
+        return entry
+
+    def discard(self, key: str):
+        self.entries.pop(key, None)
+        self.pinned.pop(key, None)
+        if self.directory:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def __len__(self) -> int:
+        return len(self.entries) + len(self.pinned)
@@ -16,6 +16,7 @@ let isInitializing = true; // 标记是否正在初始化
 let floatingTocVisible = false;
 let floatingTocHeadings = [];
 let currentActiveHeading = null;
+let pageOutline = null; // 服务端返回的页面大纲（toc），未加载的标题也能出现在目录中
 let scrollPosition = 0; // 保存滚动位置
 let scrollSpyPaused = false; // 标记是否暂停scroll spy
 
@@ -430,30 +431,62 @@ function buildBreadcrumbPath(currentHeading) {
 }
 
 /**
- * Initialize floating TOC functionality
+ * Collect rendered headings (h1, h2, h3) when no server outline is available
  */
-function initFloatingToc() {
-    floatingTocHeadings = [];
-    currentActiveHeading = null;
-    
-    // Collect all headings (h1, h2, h3) from the page content
-    const pageContent = document.getElementById('pageContent');
-    if (!pageContent) return;
-    
+function collectRenderedHeadings(pageContent) {
     const headings = pageContent.querySelectorAll('h1, h2, h3');
     headings.forEach((heading, index) => {
         const level = parseInt(heading.tagName.charAt(1));
         const text = heading.textContent.trim();
         let id = heading.id;
-        
+
         // Generate ID if not exists
         if (!id) {
             id = `heading-${level}-${index}`;
             heading.id = id;
         }
-        
+
         floatingTocHeadings.push({ level, text, id });
     });
+}
+
+/**
+ * Escape outline text for insertion into the TOC markup
+ */
+function escapeTocText(text) {
+    const div = document.createElement('div');
+    div.textContent = text || '';
+    return div.innerHTML;
+}
+
+/**
+ * Use the server outline (toc) for the floating TOC; null falls back to rendered headings
+ */
+function setPageOutline(outline) {
+    pageOutline = Array.isArray(outline) ? outline : null;
+    initFloatingToc();
+}
+
+/**
+ * Initialize floating TOC functionality
+ */
+function initFloatingToc() {
+    floatingTocHeadings = [];
+    currentActiveHeading = null;
+    
+    // Collect all headings (h1, h2, h3) from the page content
+    const pageContent = document.getElementById('pageContent');
+    if (!pageContent) return;
+    
+    if (pageOutline) {
+        // 有服务端大纲时以大纲为准，尚未渲染的标题同样列出
+        pageOutline.forEach(entry => {
+            if (entry.level > 3) return;
+            floatingTocHeadings.push({ level: entry.level, text: escapeTocText(entry.text), id: entry.anchor });
+        });
+    } else {
+        collectRenderedHeadings(pageContent);
+    }
     
     console.log('Initialized TOC with headings:', floatingTocHeadings);
     
@@ -486,9 +519,11 @@ function buildFloatingToc() {
     
     let html = '';
     floatingTocHeadings.forEach(heading => {
+        // 大纲中尚未渲染的标题标记为 pending，点击后等待其加载
+        const pending = document.getElementById(heading.id) ? '' : ' pending';
         html += `
             <li>
-                <a href="#${heading.id}" class="level-${heading.level}" onclick="scrollToHeading('${heading.id}'); return false;">
+                <a href="#${heading.id}" class="level-${heading.level}${pending}" onclick="scrollToHeading('${heading.id}'); return false;">
                     ${heading.text}
                 </a>
             </li>
@@ -925,11 +960,34 @@ function scrollToHeading(headingId) {
             
             requestAnimationFrame(animateScroll);
         }, 350); // 稍微延长延迟，确保TOC关闭动画完全完成
+    } else if (pageOutline && pageOutline.some(entry => entry.anchor === headingId)) {
+        waitForHeading(headingId);
     } else {
         console.warn('Heading not found:', headingId);
     }
 }
 
+/**
+ * Wait for an outline heading that background loading has not rendered yet, then scroll to it
+ */
+function waitForHeading(headingId, timeout = 30000) {
+    const started = Date.now();
+    const link = document.querySelector(`#floatingTocList a[href="#${headingId}"]`);
+    if (link) link.classList.add('loading');
+    
+    const poll = setInterval(() => {
+        if (document.getElementById(headingId)) {
+            clearInterval(poll);
+            if (link) link.classList.remove('loading', 'pending');
+            scrollToHeading(headingId);
+        } else if (Date.now() - started > timeout || !pageOutline) {
+            clearInterval(poll);
+            if (link) link.classList.remove('loading');
+            console.warn('Heading not loaded in time:', headingId);
+        }
+    }, 250);
+}
+
 /**
  * Complete scroll animation and update UI
  */
@@ -1060,6 +1118,7 @@ document.addEventListener('DOMContentLoaded', function() {
     window.hideFloatingToc = hideFloatingToc;
     window.scrollToHeading = scrollToHeading;
     window.initFloatingToc = initFloatingToc;
+    window.setPageOutline = setPageOutline;
 });
 
 // Handle errors globally
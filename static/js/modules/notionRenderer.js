@@ -319,6 +319,12 @@ async function renderCodeBlock(block, blockColorStyle) {
                 
                 const hljsLanguage = CodeHighlighter.getLanguageClass(language);
                 const codeContainerStyle = blockColorStyle ? ` style="${blockColorStyle}"` : '';
+                // Server-side highlighted HTML uses highlight.js class names; mark it so it is not highlighted again
+                const codeHtml = block.highlighted
+                    || codeText.replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;');
+                const codeClass = block.highlighted
+                    ? `language-${hljsLanguage} hljs hljs-highlighted`
+                    : `language-${hljsLanguage}`;
                 
                 return `
                     <div class="code-block"${codeContainerStyle}>
@@ -332,7 +338,7 @@ async function renderCodeBlock(block, blockColorStyle) {
                                 Copy
                             </button>
                         </div>
-                        <pre><code id="${codeId}" class="language-${hljsLanguage}">${codeText.replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;')}</code></pre>
+                        <pre><code id="${codeId}" class="${codeClass}">${codeHtml}</code></pre>
                     </div>`;
             } catch (error) {
                 console.error('Error rendering code block:', error);
@@ -773,7 +779,7 @@ async function loadPage(pageId = null) {
         loadingText.textContent = '正在获取页面数据...';
         
         // Initial load with only 15 blocks to avoid rate limiting
-        const response = await fetch(`/api/page/${targetPageId}?limit=15`);
+        const response = await fetch(`/api/page/${targetPageId}?limit=15&profile=compact`);
         
         // Check for errors
         if (!response.ok) {
@@ -884,11 +890,9 @@ async function loadPage(pageId = null) {
             // Clear the fallback timer since we completed successfully
             clearTimeout(fallbackTimer);
             
-            // Initialize floating TOC for the initial content
+            // Initialize floating TOC from the page outline (falls back to rendered headings)
             try {
-                if (window.initFloatingToc && typeof window.initFloatingToc === 'function') {
-                    window.initFloatingToc();
-                }
+                loadPageOutline(targetPageId, data.toc);
             } catch (error) {
                 console.error('Error initializing floating TOC after page load:', error);
             }
@@ -928,6 +932,43 @@ async function loadPage(pageId = null) {
     }
 }
 
+/**
+ * Show the page outline in the floating TOC; when the first screen came without one
+ * (not cached yet), fetch it from /toc while the rest of the page loads
+ * @param {string} pageId - The page ID
+ * @param {Array|null} outline - The toc from the first screen response
+ */
+async function loadPageOutline(pageId, outline) {
+    if (!window.setPageOutline || typeof window.setPageOutline !== 'function') {
+        if (window.initFloatingToc) window.initFloatingToc();
+        return;
+    }
+    window.setPageOutline(outline || null);
+    if (outline) return;
+
+    const isCurrentPage = () => new URLSearchParams(window.location.search).get('id') === pageId;
+    for (let attempt = 0; attempt < 3; attempt++) {
+        try {
+            const response = await fetch(`/api/page/${pageId}/toc`);
+            if (response.status === 504) {
+                // 大纲仍在后台生成，稍后重试
+                const retryAfter = parseInt(response.headers.get('Retry-After') || '5', 10);
+                await new Promise(resolve => setTimeout(resolve, retryAfter * 1000));
+                continue;
+            }
+            if (!response.ok) return;
+            const data = await response.json();
+            if (isCurrentPage() && Array.isArray(data.toc)) {
+                window.setPageOutline(data.toc);
+            }
+            return;
+        } catch (error) {
+            console.warn('Could not load page outline:', error);
+            return;
+        }
+    }
+}
+
 /**
  * Load remaining content in background to avoid blocking initial page load
  * @param {string} pageId - The page ID
@@ -1017,7 +1058,7 @@ async function loadMoreContentInBackground(pageId, cursor, pageContent) {
                         batchSize = Math.max(3, Math.floor(batchSize / (retryCount + 1)));
                     }
                     
-                    const response = await fetch(`/api/page/${pageId}/more?cursor=${nextCursor}&limit=${batchSize}`);
+                    const response = await fetch(`/api/page/${pageId}/more?cursor=${nextCursor}&limit=${batchSize}&profile=compact`);
                 
                 if (!response.ok) {
                         // 特殊处理不同的HTTP错误
@@ -62,15 +62,96 @@ function getFileExtension(contentType) {
     return types[contentType] || '';
 }
 
+// Fetch a paginated asset listing (/images or /files) page by page, passing each page to onPage as it
+// arrives; onPage returns false to stop. Resolves to the number of items fetched.
+async function fetchAssetPages(endpoint, key, onPage) {
+    let page = 1;
+    let total = 0;
+    while (true) {
+        const response = await fetch(`${endpoint}?page=${page}&page_size=500`);
+        const data = await response.json();
+        const items = data[key] || [];
+        total += items.length;
+        if (onPage(items) === false || !data.has_more) break;
+        page++;
+    }
+    return total;
+}
+
+// 每次点击刷新递增，旧的加载在后续页面到达时停止追加
+let imageLoadId = 0;
+let fileLoadId = 0;
+
+// Create an image card and load its preview in the background
+function createImageCard(image) {
+    const card = document.createElement('div');
+    card.className = 'image-card';
+    const fullUrl = `${window.location.origin}/image/${image.id}`;
+    
+    card.innerHTML = `
+        <div class="image-preview" onclick="window.open('${fullUrl}', '_blank')">
+            <div class="w-full h-full flex items-center justify-center bg-gray-100">
+                <div class="loading-spinner"></div>
+            </div>
+        </div>
+        <div class="content">
+            <h3 class="font-medium text-gray-800 truncate" title="${image.title}">${image.title}</h3>
+            <div class="button-group">
+                <button onclick="copyUrl('${fullUrl}')" class="action-button secondary flex-1">
+                    <svg class="w-4 h-4" fill="none" stroke="currentColor" viewBox="0 0 24 24">
+                        <path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M8 5H6a2 2 0 00-2 2v12a2 2 0 002 2h10a2 2 0 002-2v-1M8 5a2 2 0 002 2h2a2 2 0 002-2M8 5a2 2 0 012-2h2a2 2 0 012 2m0 0h2a2 2 0 012 2v3m2 4H10m0 0l3-3m-3 3l3 3"></path>
+                    </svg>
+                    复制链接
+                </button>
+                <button onclick="downloadImage('${fullUrl}', '${image.title}')" class="action-button primary flex-1">
+                    <svg class="w-4 h-4" fill="none" stroke="currentColor" viewBox="0 0 24 24">
+                        <path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M4 16v1a3 3 0 003 3h10a3 3 0 003-3v-1m-4-4l-4 4m0 0l-4-4m4 4V4"></path>
+                    </svg>
+                    下载
+                </button>
+            </div>
+        </div>
+    `;
+
+    // 异步加载预览图
+    (async () => {
+        try {
+            const previewUrl = String(await compressImage(`/image/${image.id}`) || '');
+            const imagePreview = card.querySelector('.image-preview');
+            imagePreview.innerHTML = `<img src="${previewUrl}" alt="${image.title}" loading="lazy">`;
+        } catch (err) {
+            console.error('Error loading preview for image:', err);
+            const imagePreview = card.querySelector('.image-preview');
+            imagePreview.innerHTML = `
+                <div class="w-full h-full flex items-center justify-center bg-gray-50">
+                    <svg class="w-16 h-16 text-gray-300" fill="none" stroke="currentColor" viewBox="0 0 24 24">
+                        <path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M4 16l4.586-4.586a2 2 0 012.828 0L16 16m-2-2l1.586-1.586a2 2 0 012.828 0L20 14m-6-6h.01M6 20h12a2 2 0 002-2V6a2 2 0 00-2-2H6a2 2 0 00-2 2v12a2 2 0 002 2z"></path>
+                    </svg>
+                </div>
+            `;
+        }
+    })();
+    return card;
+}
+
 // Load images
 async function loadImages() {
+    const loadId = ++imageLoadId;
+    const imageGrid = document.getElementById('imageGrid');
+    let rendered = 0;
     try {
         showLoading('imageGrid');
-        const response = await fetch('/images');
-        const data = await response.json();
-        const imageGrid = document.getElementById('imageGrid');
+        // 每页到达后立即渲染，不等待其余页面
+        await fetchAssetPages('/images', 'images', images => {
+            if (loadId !== imageLoadId) return false;
+            if (rendered === 0 && images.length) imageGrid.innerHTML = '';
+            for (const image of images) {
+                imageGrid.appendChild(createImageCard(image));
+            }
+            rendered += images.length;
+        });
         
-        if (!data.images || data.images.length === 0) {
+        if (loadId === imageLoadId && rendered === 0) {
             imageGrid.innerHTML = `
                 <div class="col-span-full empty-state">
                     <svg fill="none" stroke="currentColor" viewBox="0 0 24 24">
@@ -80,66 +161,12 @@ async function loadImages() {
                     <p class="text-sm text-gray-500">请上传图片后刷新页面</p>
                 </div>
             `;
-            return;
         }
-        
-        imageGrid.innerHTML = '';
-        
-        // 先创建所有卡片并显示标题
-        for (const image of data.images) {
-            const card = document.createElement('div');
-            card.className = 'image-card';
-            const fullUrl = `${window.location.origin}/image/${image.id}`;
-            
-            card.innerHTML = `
-                <div class="image-preview" onclick="window.open('${fullUrl}', '_blank')">
-                    <div class="w-full h-full flex items-center justify-center bg-gray-100">
-                        <div class="loading-spinner"></div>
-                    </div>
-                </div>
-                <div class="content">
-                    <h3 class="font-medium text-gray-800 truncate" title="${image.title}">${image.title}</h3>
-                    <div class="button-group">
-                        <button onclick="copyUrl('${fullUrl}')" class="action-button secondary flex-1">
-                            <svg class="w-4 h-4" fill="none" stroke="currentColor" viewBox="0 0 24 24">
-                                <path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M8 5H6a2 2 0 00-2 2v12a2 2 0 002 2h10a2 2 0 002-2v-1M8 5a2 2 0 002 2h2a2 2 0 002-2M8 5a2 2 0 012-2h2a2 2 0 012 2m0 0h2a2 2 0 012 2v3m2 4H10m0 0l3-3m-3 3l3 3"></path>
-                            </svg>
-                            复制链接
-                        </button>
-                        <button onclick="downloadImage('${fullUrl}', '${image.title}')" class="action-button primary flex-1">
-                            <svg class="w-4 h-4" fill="none" stroke="currentColor" viewBox="0 0 24 24">
-                                <path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M4 16v1a3 3 0 003 3h10a3 3 0 003-3v-1m-4-4l-4 4m0 0l-4-4m4 4V4"></path>
-                            </svg>
-                            下载
-                        </button>
-                    </div>
-                </div>
-            `;
-            imageGrid.appendChild(card);
-        }
-        
-        // 异步加载每个图片的预览图
-        data.images.forEach(async (image, index) => {
-            try {
-                const previewUrl = String(await compressImage(`/image/${image.id}`) || '');
-                const imagePreview = imageGrid.children[index].querySelector('.image-preview');
-                imagePreview.innerHTML = `<img src="${previewUrl}" alt="${image.title}" loading="lazy">`;
-            } catch (err) {
-                console.error('Error loading preview for image:', err);
-                const imagePreview = imageGrid.children[index].querySelector('.image-preview');
-                imagePreview.innerHTML = `
-                    <div class="w-full h-full flex items-center justify-center bg-gray-50">
-                        <svg class="w-16 h-16 text-gray-300" fill="none" stroke="currentColor" viewBox="0 0 24 24">
-                            <path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M4 16l4.586-4.586a2 2 0 012.828 0L16 16m-2-2l1.586-1.586a2 2 0 012.828 0L20 14m-6-6h.01M6 20h12a2 2 0 002-2V6a2 2 0 00-2-2H6a2 2 0 00-2 2v12a2 2 0 002 2z"></path>
-                        </svg>
-                    </div>
-                `;
-            }
-        });
-        
     } catch (error) {
         console.error('Error loading images:', error);
-        document.getElementById('imageGrid').innerHTML = `
+        // 已显示的图片保留，只在一张都没有时显示错误
+        if (loadId !== imageLoadId || rendered > 0) return;
+        imageGrid.innerHTML = `
             <div class="col-span-full empty-state">
                 <svg fill="none" stroke="currentColor" viewBox="0 0 24 24">
                     <path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M12 8v4m0 4h.01M21 12a9 9 0 11-18 0 9 9 0 0118 0z"></path>
@@ -151,15 +178,76 @@ async function loadImages() {
     }
 }
 
+// Create a file card and load its preview in the background
+function createFileCard(file) {
+    const card = document.createElement('div');
+    card.className = 'image-card';
+    const fullUrl = `${window.location.origin}/file/${file.id}`;
+    
+    card.innerHTML = `
+        <div class="image-preview" onclick="window.open('${fullUrl}', '_blank')">
+            <div class="w-full h-full flex items-center justify-center bg-gray-100">
+                <div class="loading-spinner"></div>
+            </div>
+        </div>
+        <div class="content">
+            <h3 class="font-medium text-gray-800 truncate" title="${file.title}">${file.title}</h3>
+            <div class="button-group">
+                <button onclick="copyUrl('${fullUrl}')" class="action-button secondary flex-1">
+                    <svg class="w-4 h-4" fill="none" stroke="currentColor" viewBox="0 0 24 24">
+                        <path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M8 5H6a2 2 0 00-2 2v12a2 2 0 002 2h10a2 2 0 002-2v-1M8 5a2 2 0 002 2h2a2 2 0 002-2M8 5a2 2 0 012-2h2a2 2 0 012 2m0 0h2a2 2 0 012 2v3m2 4H10m0 0l3-3m-3 3l3 3"></path>
+                    </svg>
+                    复制链接
+                </button>
+                <button onclick="downloadFile('${fullUrl}', '${file.title}')" class="action-button primary flex-1">
+                    <svg class="w-4 h-4" fill="none" stroke="currentColor" viewBox="0 0 24 24">
+                        <path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M4 16v1a3 3 0 003 3h10a3 3 0 003-3v-1m-4-4l-4 4m0 0l-4-4m4 4V4"></path>
+                    </svg>
+                    下载
+                </button>
+            </div>
+        </div>
+    `;
+
+    // 异步加载预览图
+    (async () => {
+        try {
+            const previewUrl = String(await compressImage(`/file/${file.id}`) || '');
+            const filePreview = card.querySelector('.image-preview');
+            filePreview.innerHTML = `<img src="${previewUrl}" alt="${file.title}" loading="lazy">`;
+        } catch (err) {
+            console.error('Error loading preview for file:', err);
+            const filePreview = card.querySelector('.image-preview');
+            filePreview.innerHTML = `
+                <div class="w-full h-full flex items-center justify-center bg-gray-50">
+                    <svg class="w-16 h-16 text-gray-300" fill="none" stroke="currentColor" viewBox="0 0 24 24">
+                        <path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M9 12h6m-6 4h6m2 5H7a2 2 0 01-2-2V5a2 2 0 012-2h5.586a1 1 0 01.707.293l5.414 5.414a1 1 0 01.293.707V19a2 2 0 01-2 2z"></path>
+                    </svg>
+                </div>
+            `;
+        }
+    })();
+    return card;
+}
+
 // Load files
 async function loadFiles() {
+    const loadId = ++fileLoadId;
+    const fileGrid = document.getElementById('fileGrid');
+    let rendered = 0;
     try {
         showLoading('fileGrid');
-        const response = await fetch('/files');
-        const data = await response.json();
-        const fileGrid = document.getElementById('fileGrid');
+        // 每页到达后立即渲染，不等待其余页面
+        await fetchAssetPages('/files', 'files', files => {
+            if (loadId !== fileLoadId) return false;
+            if (rendered === 0 && files.length) fileGrid.innerHTML = '';
+            for (const file of files) {
+                fileGrid.appendChild(createFileCard(file));
+            }
+            rendered += files.length;
+        });
         
-        if (!data.files || data.files.length === 0) {
+        if (loadId === fileLoadId && rendered === 0) {
             fileGrid.innerHTML = `
                 <div class="col-span-full empty-state">
                     <svg fill="none" stroke="currentColor" viewBox="0 0 24 24">
@@ -169,65 +257,12 @@ async function loadFiles() {
                     <p class="text-sm text-gray-500">请上传文件后刷新页面</p>
                 </div>
             `;
-            return;
         }
-        
-        fileGrid.innerHTML = '';
-        
-        // 先创建所有卡片并显示标题
-        for (const file of data.files) {
-            const card = document.createElement('div');
-            card.className = 'image-card';
-            const fullUrl = `${window.location.origin}/file/${file.id}`;
-            
-            card.innerHTML = `
-                <div class="image-preview" onclick="window.open('${fullUrl}', '_blank')">
-                    <div class="w-full h-full flex items-center justify-center bg-gray-100">
-                        <div class="loading-spinner"></div>
-                    </div>
-                </div>
-                <div class="content">
-                    <h3 class="font-medium text-gray-800 truncate" title="${file.title}">${file.title}</h3>
-                    <div class="button-group">
-                        <button onclick="copyUrl('${fullUrl}')" class="action-button secondary flex-1">
-                            <svg class="w-4 h-4" fill="none" stroke="currentColor" viewBox="0 0 24 24">
-                                <path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M8 5H6a2 2 0 00-2 2v12a2 2 0 002 2h10a2 2 0 002-2v-1M8 5a2 2 0 002 2h2a2 2 0 002-2M8 5a2 2 0 012-2h2a2 2 0 012 2m0 0h2a2 2 0 012 2v3m2 4H10m0 0l3-3m-3 3l3 3"></path>
-                            </svg>
-                            复制链接
-                        </button>
-                        <button onclick="downloadFile('${fullUrl}', '${file.title}')" class="action-button primary flex-1">
-                            <svg class="w-4 h-4" fill="none" stroke="currentColor" viewBox="0 0 24 24">
-                                <path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M4 16v1a3 3 0 003 3h10a3 3 0 003-3v-1m-4-4l-4 4m0 0l-4-4m4 4V4"></path>
-                            </svg>
-                            下载
-                        </button>
-                    </div>
-                </div>
-            `;
-            fileGrid.appendChild(card);
-        }
-        
-        // 异步加载每个文件的预览图
-        data.files.forEach(async (file, index) => {
-            try {
-                const previewUrl = String(await compressImage(`/file/${file.id}`) || '');
-                const filePreview = fileGrid.children[index].querySelector('.image-preview');
-                filePreview.innerHTML = `<img src="${previewUrl}" alt="${file.title}" loading="lazy">`;
-            } catch (err) {
-                console.error('Error loading preview for file:', err);
-                const filePreview = fileGrid.children[index].querySelector('.image-preview');
-                filePreview.innerHTML = `
-                    <div class="w-full h-full flex items-center justify-center bg-gray-50">
-                        <svg class="w-16 h-16 text-gray-300" fill="none" stroke="currentColor" viewBox="0 0 24 24">
-                            <path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M9 12h6m-6 4h6m2 5H7a2 2 0 01-2-2V5a2 2 0 012-2h5.586a1 1 0 01.707.293l5.414 5.414a1 1 0 01.293.707V19a2 2 0 01-2 2z"></path>
-                        </svg>
-                    </div>
-                `;
-            }
-        });
     } catch (error) {
         console.error('Error loading files:', error);
-        document.getElementById('fileGrid').innerHTML = `
+        // 已显示的文件保留，只在一个都没有时显示错误
+        if (loadId !== fileLoadId || rendered > 0) return;
+        fileGrid.innerHTML = `
             <div class="col-span-full empty-state">
                 <svg fill="none" stroke="currentColor" viewBox="0 0 24 24">
                     <path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M12 8v4m0 4h.01M21 12a9 9 0 11-18 0 9 9 0 0118 0z"></path>
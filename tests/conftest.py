@@ -0,0 +1,114 @@
+"""
+测试夹具：应用通过 TestClient 驱动，Notion API 由 benchmarks/notion_stub.py 的替身提供
+
+替身在本进程的后台线程中运行（uvicorn），测试可以直接修改它的 fixtures 和延迟配置并读取调用计数。
+环境变量必须在导入 main 之前设置，所以 main 只在 app 夹具中导入。
+"""
+import os
+import socket
+import sys
+import threading
+import time
+
+import pytest
+import uvicorn
+from fastapi.testclient import TestClient
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from notion_stub import FixtureBuilder, NotionStub  # noqa: E402
+
+WEBHOOK_SECRET = "test-webhook-secret"
+INVALIDATION_TOKEN = "test-invalidation-token"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class StubServer:
+    """The Notion stub served from a daemon thread."""
+
+    def __init__(self, stub: NotionStub):
+        self.stub = stub
+        self.url = f"http://127.0.0.1:{free_port()}"
+        port = int(self.url.rsplit(":", 1)[1])
+        self.server = uvicorn.Server(uvicorn.Config(stub.app(), host="127.0.0.1", port=port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(timeout=5)
+
+
+@pytest.fixture(scope="session")
+def builder() -> FixtureBuilder:
+    """Fixture builder whose dict the stub serves live, so tests can add pages after startup."""
+    builder = FixtureBuilder()
+    builder.build(pages=6, blocks_per_page=20)
+    return builder
+
+
+@pytest.fixture(scope="session")
+def stub_server(builder):
+    with StubServer(NotionStub(builder.fixtures)) as server:
+        yield server
+
+
+@pytest.fixture(scope="session")
+def stub(stub_server) -> NotionStub:
+    return stub_server.stub
+
+
+@pytest.fixture(scope="session")
+def app(stub_server, builder):
+    os.environ.update({
+        "NOTION_BASE_URL": stub_server.url,
+        "NOTION_TOKEN": "test",
+        "NOTION_DATABASE_ID": builder.fixtures["meta"]["database_id"],
+        "CACHE_BACKEND": "memory",
+        "CACHE_INVALIDATION_TOKEN": INVALIDATION_TOKEN,
+        "NOTION_WEBHOOK_SECRET": WEBHOOK_SECRET,
+        "CODE_HIGHLIGHT_WORKERS": "0",
+    })
+    os.environ.pop("STALE_SNAPSHOT_DIR", None)
+    os.chdir(ROOT)  # StaticFiles 按相对路径挂载 static/
+    import main
+    return main
+
+
+@pytest.fixture(scope="session")
+def client(app):
+    """TestClient with startup run; waits for the background index load."""
+    with TestClient(app.app) as client:
+        deadline = time.monotonic() + 10
+        while not app.pages_data and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert app.pages_data, "page index did not load from the stub"
+        yield client
+
+
+@pytest.fixture(autouse=True)
+def reset_stub(stub):
+    """Every test starts with an instant, error-free stub."""
+    stub.config.update(latency=0.0, jitter=0.0, rate_limit=0.0, retry_after=0.0)
+    yield
+    stub.config.update(latency=0.0, jitter=0.0, rate_limit=0.0, retry_after=0.0)
+
+
+@pytest.fixture
+def new_page(builder):
+    """Factory for a fresh visible database page; the stub serves it immediately, the index learns it on refresh."""
+    def create(title: str, suffix: str = "") -> str:
+        return builder.database_page(builder.fixtures["meta"]["database_id"], title, "page", suffix=suffix)["id"]
+    return create
@@ -0,0 +1,51 @@
+"""层级索引后台扫描的限速和独立熔断器"""
+import asyncio
+import time
+
+import httpx
+import pytest
+
+import notion_api
+from notion_api import AsyncNotion, CircuitBreaker, NotionUnavailable, TokenBucket
+
+
+def test_token_bucket_spaces_calls():
+    async def run():
+        bucket = TokenBucket(rate=20.0)
+        started = time.monotonic()
+        for _ in range(5):
+            await bucket.acquire()
+        return time.monotonic() - started
+
+    # 第一次使用初始令牌，其余 4 次每次等待 1/20 秒
+    assert 0.18 <= asyncio.run(run()) < 0.5
+
+
+def test_background_failures_do_not_open_the_live_breaker(monkeypatch):
+    monkeypatch.setattr(notion_api, "NOTION_RETRY_ATTEMPTS", 1)
+
+    def unreachable():
+        raise httpx.ConnectError("connection refused")
+
+    live = AsyncNotion(client=object(), max_workers=2)
+    background = live.derive(limiter=TokenBucket(rate=1000.0))
+    assert background.client is live.client and background.executor is live.executor
+
+    async def run():
+        for _ in range(background.breaker.failure_threshold):
+            with pytest.raises(httpx.ConnectError):
+                await background.call(unreachable)
+        with pytest.raises(NotionUnavailable):
+            await background.call(lambda: "ok")
+        return await live.call(lambda: "ok")
+
+    assert asyncio.run(run()) == "ok"
+    assert background.breaker.state == CircuitBreaker.OPEN
+    assert live.breaker.state == CircuitBreaker.CLOSED
+    live.executor.shutdown()
+
+
+def test_hierarchy_scan_goes_through_the_rate_limit(app, client):
+    health = client.get("/health").json()
+    assert health["notion_background"]["rate_limit"]["rate"] == app.BACKGROUND_NOTION_RATE
+    assert health["notion_background"]["calls"] > 0  # 启动后的层级索引构建
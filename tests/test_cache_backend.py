@@ -0,0 +1,41 @@
+"""缓存后端：容量淘汰不影响固定的键"""
+import asyncio
+
+import pytest
+
+from cache_backend import MemoryCache, SQLiteCache
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    pinned = ("index", "lock:")
+    if request.param == "memory":
+        return MemoryCache(max_entries=5, pinned_prefixes=pinned)
+    cache = SQLiteCache(path=str(tmp_path / "cache.sqlite3"), max_entries=5, pinned_prefixes=pinned)
+    cache.PRUNE_EVERY = 1
+    return cache
+
+
+def test_pinned_keys_survive_capacity_eviction(backend):
+    backend.set("index", {"records": [1, 2, 3]})
+    assert backend.add("lock:index", 1, ttl=60)
+    for i in range(50):
+        backend.set(f"first:{i}", i)
+
+    assert backend.get("index") == {"records": [1, 2, 3]}
+    assert not backend.add("lock:index", 2, ttl=60)
+    assert len(backend.keys("first:")) <= 5
+    assert backend.get("first:49") == 49
+
+
+def test_pinned_keys_still_expire(backend):
+    backend.set("index:version", 1.0, ttl=-1)
+    assert backend.get("index:version") is None
+    assert backend.add("lock:index", 1, ttl=60)
+    backend.delete("lock:index")
+    assert backend.add("lock:index", 2, ttl=60)
+
+
+def test_set_async_writes_value(backend):
+    asyncio.run(backend.set_async("index", {"refreshed_at": 1.0}))
+    assert backend.get("index") == {"refreshed_at": 1.0}
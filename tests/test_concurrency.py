@@ -0,0 +1,52 @@
+"""Notion 调用不阻塞事件循环：上游变慢时，无关请求照常响应，多个慢请求并行等待"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+LATENCY = 1.0
+
+
+def timed_get(client, url: str, **params):
+    started = time.perf_counter()
+    response = client.get(url, params=params)
+    return response, time.perf_counter() - started
+
+
+def wait_for_upstream(stub, before: int, timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while stub.stats["total"] <= before and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert stub.stats["total"] > before, "slow request never reached the stub"
+
+
+def test_slow_upstream_does_not_block_unrelated_requests(app, client, stub, builder):
+    cached = builder.fixtures["meta"]["page_ids"][3]
+    slow = builder.fixtures["meta"]["page_ids"][4]
+    assert client.get(f"/api/page/{cached}", params={"limit": 15}).status_code == 200
+
+    stub.config["latency"] = LATENCY
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        before = stub.stats["total"]
+        pending = pool.submit(timed_get, client, f"/api/notion/page/{slow}")
+        wait_for_upstream(stub, before)
+
+        # 慢请求还在等待 Notion 时，健康检查和已缓存的首屏不受影响
+        health, health_elapsed = timed_get(client, "/health")
+        page, page_elapsed = timed_get(client, f"/api/page/{cached}", limit=15)
+        assert not pending.done()
+
+        slow_response, slow_elapsed = pending.result()
+    assert health.status_code == 200 and page.status_code == 200 and slow_response.status_code == 200
+    assert health_elapsed < LATENCY / 2 and page_elapsed < LATENCY / 2
+    assert slow_elapsed >= LATENCY
+
+
+def test_slow_upstream_calls_overlap(client, stub, builder):
+    page_ids = builder.fixtures["meta"]["page_ids"][:5]
+    stub.config["latency"] = LATENCY
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(page_ids)) as pool:
+        results = list(pool.map(lambda page_id: timed_get(client, f"/api/notion/page/{page_id}"), page_ids))
+    elapsed = time.perf_counter() - started
+    assert all(response.status_code == 200 for response, _ in results)
+    # 串行执行需要 5 秒，并行只比单次调用略长
+    assert elapsed < LATENCY * 2
@@ -0,0 +1,29 @@
+"""代码高亮：multiprocessing 在第一次处理长代码时才导入，进程池仍能完成长代码的高亮"""
+import asyncio
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import highlighting
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def test_import_does_not_load_multiprocessing():
+    code = "import sys, highlighting; print('multiprocessing' in sys.modules, 'concurrent.futures.process' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert result.stdout.split() == ["False", "False"]
+
+
+@pytest.mark.skipif(not highlighting.PYGMENTS_AVAILABLE, reason="Pygments is not installed")
+def test_long_snippet_is_highlighted_in_the_process_pool():
+    highlighter = highlighting.CodeHighlighter(enabled=True, workers=1)
+    source = "def add(a, b):\n    return a + b\n" * (highlighting.INLINE_MAX_CHARS // 20)
+    try:
+        rendered = asyncio.run(highlighter.highlight("python", source, timeout=60))
+    finally:
+        highlighter.shutdown()
+    assert rendered is not None and "hljs-keyword" in rendered
+    assert highlighter.stats["offloaded"] == 1
@@ -0,0 +1,49 @@
+"""按页面失效缓存（evict_pages、/api/cache/invalidate）"""
+from conftest import INVALIDATION_TOKEN
+
+
+def undashed(page_id: str) -> str:
+    return page_id.replace("-", "").upper()
+
+
+def test_invalidate_matches_either_id_form(app, client, builder):
+    page_id = builder.fixtures["meta"]["page_ids"][0]
+    assert client.get(f"/api/page/{page_id}", params={"limit": 15}).status_code == 200
+    assert app.get_cached_first_screen(page_id) is not None
+    # 写入时键已统一，另一种写法也能读到
+    assert app.get_cached_first_screen(undashed(page_id)) is not None
+
+    response = client.post("/api/cache/invalidate", json={"page_id": undashed(page_id)},
+                           headers={"Authorization": f"Bearer {INVALIDATION_TOKEN}"})
+    assert response.status_code == 200
+    assert response.json()["evicted_entries"] >= 1
+    assert app.get_cached_first_screen(page_id) is None
+
+
+def test_deleted_page_drops_every_per_page_key(app, client, builder):
+    page_id = builder.fixtures["meta"]["page_ids"][1]
+    client.get(f"/api/page/{page_id}", params={"limit": 15})
+    client.get(f"/api/page/{page_id}/toc")
+    key = app.normalize_notion_id(page_id)
+    assert app.cache.get(app.PAGE_COST_KEY + key) is not None
+    assert app.cache.get(app.OUTLINE_KEY + key) is not None
+    assert app.snapshots.load(app.PAGE_SNAPSHOT_KEY + key) is not None
+
+    app.evict_pages([undashed(page_id)], drop_snapshots=True)
+
+    assert app.cache.get(app.FIRST_SCREEN_KEY + key) is None
+    assert app.cache.get(app.PAGE_COST_KEY + key) is None
+    assert app.cache.get(app.OUTLINE_KEY + key) is None
+    assert app.snapshots.load(app.PAGE_SNAPSHOT_KEY + key) is None
+    assert page_id not in set(app.block_pages.values())
+
+
+def test_block_page_map_is_bounded(app, client, builder, monkeypatch):
+    monkeypatch.setattr(app, "BLOCK_PAGES_MAX_ENTRIES", 10)
+    long_page = builder.fixtures["meta"]["long_page_id"]
+    data = client.get(f"/api/page/{long_page}/more", params={"cursor": builder.fixtures["children"][long_page][0],
+                                                              "adaptive": "false", "limit": 40}).json()
+    assert len(data["blocks"]) == 40
+    assert len(app.block_pages) <= 10
+    # 保留的是最近加载的块
+    assert app.block_pages[app.normalize_notion_id(data["blocks"][-1]["id"])] == long_page
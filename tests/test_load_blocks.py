@@ -0,0 +1,57 @@
+"""块加载引擎在截止时间内的行为（load_blocks / /api/page/{id}/more）"""
+from notion_stub import rich_text
+
+
+def paragraph(builder, parent_id: str, text: str) -> str:
+    return builder.block(parent_id, "paragraph", {"rich_text": rich_text(text), "color": "default"})["id"]
+
+
+def slow_columns(builder, parent_id: str) -> str:
+    """column_list -> 2 columns -> paragraphs: three nested list requests after the block itself."""
+    column_list = builder.block(parent_id, "column_list", {}, has_children=True)
+    for col in range(2):
+        column = builder.block(column_list["id"], "column", {}, has_children=True)
+        paragraph(builder, column["id"], f"column {col}")
+    return column_list["id"]
+
+
+def test_deadline_mid_nested_children_still_advances(app, client, builder, stub, new_page, monkeypatch):
+    """
+    A block whose nested children outlast the deadline is returned (possibly partial) instead of being
+    dropped with the cursor left on it, which made every /more call time out on the same block.
+    """
+    page_id = new_page("Slow nested columns")
+    expected = [slow_columns(builder, page_id), paragraph(builder, page_id, "after"),
+                slow_columns(builder, page_id), paragraph(builder, page_id, "last")]
+
+    # 每次 Notion 调用 0.25s，截止时间 0.9s：顶层列表之后，分栏的嵌套请求一定跨过截止时间
+    stub.config["latency"] = 0.25
+    monkeypatch.setattr(app, "REQUEST_DEADLINE", 0.9)
+
+    seen, cursor = [], expected[0]
+    for _ in range(len(expected) + 1):
+        response = client.get(f"/api/page/{page_id}/more", params={"cursor": cursor, "adaptive": "false", "limit": 15})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["blocks"], f"no progress from cursor {cursor}"
+        seen += [block["id"] for block in data["blocks"]]
+        if not data["has_more"]:
+            break
+        assert data["next_cursor"] != cursor
+        cursor = data["next_cursor"]
+
+    assert not data["has_more"]
+    assert seen == expected
+
+
+def test_first_screen_keeps_slow_first_block(app, client, builder, stub, new_page, monkeypatch):
+    page_id = new_page("Slow first block")
+    first = slow_columns(builder, page_id)
+    second = paragraph(builder, page_id, "second")
+
+    stub.config["latency"] = 0.25
+    monkeypatch.setattr(app, "REQUEST_DEADLINE", 0.9)
+    data = client.get(f"/api/page/{page_id}", params={"limit": 15}).json()
+
+    assert [block["id"] for block in data["blocks"]] == [first]
+    assert data["has_more"] and data["next_cursor"] == second
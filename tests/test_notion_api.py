@@ -0,0 +1,29 @@
+"""Notion 访问层：截止时间同时限制线程中的 HTTP 请求，放弃的调用不会占着线程池"""
+import asyncio
+import time
+
+import pytest
+from notion_client import Client
+
+from notion_api import AsyncNotion, DeadlineExceeded, request_deadline
+
+
+def test_abandoned_call_releases_its_worker(stub, stub_server, builder):
+    page_id = builder.fixtures["meta"]["page_ids"][0]
+    # 只有一个线程：如果放弃的调用仍在线程中等待，下一次调用要排在它后面
+    notion = AsyncNotion(client=Client(auth="test", base_url=stub_server.url, timeout_ms=30000), max_workers=1)
+
+    async def run():
+        stub.config["latency"] = 2.0
+        with request_deadline(0.3):
+            with pytest.raises(DeadlineExceeded):
+                await notion.list_children(block_id=page_id, page_size=10)
+        stub.config["latency"] = 0.0
+        started = time.monotonic()
+        await notion.list_children(block_id=page_id, page_size=10)
+        return time.monotonic() - started
+
+    try:
+        assert asyncio.run(run()) < 1.0
+    finally:
+        notion.executor.shutdown(wait=False)
@@ -0,0 +1,56 @@
+"""页面大纲：从已渲染的块提取和扫描页面结构两条路径的结果一致，以及 /toc 和前端的衔接"""
+from pathlib import Path
+
+from notion_stub import rich_text
+
+
+def heading(builder, parent_id: str, level: int, text: str) -> dict:
+    return builder.block(parent_id, f"heading_{level}", {"rich_text": rich_text(text), "color": "default",
+                                                         "is_toggleable": False})
+
+
+def test_rendered_and_scanned_outlines_match(app, client, builder, new_page):
+    page_id = new_page("Outline rules")
+    heading(builder, page_id, 1, "Intro")
+    item = builder.text_block(page_id, "bulleted_list_item", 1, has_children=True)
+    heading(builder, item["id"], 2, "Inside list item")
+    toggle = builder.text_block(page_id, "toggle", 2, has_children=True)
+    heading(builder, toggle["id"], 3, "Inside toggle")
+    columns = builder.block(page_id, "column_list", {}, has_children=True)
+    column = builder.block(columns["id"], "column", {}, has_children=True)
+    heading(builder, column["id"], 2, "Inside column")
+
+    # 首屏包含整个页面：大纲取自已渲染的块
+    first = client.get(f"/api/page/{page_id}", params={"limit": 15}).json()
+    assert not first["has_more"]
+    rendered = app.extract_outline(first["blocks"])
+
+    # 清除缓存后 /toc 扫描页面结构
+    app.cache.delete(app.page_cache_key(app.OUTLINE_KEY, page_id))
+    scanned = client.get(f"/api/page/{page_id}/toc").json()["toc"]
+
+    assert rendered == scanned
+    assert [entry["text"] for entry in scanned] == ["Intro", "Inside toggle", "Inside column"]
+
+
+def test_toc_without_edit_time_does_not_start_a_build(app, client, monkeypatch, new_page):
+    page_id = new_page("No edit time")
+
+    async def page_info(_):
+        return {"id": page_id, "last_edited_time": None}
+
+    monkeypatch.setattr(app, "fetch_page_info", page_info)
+    monkeypatch.delitem(app.pages_data, page_id, raising=False)
+
+    response = client.get(f"/api/page/{page_id}/toc")
+    assert response.status_code == 503
+    # 没有编辑时间的大纲无法缓存，不应在后台生成
+    assert page_id not in app.outline_tasks
+
+
+def test_renderer_requests_the_outline():
+    """首屏没有 toc 时前端从 /toc 读取大纲"""
+    static = Path(__file__).resolve().parent.parent / "static" / "js" / "modules"
+    renderer = (static / "notionRenderer.js").read_text(encoding="utf-8")
+    assert "data.toc" in renderer and "/toc`" in renderer
+    assert "window.setPageOutline = setPageOutline" in (static / "index.js").read_text(encoding="utf-8")
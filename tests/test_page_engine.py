@@ -0,0 +1,85 @@
+"""块加载引擎：/page（旧版）、/api/page 和 /more 共用 load_blocks，按各自的块数、批次大小和截止时间加载"""
+import pytest
+
+from notion_stub import rich_text
+
+
+@pytest.fixture
+def paragraphs_page(builder, new_page):
+    """A page of plain paragraphs; returns (page_id, top-level block IDs in order)."""
+    def create(count: int):
+        page_id = new_page(f"{count} paragraphs")
+        ids = [builder.block(page_id, "paragraph", {"rich_text": rich_text(f"paragraph {i}"), "color": "default"})["id"]
+               for i in range(count)]
+        return page_id, ids
+    return create
+
+
+@pytest.fixture
+def list_calls(app, monkeypatch):
+    """Records (block_id, page_size) of every top-level blocks.children.list call the engine makes."""
+    calls = []
+    original = app.notion.list_children
+
+    async def recording(block_id, **kwargs):
+        calls.append((block_id, kwargs.get("page_size")))
+        return await original(block_id=block_id, **kwargs)
+
+    monkeypatch.setattr(app.notion, "list_children", recording)
+    return calls
+
+
+def test_both_routes_return_the_same_blocks_with_their_own_page_size(client, paragraphs_page, list_calls):
+    page_id, ids = paragraphs_page(80)
+
+    legacy = client.get(f"/page/{page_id}", params={"limit": 60}).json()
+    legacy_calls = [size for block_id, size in list_calls if block_id == page_id]
+    list_calls.clear()
+    api = client.get(f"/api/page/{page_id}", params={"limit": 60}).json()
+    api_calls = [size for block_id, size in list_calls if block_id == page_id]
+
+    for data in (legacy, api):
+        assert [block["id"] for block in data["blocks"]] == ids[:60]
+        assert data["has_more"] and data["next_cursor"] == ids[60]
+    assert legacy_calls == [60]  # LEGACY_PAGE_SIZE=100，按剩余块数截断
+    assert api_calls == [30, 30]  # API_PAGE_SIZE=30
+
+
+def test_more_continues_exactly_where_the_first_screen_stopped(client, paragraphs_page):
+    page_id, ids = paragraphs_page(45)
+    first = client.get(f"/api/page/{page_id}", params={"limit": 15}).json()
+    assert [block["id"] for block in first["blocks"]] == ids[:15]
+
+    more = client.get(f"/api/page/{page_id}/more",
+                      params={"cursor": first["next_cursor"], "adaptive": "false", "limit": 100}).json()
+    assert [block["id"] for block in more["blocks"]] == ids[15:]
+    assert not more["has_more"] and more["next_cursor"] is None
+
+
+def test_deadline_returns_partial_slices_without_gaps(app, client, stub, paragraphs_page, monkeypatch):
+    page_id, ids = paragraphs_page(40)
+    # 每次列表请求 0.3s，截止时间 1.0s（减去 RESPONSE_RESERVE 后 0.5s）：每段只够一次列表请求
+    stub.config["latency"] = 0.3
+    monkeypatch.setattr(app, "REQUEST_DEADLINE", 1.0)
+
+    first = client.get(f"/api/page/{page_id}", params={"limit": 40}).json()
+    seen = [block["id"] for block in first["blocks"]]
+    assert first["has_more"] and 0 < len(seen) < 40
+
+    cursor = first["next_cursor"]
+    for _ in range(40):
+        more = client.get(f"/api/page/{page_id}/more", params={"cursor": cursor, "adaptive": "false", "limit": 40}).json()
+        assert more["blocks"], f"no progress from cursor {cursor}"
+        seen += [block["id"] for block in more["blocks"]]
+        if not more["has_more"]:
+            break
+        cursor = more["next_cursor"]
+    assert seen == ids
+
+
+def test_engine_respects_block_limit_on_nested_page(client, builder):
+    long_page = builder.fixtures["meta"]["long_page_id"]
+    data = client.get(f"/page/{long_page}", params={"limit": 100}).json()
+    top_level = builder.fixtures["children"][long_page]
+    assert [block["id"] for block in data["blocks"]] == top_level[:100]
+    assert data["has_more"] and data["next_cursor"] == top_level[100]
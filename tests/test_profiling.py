@@ -0,0 +1,56 @@
+"""按需剖析：按路由触发的剖析超时后，已经开始的剖析会话随之停止"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import profiling
+
+TOKEN = "test-profiling-token"
+
+
+@pytest.fixture
+def profiled_client(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILING_TOKEN", TOKEN)
+    monkeypatch.setattr(profiling, "state", profiling.ProfilerState())
+    app = FastAPI()
+    app.add_middleware(profiling.RouteProfilingMiddleware)
+    app.include_router(profiling.router)
+
+    @app.get("/slow")
+    async def slow():
+        await asyncio.sleep(1.0)
+        return {"ok": True}
+
+    with TestClient(app) as client:
+        yield client
+
+
+def sampler_running() -> bool:
+    return any(thread.name == "profiler-sampler" for thread in threading.enumerate())
+
+
+def test_timed_out_route_trigger_stops_the_started_session(profiled_client):
+    headers = {"Authorization": f"Bearer {TOKEN}"}
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        trigger = pool.submit(profiled_client.post, "/api/debug/profile",
+                              params={"route": "/slow", "timeout": 0.3}, headers=headers)
+        while profiling.state.armed is None:
+            time.sleep(0.01)
+        slow = pool.submit(profiled_client.get, "/slow")
+
+        # /slow 还在执行时触发请求已超时
+        assert trigger.result().status_code == 408
+        assert not slow.done()
+        assert not sampler_running()
+        assert not profiling.state.busy
+
+        # 下一次剖析不会与上一个会话重叠
+        again = profiled_client.post("/api/debug/profile", params={"seconds": 0.1}, headers=headers)
+        assert again.status_code == 200
+        assert slow.result().status_code == 200
+    assert not sampler_running()
@@ -0,0 +1,21 @@
+"""站内搜索：加载过的页面正文（包括列表项及其嵌套内容）进入搜索索引"""
+from notion_stub import rich_text
+
+
+def text(content: str) -> dict:
+    return {"rich_text": rich_text(content), "color": "default"}
+
+
+def test_list_item_text_is_searchable(app, client, builder, new_page):
+    page_id = new_page("Lists only")
+    builder.block(page_id, "paragraph", text("an ordinary opening paragraph"))
+    builder.block(page_id, "bulleted_list_item", text("zebrafish regenerate fins"))
+    item = builder.block(page_id, "numbered_list_item", text("first step"), has_children=True)
+    builder.block(item["id"], "paragraph", text("axolotl under a numbered item"))
+
+    data = client.get(f"/api/page/{page_id}", params={"limit": 15}).json()
+    assert all(block.get("id") for block in data["blocks"])
+
+    for query in ("zebrafish", "axolotl"):
+        results = client.get("/api/search", params={"q": query}).json()["results"]
+        assert [result["id"] for result in results] == [page_id], query
@@ -0,0 +1,34 @@
+"""快照存储：固定前缀的快照不受页面快照数量影响，异步保存在线程中写文件"""
+import asyncio
+import threading
+
+from snapshots import SnapshotStore
+
+
+def test_pinned_snapshots_survive_page_churn():
+    store = SnapshotStore(directory=None, max_entries=3, pinned_prefixes=("index", "hierarchy"))
+    store.save("index", [{"id": "a"}])
+    store.save("hierarchy", {"nodes": {}})
+    for i in range(10):
+        store.save(f"page:{i}", {"blocks": [i]})
+    assert store.load("index")[1] == [{"id": "a"}]
+    assert store.load("hierarchy")[1] == {"nodes": {}}
+    assert store.load("page:0") is None and store.load("page:9") is not None
+    store.discard("index")
+    assert store.load("index") is None
+
+
+def test_save_async_writes_the_file_off_the_event_loop(tmp_path, monkeypatch):
+    store = SnapshotStore(directory=str(tmp_path))
+    writers = []
+    write = store._write
+    monkeypatch.setattr(store, "_write", lambda *args: (writers.append(threading.current_thread()), write(*args)))
+
+    async def run():
+        await store.save_async("index", [{"id": "a"}])
+        return threading.current_thread()
+
+    loop_thread = asyncio.run(run())
+    assert writers and writers[0] is not loop_thread
+    # 新进程（新的存储实例）从磁盘读到同一份快照
+    assert SnapshotStore(directory=str(tmp_path)).load("index")[1] == [{"id": "a"}]
@@ -0,0 +1,120 @@
+"""Notion webhook 接收端：按 tests/fixtures/webhooks 中的事件回放签名、未签名和重复投递的请求"""
+import hashlib
+import hmac
+import os
+
+import pytest
+
+from conftest import WEBHOOK_SECRET
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "webhooks")
+
+
+def event_body(name: str, **ids) -> bytes:
+    """Fixture payload with {page_id}-style placeholders filled in, as the raw bytes Notion would send."""
+    with open(os.path.join(FIXTURES, f"{name}.json"), encoding="utf-8") as f:
+        body = f.read()
+    for key, value in ids.items():
+        body = body.replace("{%s}" % key, value)
+    return body.encode("utf-8")
+
+
+def sign(body: bytes, secret: str = WEBHOOK_SECRET) -> dict:
+    digest = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return {"X-Notion-Signature": f"sha256={digest}", "Content-Type": "application/json"}
+
+
+@pytest.fixture(autouse=True)
+def no_rewarm(app, monkeypatch):
+    """Rewarming would refill the first screen right after eviction and hide what the webhook removed."""
+    monkeypatch.setattr(app, "WEBHOOK_REWARM", False)
+
+
+@pytest.fixture
+def cached_page(app, client, builder):
+    page_id = builder.fixtures["meta"]["page_ids"][2]
+    client.get(f"/api/page/{page_id}", params={"limit": 15})
+    assert app.get_cached_first_screen(page_id) is not None
+    ids = {"page_id": page_id, "database_id": builder.fixtures["meta"]["database_id"],
+           "block_id": builder.fixtures["children"][page_id][0]}
+    return page_id, ids
+
+
+def test_verification_request_is_accepted_without_signature(client):
+    response = client.post("/api/notion/webhook", content=event_body("verification"),
+                           headers={"Content-Type": "application/json"})
+    assert response.status_code == 200 and response.json() == {"ok": True}
+
+
+@pytest.mark.parametrize("headers", [{}, {"X-Notion-Signature": "sha256=0"}, "wrong secret"])
+def test_unsigned_or_badly_signed_events_are_rejected(app, client, cached_page, headers):
+    page_id, ids = cached_page
+    body = event_body("page_content_updated", **ids)
+    if headers == "wrong secret":
+        headers = sign(body, "not-the-secret")
+    response = client.post("/api/notion/webhook", content=body, headers=headers)
+    assert response.status_code == 401
+    assert app.get_cached_first_screen(page_id) is not None
+
+
+def test_signature_covers_the_exact_body(app, client, cached_page):
+    page_id, ids = cached_page
+    body = event_body("page_content_updated", **ids)
+    # 签名后改动请求体（例如重新序列化 JSON）签名就不再匹配
+    response = client.post("/api/notion/webhook", content=body.replace(b'"attempt_number": 1', b'"attempt_number": 2'),
+                           headers=sign(body))
+    assert response.status_code == 401
+    assert app.get_cached_first_screen(page_id) is not None
+
+
+def test_content_update_evicts_page_and_replay_is_idempotent(app, client, cached_page):
+    page_id, ids = cached_page
+    body = event_body("page_content_updated", **ids)
+
+    first = client.post("/api/notion/webhook", content=body, headers=sign(body))
+    assert first.status_code == 200
+    result = first.json()
+    assert result["invalidated_pages"] == [page_id]  # 父级是数据库，不是页面
+    assert result["evicted_entries"] >= 1 and not result["index_refresh"]
+    assert app.get_cached_first_screen(page_id) is None
+
+    # Notion 会重试投递（attempt_number 递增），同一事件再次到达时不再有可失效的缓存
+    replay = client.post("/api/notion/webhook", content=body, headers=sign(body))
+    assert replay.status_code == 200
+    assert replay.json()["invalidated_pages"] == result["invalidated_pages"]
+    assert replay.json()["evicted_entries"] == 0
+
+
+def test_block_event_maps_to_its_page(app, client, cached_page):
+    page_id, ids = cached_page
+    body = event_body("block_updated", **ids)
+    response = client.post("/api/notion/webhook", content=body, headers=sign(body))
+    assert response.status_code == 200
+    assert response.json()["invalidated_pages"] == [page_id]
+    assert app.get_cached_first_screen(page_id) is None
+
+
+def test_deleted_page_drops_snapshots_and_refreshes_index(app, client, cached_page):
+    page_id, ids = cached_page
+    key = app.page_cache_key(app.PAGE_SNAPSHOT_KEY, page_id)
+    assert app.snapshots.load(key) is not None
+
+    body = event_body("page_deleted", **ids)
+    response = client.post("/api/notion/webhook", content=body, headers=sign(body))
+    assert response.status_code == 200
+    assert response.json()["index_refresh"]
+    assert app.get_cached_first_screen(page_id) is None
+    assert app.snapshots.load(key) is None
+
+
+def test_verification_token_is_not_logged_in_full(client, caplog):
+    token = "secret_tMrlL1qK5vuQAh1b6cZGhFChZTSYJlce98V0pYn7yBl"
+    client.post("/api/notion/webhook", content=event_body("verification"), headers={"Content-Type": "application/json"})
+    assert token not in caplog.text
+    assert token[:10] in caplog.text
+
+
+@pytest.mark.parametrize("body", [b"[]", b'"x"', b"42", b"null"])
+def test_non_object_json_body_is_rejected(client, body):
+    response = client.post("/api/notion/webhook", content=body, headers=sign(body))
+    assert response.status_code == 400